@@ -4,8 +4,14 @@ import signal
 import subprocess
 import sys
 import json
+import threading
+from datetime import datetime
 
-from flask import Flask, jsonify
+import yaml
+from flask import Flask, Response, jsonify, request, send_file, stream_with_context
+
+from src.results_index import SORT_COLUMNS, configure_results_index, import_results, record_result, results_index
+from src.task_jobs import TaskJobManager, parse_json_output as _parse_json_output
 
 
 app = Flask(__name__)
@@ -14,23 +20,7 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_OUT = os.path.join(BASE_DIR, "data", "out")
 
 
-def _parse_json_output(raw_out: str):
-    if not raw_out:
-        return None
-    try:
-        return json.loads(raw_out)
-    except json.JSONDecodeError:
-        start = raw_out.rfind("{")
-        end = raw_out.rfind("}")
-        if start != -1 and end != -1 and end > start:
-            try:
-                return json.loads(raw_out[start:end + 1])
-            except json.JSONDecodeError:
-                return None
-        return None
-
-
-def _run_task(script_path: str, *args: str):
+def _run_task_subprocess(script_path: str, *args: str):
     if not os.path.exists(script_path):
         raise FileNotFoundError("Script não encontrado.")
 
@@ -50,11 +40,64 @@ def _run_task(script_path: str, *args: str):
     return result, None
 
 
+_TASK_SCRIPTS = {
+    "calibration": ("task_runner.py", "--task", "calibration"),
+    "extraction": ("task_runner.py", "--task", "extraction"),
+    "reconstruction": ("task_runner.py", "--task", "reconstruction"),
+    "full": ("task_runner.py", "--task", "full"),
+    "volume": ("volume_gui.py",),
+}
+
+_WORKER_POOL = None
+_WORKER_POOL_READY = False
+_WORKER_POOL_LOCK = threading.Lock()
+
+
+def _get_worker_pool():
+    # Pool de processos com Open3D/trimesh/OpenCV já importados; None = modo subprocess
+    # (parameters.server.task_mode) ou falha ao iniciar o pool.
+    global _WORKER_POOL, _WORKER_POOL_READY
+    with _WORKER_POOL_LOCK:
+        if not _WORKER_POOL_READY:
+            _WORKER_POOL_READY = True
+            try:
+                from src.worker_pool import create_worker_pool_from_config
+
+                _WORKER_POOL = create_worker_pool_from_config(_load_config(), BASE_DIR)
+            except Exception as e:
+                print(f"Pool de processos indisponível, usando subprocessos: {e}", file=sys.stderr)
+                _WORKER_POOL = None
+        return _WORKER_POOL
+
+
+def _run_task_script(task: str):
+    script, *args = _TASK_SCRIPTS[task]
+    return _run_task_subprocess(os.path.join(BASE_DIR, "bin", script), *args)
+
+
+def _run_task(task: str):
+    pool = _get_worker_pool()
+    if pool is None:
+        return _run_task_script(task)
+
+    from src.worker_pool import WorkerPoolUnavailableError, WorkerTaskError
+
+    try:
+        result = pool.run("services:run_backend_task", task)
+    except WorkerPoolUnavailableError as e:
+        print(f"Pool de processos indisponível ({e}), usando subprocesso.", file=sys.stderr)
+        return _run_task_script(task)
+    except WorkerTaskError as e:
+        return None, str(e)
+    if not result:
+        return None, "Operação cancelada."
+    return result, None
+
+
 @app.route("/calibrar-camera", methods=["POST"])
 def calibrar_camera():
     try:
-        task_script = os.path.join(BASE_DIR, "bin", "task_runner.py")
-        result, error = _run_task(task_script, "--task", "calibration")
+        result, error = _run_task("calibration")
         if error:
             return jsonify({"status": "erro", "mensagem": error}), 400
 
@@ -70,8 +113,7 @@ def calibrar_camera():
 @app.route("/extrair-frames", methods=["POST"])
 def extrair_frames():
     try:
-        task_script = os.path.join(BASE_DIR, "bin", "task_runner.py")
-        result, error = _run_task(task_script, "--task", "extraction")
+        result, error = _run_task("extraction")
         if error:
             return jsonify({"status": "erro", "mensagem": error}), 400
 
@@ -84,11 +126,73 @@ def extrair_frames():
         }), 500
 
 
+def _load_config():
+    with open(os.path.join(BASE_DIR, "config.yaml"), "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def _headless_input_path(value, cfg):
+    # Caminho (relativo à pasta do backend) dentro de paths.headless_input_roots; None fora delas
+    roots = (cfg.get("paths") or {}).get("headless_input_roots") or ["./data/in", "./data/out"]
+    path = os.path.realpath(value if os.path.isabs(value) else os.path.join(BASE_DIR, value))
+    for root in roots:
+        root = os.path.realpath(root if os.path.isabs(root) else os.path.join(BASE_DIR, root))
+        try:
+            if os.path.commonpath([path, root]) == root:
+                return path
+        except ValueError:  # Windows: unidades diferentes
+            continue
+    return None
+
+
+@app.route("/extrair-frames-headless", methods=["POST"])
+def extrair_frames_headless():
+    # Extração sem janelas: vídeo e nome da pasta de saída vêm no JSON; vídeo e calibração só
+    # são lidos de paths.headless_input_roots
+    try:
+        from src.acquisition import VideoOpenError, extract_frames, extraction_options_from_config
+
+        payload = request.get_json(silent=True) or {}
+        if not payload.get("video_path"):
+            return jsonify({"status": "erro", "mensagem": "Informe 'video_path'."}), 400
+        cfg = _load_config()
+        video_path = _headless_input_path(str(payload["video_path"]), cfg)
+        calibration_file = payload.get("calibration_file")
+        if calibration_file:
+            calibration_file = _headless_input_path(str(calibration_file), cfg)
+        if video_path is None or (payload.get("calibration_file") and calibration_file is None):
+            return jsonify({"status": "erro", "mensagem": "Caminho fora das pastas de entrada permitidas."}), 400
+        acq_cfg = cfg["parameters"]["acquisition"]
+        nome = payload.get("nome") or os.path.splitext(os.path.basename(video_path))[0]
+        output_dir = os.path.normpath(os.path.join(BASE_DIR, cfg["paths"]["frames_output"], os.path.basename(nome)))
+
+        options = extraction_options_from_config(acq_cfg, cfg["parameters"].get("reconstruction"))
+        if calibration_file:
+            options["calibration_file"] = calibration_file
+
+        resultado = extract_frames(
+            video_path,
+            output_dir,
+            payload.get("desired_fps", acq_cfg["desired_fps"]),
+            **options,
+        )
+        _results_index()
+        record_result("frames", output_dir)
+        return jsonify({"status": "ok", "mensagem": f"{resultado['saved']} frames extraídos.", "resultado": resultado})
+
+    except (VideoOpenError, ValueError) as e:
+        return jsonify({"status": "erro", "mensagem": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "status": "erro",
+            "mensagem": str(e)
+        }), 500
+
+
 @app.route("/reconstruir", methods=["POST"])
 def reconstruir():
     try:
-        task_script = os.path.join(BASE_DIR, "bin", "task_runner.py")
-        result, error = _run_task(task_script, "--task", "reconstruction")
+        result, error = _run_task("reconstruction")
         if error:
             return jsonify({"status": "erro", "mensagem": error}), 400
 
@@ -104,8 +208,7 @@ def reconstruir():
 @app.route("/execucao-normal", methods=["POST"])
 def execucao_normal():
     try:
-        task_script = os.path.join(BASE_DIR, "bin", "task_runner.py")
-        result, error = _run_task(task_script, "--task", "full")
+        result, error = _run_task("full")
         if error:
             return jsonify({"status": "erro", "mensagem": error}), 400
 
@@ -121,8 +224,7 @@ def execucao_normal():
 @app.route("/calcular-volume", methods=["POST"])
 def calcular_volume():
     try:
-        volume_script = os.path.join(BASE_DIR, "bin", "volume_gui.py")
-        result, error = _run_task(volume_script)
+        result, error = _run_task("volume")
         if error:
             return jsonify({"status": "erro", "mensagem": error}), 400
 
@@ -139,6 +241,83 @@ def calcular_volume():
         }), 500
 
 
+_JOB_QUEUE = None
+_JOB_QUEUE_LOCK = threading.Lock()
+
+
+def _get_job_queue():
+    # Import tardio: a fila carrega o módulo de reconstrução (Open3D/COLMAP); é criada ao iniciar
+    # o servidor (_start_background_services) e, fora dele, na primeira rota que a usa.
+    global _JOB_QUEUE
+    with _JOB_QUEUE_LOCK:
+        if _JOB_QUEUE is None:
+            from src.job_queue import create_job_queue_from_config
+
+            _results_index()  # jobs concluídos entram no histórico
+            _JOB_QUEUE = create_job_queue_from_config(_load_config(), BASE_DIR)
+            _JOB_QUEUE.start()
+        return _JOB_QUEUE
+
+
+@app.route("/reconstrucoes", methods=["POST"])
+def enfileirar_reconstrucoes():
+    try:
+        payload = request.get_json(silent=True) or {}
+        frames_dirs = payload.get("frames_dirs") or []
+        if isinstance(frames_dirs, str):
+            frames_dirs = [frames_dirs]
+        if not frames_dirs:
+            return jsonify({"status": "erro", "mensagem": "Informe ao menos uma pasta em 'frames_dirs'."}), 400
+
+        queue = _get_job_queue()
+        jobs = [queue.submit(path) for path in frames_dirs]
+        return jsonify({"status": "ok", "mensagem": f"{len(jobs)} reconstrução(ões) na fila.", "jobs": jobs})
+
+    except FileNotFoundError as e:
+        return jsonify({"status": "erro", "mensagem": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "status": "erro",
+            "mensagem": str(e)
+        }), 500
+
+
+@app.route("/reconstrucoes", methods=["GET"])
+def listar_reconstrucoes():
+    return jsonify({"status": "ok", "jobs": _get_job_queue().list()})
+
+
+@app.route("/reconstrucoes/<job_id>", methods=["GET"])
+def status_reconstrucao(job_id):
+    job = _get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"status": "erro", "mensagem": "Job não encontrado."}), 404
+    return jsonify({"status": "ok", "job": job})
+
+
+@app.route("/exportar-malha", methods=["GET"])
+def exportar_malha():
+    try:
+        from src.mesh_export import get_export
+
+        mesh_path = os.path.realpath(request.args.get("path", ""))
+        formato = request.args.get("formato", "obj")
+        # Só exporta malhas geradas pelo próprio backend
+        if os.path.commonpath([mesh_path, os.path.realpath(DATA_OUT)]) != os.path.realpath(DATA_OUT):
+            return jsonify({"status": "erro", "mensagem": "Caminho fora de data/out."}), 400
+
+        output_path = get_export(mesh_path, formato)
+        return send_file(output_path, as_attachment=True, download_name=os.path.basename(output_path))
+
+    except (FileNotFoundError, ValueError) as e:
+        return jsonify({"status": "erro", "mensagem": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "status": "erro",
+            "mensagem": str(e)
+        }), 500
+
+
 def garantir_pasta(nome):
     caminho = os.path.join(DATA_OUT, nome)
     os.makedirs(caminho, exist_ok=True)
@@ -177,6 +356,192 @@ def historico_volumes():
     })
 
 
+def _inside_data_out(path):
+    data_out = os.path.realpath(DATA_OUT)
+    return os.path.commonpath([os.path.realpath(path), data_out]) == data_out
+
+
+def _volume_file_path(name):
+    # Nome simples (volume_<ts>.json, heightgrid_<ts>.npy) -> pasta paths.volumes_output;
+    # caminhos relativos partem da pasta do backend
+    volumes_dir = (_load_config().get("paths") or {}).get("volumes_output") or "./data/out/volumes"
+    if os.path.basename(name) == name:
+        name = os.path.join(volumes_dir, name)
+    return os.path.realpath(name if os.path.isabs(name) else os.path.join(BASE_DIR, name))
+
+
+@app.route("/volumes/reintegrar", methods=["POST"])
+def reintegrar_volume():
+    # {"volume": "volume_<ts>.json"} ou {"grade": "heightgrid_<ts>.npy"}, mais opcionais
+    # "limiar" (m acima da mesa), "recorte" [x_min, y_min, x_max, y_max] (m, referencial do plano),
+    # "suavizacao" (sigma em células), "preencher" (bool) e "raio_preenchimento" (células).
+    # Só lê arquivos dentro de data/out, como /exportar-malha.
+    from src.height_grid import height_grid_path_for_volume, load_height_grid, reintegrate_height_grid
+
+    payload = request.get_json(silent=True) or {}
+    try:
+        grid_path = payload.get("grade")
+        if grid_path:
+            grid_path = _volume_file_path(str(grid_path))
+        elif payload.get("volume"):
+            volume_path = _volume_file_path(str(payload["volume"]))
+            if not _inside_data_out(volume_path):
+                return jsonify({"status": "erro", "mensagem": "Caminho fora de data/out."}), 400
+            grid_path = height_grid_path_for_volume(volume_path)
+            if not grid_path:
+                return jsonify({"status": "erro", "mensagem": "Volume sem grade de alturas gravada."}), 404
+        if not grid_path:
+            return jsonify({"status": "erro", "mensagem": "Informe 'volume' ou 'grade'."}), 400
+        if not _inside_data_out(grid_path):
+            return jsonify({"status": "erro", "mensagem": "Caminho fora de data/out."}), 400
+        grid = load_height_grid(grid_path)
+        resultado = reintegrate_height_grid(
+            grid,
+            threshold=float(payload.get("limiar", 0.0)),
+            crop=payload.get("recorte"),
+            gaussian_sigma=payload.get("suavizacao"),
+            fill_holes=payload.get("preencher"),
+            fill_max_radius=payload.get("raio_preenchimento"),
+        )
+    except FileNotFoundError as e:
+        return jsonify({"status": "erro", "mensagem": f"Arquivo não encontrado: {e.filename or e}"}), 404
+    except (ValueError, TypeError, KeyError) as e:
+        return jsonify({"status": "erro", "mensagem": str(e)}), 400
+    return jsonify({"status": "ok", "resultado": resultado, "grade": {**grid.frame(), "path": grid.path}})
+
+
+def _results_index():
+    # Índice SQLite dos resultados (paths.results_index, relativo à pasta do backend)
+    db_path = (_load_config().get("paths") or {}).get("results_index") or "./data/out/results_index.sqlite"
+    configure_results_index(db_path if os.path.isabs(db_path) else os.path.join(BASE_DIR, db_path))
+    return results_index()
+
+
+def _parse_timestamp(value):
+    # Epoch (s) ou data ISO (2025-01-31 / 2025-01-31T12:00:00)
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+@app.route("/resultados", methods=["GET"])
+def listar_resultados():
+    # ?tipo=volume|calibration|frames|reconstruction&metodo=&escala=&status=&busca=&desde=&ate=
+    # &volume_min=&volume_max=&ordenar=created_at&ordem=desc&pagina=1&por_pagina=50
+    args = request.args
+    try:
+        pagina = _results_index().query(
+            kind=args.get("tipo"),
+            method=args.get("metodo"),
+            scale_source=args.get("escala"),
+            status=args.get("status"),
+            search=args.get("busca"),
+            created_from=_parse_timestamp(args.get("desde")),
+            created_to=_parse_timestamp(args.get("ate")),
+            volume_min=args.get("volume_min", type=float),
+            volume_max=args.get("volume_max", type=float),
+            sort=args.get("ordenar", "created_at"),
+            order=args.get("ordem", "desc"),
+            page=args.get("pagina", 1, type=int),
+            page_size=args.get("por_pagina", 50, type=int),
+        )
+    except ValueError as e:
+        return jsonify({"status": "erro", "mensagem": str(e), "ordenacoes": list(SORT_COLUMNS)}), 400
+    return jsonify({"status": "ok", **pagina})
+
+
+@app.route("/resultados/<int:result_id>", methods=["GET"])
+def detalhar_resultado(result_id):
+    item = _results_index().get(result_id)
+    if item is None:
+        return jsonify({"status": "erro", "mensagem": "Resultado não encontrado."}), 404
+    return jsonify({"status": "ok", "resultado": item})
+
+
+@app.route("/resultados/importar", methods=["POST"])
+def importar_resultados():
+    # Indexa as pastas de saída existentes; reimportar só relê o que mudou
+    try:
+        _results_index()
+        contagem = import_results(_load_config(), BASE_DIR)
+        return jsonify({"status": "ok", "mensagem": "Resultados importados.", "contagem": contagem})
+    except Exception as e:
+        return jsonify({"status": "erro", "mensagem": str(e)}), 500
+
+
+_TASK_JOBS = TaskJobManager(cwd=BASE_DIR)
+
+
+@app.route("/tarefas", methods=["POST"])
+def iniciar_tarefa():
+    # Versão assíncrona de /calibrar-camera, /extrair-frames, /reconstruir, /execucao-normal e
+    # /calcular-volume: devolve o id na hora; acompanhe por /tarefas/<id> ou /tarefas/<id>/eventos
+    payload = request.get_json(silent=True) or {}
+    tarefa = payload.get("tarefa")
+    if tarefa not in _TASK_SCRIPTS:
+        return jsonify({"status": "erro",
+                        "mensagem": f"Informe 'tarefa': {', '.join(_TASK_SCRIPTS)}."}), 400
+    script, *args = _TASK_SCRIPTS[tarefa]
+    job = _TASK_JOBS.submit(tarefa, [sys.executable, os.path.join(BASE_DIR, "bin", script), *args])
+    return jsonify({"status": "ok", "mensagem": "Tarefa iniciada.", "job_id": job.id}), 202
+
+
+@app.route("/tarefas", methods=["GET"])
+def listar_tarefas():
+    return jsonify({"status": "ok", "tarefas": _TASK_JOBS.list()})
+
+
+@app.route("/tarefas/<job_id>", methods=["GET"])
+def status_tarefa(job_id):
+    job = _TASK_JOBS.get(job_id)
+    if job is None:
+        return jsonify({"status": "erro", "mensagem": "Tarefa não encontrada."}), 404
+    return jsonify({"status": "ok", "tarefa": job})
+
+
+@app.route("/tarefas/<job_id>/eventos", methods=["GET"])
+def eventos_tarefa(job_id):
+    # Server-Sent Events: status, etapa, progresso e log; Last-Event-ID retoma após reconexão
+    if _TASK_JOBS.get(job_id) is None:
+        return jsonify({"status": "erro", "mensagem": "Tarefa não encontrada."}), 404
+    try:
+        after = int(request.headers.get("Last-Event-ID") or request.args.get("after", 0))
+    except ValueError:
+        after = 0
+
+    def _stream():
+        for event in _TASK_JOBS.iter_events(job_id, after=after):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            data = json.dumps(event["data"], ensure_ascii=False, default=str)
+            yield f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n"
+
+    return Response(stream_with_context(_stream()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/tarefas/<job_id>/cancelar", methods=["POST"])
+def cancelar_tarefa(job_id):
+    job = _TASK_JOBS.cancel(job_id)
+    if job is None:
+        return jsonify({"status": "erro", "mensagem": "Tarefa não encontrada."}), 404
+    if not job.cancel_requested:
+        return jsonify({"status": "erro", "mensagem": f"Tarefa já finalizada ({job.status})."}), 409
+    return jsonify({"status": "ok", "mensagem": "Tarefa cancelada."})
+
+
+@app.route("/worker-pool", methods=["GET"])
+def estado_worker_pool():
+    pool = _get_worker_pool()
+    if pool is None:
+        return jsonify({"status": "ok", "modo": "subprocess"})
+    return jsonify({"status": "ok", "modo": "pool", "pool": pool.stats()})
+
+
 @app.route('/shutdown', methods=['POST'])
 def shutdown():
     print("Recebido comando de encerramento da Interface Java.")
@@ -184,6 +549,15 @@ def shutdown():
     os.kill(os.getpid(), signal.SIGINT)
     return "Encerrando servidor...", 200
 
+def _start_background_services():
+    # Em segundo plano, para o servidor já responder: o pool aquece os módulos pesados e a fila
+    # de reconstruções é criada e iniciada, retomando sozinha os jobs persistidos antes do reinício.
+    threading.Thread(target=_get_worker_pool, name="worker-pool-start", daemon=True).start()
+    threading.Thread(target=_get_job_queue, name="job-queue-start", daemon=True).start()
+
+
 # Para testes sem InterfaceUI.jar
 if __name__ == "__main__":
-    app.run(port=5000, debug=True)
+    # Sem o reloader: ele reiniciaria o servidor (e o pool) em outro processo.
+    _start_background_services()
+    app.run(port=5000, debug=True, use_reloader=False)
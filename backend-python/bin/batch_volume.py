@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+
+import yaml
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.batch_volume import (
+    SCALE_MODES,
+    VOLUME_MODES,
+    expand_reconstruction_dirs,
+    json_line_writer,
+    run_volume_batch,
+    write_summary_csv,
+)
+
+
+def _load_bean_color_cfg(config_path):
+    if not config_path or not os.path.exists(config_path):
+        return {}
+    with open(config_path, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f) or {}
+    return cfg.get("parameters", {}).get("bean_color", {}) or {}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Calcula o volume de várias reconstruções em paralelo, sem interface."
+    )
+    parser.add_argument("folders", nargs="*", help="Pastas de reconstrução ou padrões glob (ex.: 'recons/*').")
+    parser.add_argument("--list", help="Arquivo texto com uma pasta (ou padrão) por linha.")
+    parser.add_argument("--scale-mode", required=True, choices=SCALE_MODES)
+    parser.add_argument("--aruco-size", type=float, help="Lado real do ArUco em cm (--scale-mode aruco).")
+    parser.add_argument("--scale", type=float, help="Fator de escala fixo (--scale-mode fixed).")
+    parser.add_argument("--volume-mode", choices=sorted(VOLUME_MODES),
+                        help="Tipo de volume (padrão: heightmap para A4, auto nos demais).")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--memory-limit-mb", type=float, help="Limite de memória por processo (Linux/macOS).")
+    parser.add_argument("--output", help="Arquivo JSON Lines (padrão: saída padrão).")
+    parser.add_argument("--csv", help="Resumo em CSV.")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(__file__), "..", "config.yaml"),
+                        help="config.yaml com os perfis de cor (parameters.bean_color).")
+    args = parser.parse_args()
+
+    patterns = list(args.folders)
+    if args.list:
+        with open(args.list, "r", encoding="utf-8") as f:
+            patterns += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    folders = expand_reconstruction_dirs(patterns)
+    if not folders:
+        print("Nenhuma pasta de reconstrução encontrada.", file=sys.stderr)
+        return 2
+
+    stream = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        results = run_volume_batch(
+            folders,
+            args.scale_mode,
+            workers=args.workers,
+            memory_limit_mb=args.memory_limit_mb,
+            on_result=json_line_writer(stream),
+            aruco_size_cm=args.aruco_size,
+            fixed_scale=args.scale,
+            volume_mode=args.volume_mode,
+            bean_color_cfg=_load_bean_color_cfg(args.config),
+        )
+    finally:
+        if args.output:
+            stream.close()
+
+    if args.csv:
+        write_summary_csv(results, args.csv)
+    falhas = sum(1 for r in results if r.get("status") != "ok")
+    print(f"{len(results) - falhas} de {len(results)} reconstruções calculadas.", file=sys.stderr)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
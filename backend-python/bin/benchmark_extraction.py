@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.acquisition import choose_extraction_engine, get_video_frame_rate, iter_sampled_frames
+
+
+def make_synthetic_video(path: str, seconds: float, fps: float, width: int, height: int) -> str:
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    rng = np.random.default_rng(0)
+    base = (rng.random((height // 8, width // 8, 3)) * 255).astype(np.uint8)
+    base = cv2.resize(base, (width, height), interpolation=cv2.INTER_NEAREST)
+    for i in range(int(seconds * fps)):
+        writer.write(np.roll(base, i * 4, axis=1))
+    writer.release()
+    return path
+
+
+def benchmark(video_path: str, desired_fps: float, engines, repeat: int = 1):
+    fps = get_video_frame_rate(video_path)
+    rate = max(1, int(fps / desired_fps))
+    results = {"video": video_path, "fps": fps, "rate": rate,
+               "auto_engine": choose_extraction_engine(rate, fps), "engines": {}}
+    for engine in engines:
+        best = None
+        frames = 0
+        for _ in range(repeat):
+            cap = cv2.VideoCapture(video_path)
+            start = time.perf_counter()
+            frames = sum(1 for _ in iter_sampled_frames(cap, rate, engine))
+            elapsed = time.perf_counter() - start
+            cap.release()
+            best = elapsed if best is None else min(best, elapsed)
+        results["engines"][engine] = {
+            "frames": frames,
+            "seconds": round(best, 4),
+            "frames_per_second": round(frames / best, 2) if best > 0 else None,
+        }
+    base = results["engines"].get("read", {}).get("seconds")
+    if base:
+        for stats in results["engines"].values():
+            stats["speedup_vs_read"] = round(base / stats["seconds"], 2) if stats["seconds"] else None
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compara os motores de extração de frames (read/grab/seek) sem gravar arquivos."
+    )
+    parser.add_argument("--video", help="Vídeo de entrada (padrão: vídeo sintético temporário).")
+    parser.add_argument("--fps", type=float, default=5.0, help="FPS desejado na extração.")
+    parser.add_argument("--engines", nargs="+", default=["read", "grab", "seek"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--synthetic-seconds", type=float, default=10.0)
+    parser.add_argument("--synthetic-fps", type=float, default=60.0)
+    parser.add_argument("--synthetic-size", nargs=2, type=int, default=[1920, 1080], metavar=("W", "H"))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = args.video or make_synthetic_video(
+            os.path.join(tmp, "synthetic.mp4"),
+            args.synthetic_seconds,
+            args.synthetic_fps,
+            *args.synthetic_size,
+        )
+        results = benchmark(video, args.fps, args.engines, args.repeat)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
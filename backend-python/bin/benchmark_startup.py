@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Bibliotecas que não devem ser carregadas só para abrir um ponto de entrada
+HEAVY_MODULES = ("open3d", "trimesh", "scipy", "cv2")
+
+# Cada ponto de entrada roda em um interpretador novo até a primeira resposta:
+# `code` é executado como está; `script` roda como __main__ com `args` (ex.: --help do argparse).
+ENTRY_POINTS = {
+    "services": {"code": "import services"},
+    "app": {"code": "import app\nassert app.app.test_client().get('/tarefas').status_code == 200"},
+    "task_runner": {"script": "bin/task_runner.py", "args": ["--help"]},
+    "volume_gui": {"code": "import runpy\nrunpy.run_path('bin/volume_gui.py', run_name='volume_gui')"},
+    "batch_volume": {"script": "bin/batch_volume.py", "args": ["--help"]},
+    "ui_ctk": {"code": "import ui_ctk"},
+    "main": {"code": "import main"},
+}
+
+MARKER = "@@startup "
+
+RUNNER = """
+import json, os, runpy, sys
+sys.path.insert(0, os.getcwd())
+entry = json.loads(sys.argv[1])
+try:
+    if "script" in entry:
+        sys.argv = [entry["script"], *entry.get("args", [])]
+        runpy.run_path(entry["script"], run_name="__main__")
+    else:
+        exec(compile(entry["code"], "<entry>", "exec"), {"__name__": "__entry__"})
+except SystemExit as e:
+    if e.code not in (None, 0):
+        raise
+print(%r + json.dumps(sorted(m for m in %r if m in sys.modules)))
+""" % (MARKER, HEAVY_MODULES)
+
+
+def measure_entry_point(name: str, repeat: int = 5) -> dict:
+    """Tempo de parede (abrir o interpretador até a primeira resposta) em `repeat` execuções."""
+    entry = ENTRY_POINTS[name]
+    times, heavy, error = [], None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", RUNNER, json.dumps(entry)], cwd=BASE_DIR,
+                              capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        marker = [line for line in proc.stdout.splitlines() if line.startswith(MARKER)]
+        if proc.returncode != 0 or not marker:
+            lines = (proc.stderr or proc.stdout).strip().splitlines()
+            error = lines[-1] if lines else f"código {proc.returncode}"
+            break
+        times.append(elapsed)
+        heavy = json.loads(marker[-1][len(MARKER):])
+    if not times:
+        return {"error": error}
+    return {
+        "median_s": round(statistics.median(times), 4),
+        "min_s": round(min(times), 4),
+        "max_s": round(max(times), 4),
+        "runs": len(times),
+        "heavy_modules": heavy,
+    }
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """Pontos de entrada cuja mediana passou da linha de base em mais de `tolerance` (fração)."""
+    regressions = []
+    for name, stats in results["entries"].items():
+        base = baseline.get("entries", {}).get(name, {})
+        if "median_s" in stats and base.get("median_s"):
+            ratio = stats["median_s"] / base["median_s"]
+            stats["vs_baseline"] = round(ratio, 3)
+            if ratio > 1.0 + tolerance:
+                regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mede o tempo até a primeira resposta de cada ponto de entrada do backend "
+                    "(interpretador novo a cada execução) e os módulos pesados carregados."
+    )
+    parser.add_argument("entries", nargs="*",
+                        help=f"Pontos de entrada (padrão: todos): {', '.join(ENTRY_POINTS)}.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", help="JSON de uma execução anterior (--save) para comparar.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Aumento máximo da mediana em relação à linha de base (fração).")
+    parser.add_argument("--max-seconds", type=float, help="Mediana máxima aceita por ponto de entrada.")
+    parser.add_argument("--save", help="Grava o resultado em JSON (linha de base futura).")
+    args = parser.parse_args()
+
+    names = args.entries or list(ENTRY_POINTS)
+    unknown = [name for name in names if name not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"ponto de entrada desconhecido: {', '.join(unknown)}")
+    results = {"python": sys.version.split()[0], "repeat": args.repeat,
+               "entries": {name: measure_entry_point(name, args.repeat) for name in names}}
+
+    failures = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            failures += compare_with_baseline(results, json.load(f), args.tolerance)
+    if args.max_seconds:
+        failures += [name for name, stats in results["entries"].items()
+                     if stats.get("median_s", 0) > args.max_seconds and name not in failures]
+    results["regressions"] = failures
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,37 @@
+import argparse
+import json
+import os
+import sys
+
+import yaml
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(BASE_DIR)
+
+from src.results_index import RESULT_KINDS, configure_results_index, import_results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Indexa no SQLite do histórico os resultados já existentes nas pastas de saída "
+                    "(volumes, calibrações, frames e reconstruções)."
+    )
+    parser.add_argument("--config", default=os.path.join(BASE_DIR, "config.yaml"))
+    parser.add_argument("--db", help="Arquivo do índice (padrão: paths.results_index do config).")
+    parser.add_argument("--kinds", nargs="+", choices=RESULT_KINDS, default=list(RESULT_KINDS))
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f) or {}
+    db_path = args.db or (cfg.get("paths") or {}).get("results_index") or "./data/out/results_index.sqlite"
+    if not os.path.isabs(db_path):
+        db_path = os.path.join(BASE_DIR, db_path)
+    configure_results_index(db_path)
+
+    counts = import_results(cfg, BASE_DIR, kinds=args.kinds)
+    print(json.dumps({"status": "ok", "db": db_path.replace("\\", "/"), "contagem": counts}, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
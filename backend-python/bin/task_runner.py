@@ -5,13 +5,7 @@ import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from services import (
-    load_config,
-    run_calibration_module,
-    run_opencv_module,
-    run_reconstruction_module,
-    run_full_module,
-)
+from services import run_backend_task
 
 
 def main() -> int:
@@ -23,24 +17,12 @@ def main() -> int:
     )
     args = parser.parse_args()
 
-    cfg = load_config()
-
-    if args.task == "calibration":
-        ok = run_calibration_module(cfg)
-    elif args.task == "extraction":
-        ok = run_opencv_module(cfg)
-    elif args.task == "reconstruction":
-        ok = run_reconstruction_module(cfg)
-    elif args.task == "full":
-        ok = run_full_module(cfg)
-    else:
-        ok = False
-
-    if not ok:
+    result = run_backend_task(args.task)
+    if not result:
         print("Operação cancelada.", file=sys.stderr)
         return 2
 
-    print(json.dumps({"status": "ok", "task": args.task}, ensure_ascii=False))
+    print(json.dumps(result, ensure_ascii=False))
     return 0
 
 
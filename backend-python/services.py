@@ -6,22 +6,14 @@ import shutil
 from datetime import datetime
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog
-import numpy as np
-from src.camera_calibration import run_calibration_process, exibir_marcador_na_tela
-from src.acquisition import save_video_frames_fps
-from src.reconstruction import run_colmap_reconstruction
-from src.processing import (
-    compute_volume_from_mesh,
-    generate_mesh_from_dense_point_cloud,
-    compute_segment_scale,
-    compute_aruco_scale_from_mesh,
-    compute_a4_scale_from_mesh,
-    compute_bean_volume_from_point_cloud,
-    _load_colored_point_cloud_from_recon,
-    _extract_hsv_profiles_from_config,
-)
+from src.mesh_preview import background_previews_enabled, find_view_geometry, preview_in_background, preview_options
+from src.results_index import configure_results_index, record_result
+from src.task_jobs import report_progress
 from ui_local import *
 
+# Módulos pesados (OpenCV, Open3D, trimesh, SciPy) são importados dentro de cada módulo do
+# pipeline: importar services (app.py, task_runner.py, ui_ctk.py) não carrega nenhum deles.
+
 
 # Padronizar os caminhos entre Sistemas Operacionais:
 def normalize_path(p):
@@ -45,12 +37,21 @@ def load_config(path=None):
         base_dir = os.path.dirname(os.path.abspath(__file__))
         path = os.path.join(base_dir, "config.yaml")
     with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+        cfg = yaml.safe_load(f)
+    configure_results_index((cfg.get("paths") or {}).get("results_index"))
+    return cfg
 
 
 # Módulo de Calibração:
 def run_calibration_module(cfg, parent=None):
+    from src.camera_calibration import (
+        exibir_marcador_na_tela,
+        run_calibration_process,
+        run_video_calibration_process,
+    )
+
     print("\n=== MÓDULO: CAMERA CALIBRATION ===")
+    report_progress(stage="calibration")
 
     # 1. Instância base única e oculta para evitar janelas "tk" vazias
     root_master, created_root = _get_parent_root(parent)
@@ -95,7 +96,38 @@ def run_calibration_module(cfg, parent=None):
             root_master.destroy()
         return False
 
-    # 3. Seleção da pasta de fotos
+    calib_cfg = cfg["parameters"]["calibration"]
+    settings = {
+        "chessboard_size": dims,
+        "square_size": square_size,
+        "output_folder": normalize_path(cfg["paths"]["calibration_output_folder"]),
+        "workers": calib_cfg.get("workers", 0),
+        "search_long_side": calib_cfg.get("search_long_side", 1000),
+    }
+
+    # 3. Vídeo do tabuleiro: os frames com vistas mais variadas são escolhidos automaticamente
+    if messagebox.askyesno("Calibração", "Deseja calibrar a partir de um VÍDEO do tabuleiro?\n\n"
+                                         "(Não = selecionar a pasta de fotos)", parent=root_master):
+        video = selecionar_arquivo_video("Por favor, selecione o vídeo do tabuleiro para a calibração.")
+        if not video:
+            messagebox.showerror("Erro de Calibração", "Nenhum vídeo foi selecionado. O processo foi interrompido.",
+                                 parent=root_master)
+            if created_root:
+                root_master.destroy()
+            return False
+        video_cfg = calib_cfg.get("video", {}) or {}
+        settings.update({
+            "calibration_video": normalize_path(video),
+            "video_probe_fps": video_cfg.get("probe_fps", 2.0),
+            "video_max_probe_frames": video_cfg.get("max_probe_frames", 300),
+            "video_max_views": video_cfg.get("max_views", 20),
+        })
+        if created_root:
+            root_master.destroy()
+        run_video_calibration_process(settings)
+        return True
+
+    # Seleção da pasta de fotos
     pasta_final = selecionar_pasta_fotos_calibracao()
 
     if not pasta_final:
@@ -106,7 +138,7 @@ def run_calibration_module(cfg, parent=None):
         return False
 
     # 4. TRATAMENTO: Verificar se a pasta contém fotos válidas (evitar vídeos/pastas vazias)
-    extensoes_fotos = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.JPG', '.JPEG', '.PNG')
+    extensoes_fotos = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp', '.JPG', '.JPEG', '.PNG')
     try:
         arquivos_na_pasta = os.listdir(pasta_final)
         fotos_encontradas = [f for f in arquivos_na_pasta if f.lower().endswith(extensoes_fotos)]
@@ -126,12 +158,7 @@ def run_calibration_module(cfg, parent=None):
         return False
 
     # 5. Configurações para o processamento técnico
-    settings = {
-        "chessboard_size": dims,
-        "square_size": square_size,
-        "calibration_folder": normalize_path(pasta_final),
-        "output_folder": normalize_path(cfg["paths"]["calibration_output_folder"])
-    }
+    settings["calibration_folder"] = normalize_path(pasta_final)
 
     # Fecha o root_master antes do processamento pesado para limpar a memória da interface
     if created_root:
@@ -144,8 +171,11 @@ def run_calibration_module(cfg, parent=None):
 
 
 # Módulo de Extração:
-def run_opencv_module(cfg, parent=None):
+def run_opencv_module(cfg, parent=None, frame_callback=None):
+    from src.acquisition import extraction_options_from_config, save_video_frames_fps
+
     print("\n=== MÓDULO: OPENCV (EXTRAÇÃO) ===")
+    report_progress(stage="extraction")
 
     # Criamos a instância base oculta para evitar janelas "fantasmas"
     root_master, created_root = _get_parent_root(parent)
@@ -249,21 +279,35 @@ def run_opencv_module(cfg, parent=None):
         root_master.destroy()
 
     # 5. Execução da extração
-    save_video_frames_fps(
+    acq_cfg = cfg["parameters"]["acquisition"]
+    resultado = save_video_frames_fps(
         video_path=normalize_path(video_escolhido),
         output_dir=normalize_path(caminho_frames),
-        desired_fps=cfg["parameters"]["acquisition"]["desired_fps"]
+        desired_fps=acq_cfg["desired_fps"],
+        frame_callback=frame_callback,
+        **extraction_options_from_config(acq_cfg, cfg["parameters"].get("reconstruction")),
     )
-    return True
+    if resultado:
+        record_result("frames", caminho_frames)
+    return normalize_path(caminho_frames)
 
 
 # Módulo de Reconstrução:
-def run_reconstruction_module(cfg, parent=None):
+def run_reconstruction_module(cfg, parent=None, frames_dir=None, project_dir=None, features_done=False):
+    from src.processing import generate_mesh_from_dense_point_cloud
+    from src.reconstruction import run_colmap_reconstruction
+
     print("\n=== MÓDULO: RECONSTRUCTION (COLMAP) ===")
+    report_progress(stage="reconstruction")
+    recon_cfg = cfg.get("parameters", {}).get("reconstruction", {})
     proj_dir = run_colmap_reconstruction(
         normalize_path(cfg["paths"]["colmap_input"]),
         normalize_path(cfg["paths"]["colmap_output"]),
-        normalize_path(cfg["paths"]["resources"])
+        normalize_path(cfg["paths"]["resources"]),
+        overrides=recon_cfg,
+        frames_dir=frames_dir,
+        project_dir=project_dir,
+        features_done=features_done,
     )
     if not proj_dir:
         return False
@@ -280,6 +324,7 @@ def run_reconstruction_module(cfg, parent=None):
                     output_ply_path=output_ply,
                     output_stl_path=output_stl,
                 )
+                # meshed.stl já existe e fica em cache; OBJ/GLB saem sob demanda (GET /exportar-malha)
             # Compatibilidade com versões antigas
             compat_ply = os.path.join(dense_dir, "mesh_poisson.ply")
             compat_stl = os.path.join(dense_dir, "mesh_poisson.stl")
@@ -296,27 +341,73 @@ def run_reconstruction_module(cfg, parent=None):
             )
             if created_root:
                 root.destroy()
+    record_result("reconstruction", proj_dir)
+    view_geometry = find_view_geometry(proj_dir)
+    if view_geometry and background_previews_enabled():
+        # Prévia do visualizador 3D do histórico, uma vez por reconstrução (interface ou pool de
+        # trabalho; em um subprocesso ela fica para o histórico, sob demanda)
+        preview_in_background(view_geometry, **preview_options(cfg))
     return True
 
 
 def run_full_module(cfg):
-    if not run_opencv_module(cfg):
-        return False
-    if not run_reconstruction_module(cfg):
-        return False
+    recon_cfg = cfg.get("parameters", {}).get("reconstruction", {})
+    if recon_cfg.get("streaming_features"):
+        if not _run_streaming_extraction_and_reconstruction(cfg, recon_cfg):
+            return False
+    else:
+        if not run_opencv_module(cfg):
+            return False
+        if not run_reconstruction_module(cfg):
+            return False
     run_volume_module(cfg)
     return True
 
 
-def _pick_segment_points(mesh_path):
+# Extração de frames e de features em paralelo: cada lote de frames gravados já vai para o COLMAP.
+def _run_streaming_extraction_and_reconstruction(cfg, recon_cfg):
+    from src.reconstruction import StreamingFeatureExtractor, configurar_logging, obter_pasta_reconstrucao
+
+    proj_dir = obter_pasta_reconstrucao(normalize_path(cfg["paths"]["colmap_output"]))
+    if not proj_dir:
+        return False
+    configurar_logging(proj_dir)
+    streamer = StreamingFeatureExtractor(
+        proj_dir,
+        normalize_path(cfg["paths"]["resources"]),
+        overrides=recon_cfg,
+        batch_size=recon_cfg.get("streaming_batch_size", 25),
+    )
+    frames_dir = run_opencv_module(cfg, frame_callback=streamer.add)
+    try:
+        streamer.close()
+    except Exception as e:
+        root, created_root = _get_parent_root()
+        messagebox.showerror("Erro", f"Falha na extração de features em streaming:\n{e}", parent=root)
+        if created_root:
+            root.destroy()
+        return False
+    if not frames_dir or streamer.images_done == 0:
+        return False
+    return run_reconstruction_module(cfg, frames_dir=frames_dir, project_dir=proj_dir, features_done=True)
+
+
+# Pontos exibidos no seletor de segmento; a seleção é resolvida na nuvem completa (KD-tree)
+PICK_DISPLAY_POINTS = 300_000
+
+
+def _pick_segment_points(mesh_path, max_display_points=PICK_DISPLAY_POINTS):
+    import numpy as np
     import open3d as o3d
     import trimesh
+    from scipy.spatial import cKDTree
+    from src.geometry_cache import load_trimesh, read_point_cloud, read_triangle_mesh
+    from src.processing import downsample_for_display, snap_to_full_resolution
 
     o3d.utility.set_verbosity_level(o3d.utility.VerbosityLevel.Error)
 
-    mesh = o3d.io.read_triangle_mesh(mesh_path, enable_post_processing=True)
+    mesh = read_triangle_mesh(mesh_path)
     if not mesh.is_empty() and len(mesh.vertices) > 0:
-        mesh.compute_vertex_normals()
         pcd = o3d.geometry.PointCloud()
         pcd.points = mesh.vertices
         if len(mesh.vertex_colors) > 0:
@@ -324,9 +415,9 @@ def _pick_segment_points(mesh_path):
         else:
             pcd.paint_uniform_color([0.7, 0.7, 0.7])
     else:
-        pcd = o3d.io.read_point_cloud(mesh_path)
+        pcd = read_point_cloud(mesh_path)
         if pcd.is_empty():
-            tm = trimesh.load(mesh_path, force="mesh")
+            tm = load_trimesh(mesh_path)
             if isinstance(tm, trimesh.Scene):
                 geometries = list(tm.geometry.values())
                 if not geometries:
@@ -355,17 +446,27 @@ def _pick_segment_points(mesh_path):
         display_scale = min_display_diag / diag
     display_center = points.mean(axis=0)
 
-    display_points = points.copy()
+    # Exibição: nuvem reduzida por voxel (janela leve); precisão: KD-tree da nuvem completa,
+    # construída uma vez, que leva cada seleção ao ponto original sob a mira.
+    full_tree = cKDTree(points)
+    display_pcd, display_voxel = downsample_for_display(pcd, max_points=max_display_points)
+    if display_pcd is pcd:
+        display_pcd = o3d.geometry.PointCloud(pcd)  # a nuvem em cache não é alterada
+    if display_voxel > 0:
+        print(f"[PICK] Exibindo {len(display_pcd.points)} de {len(points)} pontos "
+              f"(voxel {display_voxel:.6g}); seleção na resolução completa.")
     if display_scale != 1.0:
-        display_points = (display_points - display_center) * display_scale
-
-    display_pcd = o3d.geometry.PointCloud()
-    display_pcd.points = o3d.utility.Vector3dVector(display_points)
-    if pcd.has_colors():
-        display_pcd.colors = pcd.colors
-    else:
+        display_pcd.translate(-display_center)
+        display_pcd.scale(display_scale, center=(0.0, 0.0, 0.0))
+    if not display_pcd.has_colors():
         display_pcd.paint_uniform_color([0.7, 0.7, 0.7])
 
+    def _to_display(point):
+        return (point - display_center) * display_scale if display_scale != 1.0 else point
+
+    def _to_original(point):
+        return point / display_scale + display_center if display_scale != 1.0 else point
+
     points_disp = np.asarray(display_pcd.points, dtype=float)
     # Otimizacao: usar uma amostra para picking/guia quando a nuvem eh muito grande.
     max_pick_points = 120000
@@ -428,7 +529,7 @@ def _pick_segment_points(mesh_path):
         if float(dists[local_i]) > pick_max_dist:
             return None
         idx = int(idxs[local_i])
-        return idx, pick_points[idx]
+        return idx, pick_points[idx], cam_origin, dir_world
 
     def _add_marker(vis, point, color):
         marker = o3d.geometry.TriangleMesh.create_sphere(radius=marker_radius)
@@ -444,13 +545,22 @@ def _pick_segment_points(mesh_path):
         if picked is None:
             print("[PICK] Nenhum ponto valido. Aproxime com zoom e tente novamente.")
             return False
-        _, point = picked
+        _, point, cam_origin, dir_world = picked
         if len(state["picked"]) >= 2:
             print("[PICK] Ja existem 2 pontos. Use Backspace para remover o ultimo.")
             return False
-        state["picked"].append(point)
+        # Ponto exibido -> ponto original mais próximo do raio, na vizinhança do voxel
+        _, full_point = snap_to_full_resolution(
+            full_tree,
+            points,
+            _to_original(point),
+            radius=display_voxel,
+            ray_origin=_to_original(cam_origin),
+            ray_dir=dir_world,
+        )
+        state["picked"].append(full_point)
         color = [1.0, 0.2, 0.2] if len(state["picked"]) == 1 else [0.2, 1.0, 0.2]
-        _add_marker(vis, point, color)
+        _add_marker(vis, _to_display(full_point), color)
         print(f"[PICK] Ponto {len(state['picked'])} marcado.")
         return False
 
@@ -466,7 +576,7 @@ def _pick_segment_points(mesh_path):
         if picked is None:
             return False
 
-        _, point = picked
+        point = picked[1]
         if state["center_marker"] is None:
             center_marker = o3d.geometry.TriangleMesh.create_sphere(radius=marker_radius * 0.9)
             center_marker.compute_vertex_normals()
@@ -564,37 +674,16 @@ def _pick_segment_points(mesh_path):
     if len(state["picked"]) < 2:
         raise ValueError("Selecione 2 pontos (tecla C no centro da tela).")
 
+    # Pontos já no espaço original e na resolução completa
     p1 = np.asarray(state["picked"][0], dtype=float)
     p2 = np.asarray(state["picked"][1], dtype=float)
-    if display_scale != 1.0:
-        p1 = (p1 / display_scale) + display_center
-        p2 = (p2 / display_scale) + display_center
     return p1, p2
 
 
 def _ensure_volume_mesh(mesh_path):
-    import open3d as o3d
+    from src.processing import ensure_volume_mesh
 
-    o3d.utility.set_verbosity_level(o3d.utility.VerbosityLevel.Error)
-    mesh = o3d.io.read_triangle_mesh(mesh_path, enable_post_processing=True)
-    if not mesh.is_empty() and len(mesh.triangles) > 0 and len(mesh.vertices) > 0:
-        return mesh_path
-
-    pcd = o3d.io.read_point_cloud(mesh_path)
-    if pcd.is_empty():
-        raise ValueError(
-            "Arquivo selecionado sem malha valida e sem nuvem de pontos valida."
-        )
-
-    dense_dir = os.path.dirname(mesh_path)
-    output_ply = os.path.join(dense_dir, "mesh_poisson_from_dense.ply")
-    output_stl = os.path.join(dense_dir, "mesh_poisson_from_dense.stl")
-    generate_mesh_from_dense_point_cloud(
-        dense_ply_path=mesh_path,
-        output_ply_path=output_ply,
-        output_stl_path=output_stl,
-    )
-    return output_ply
+    return ensure_volume_mesh(mesh_path)
 
 
 def _choose_volume_mode(parent):
@@ -702,9 +791,17 @@ def _choose_aruco_mode(parent):
 
 
 def run_volume_module(cfg, parent=None):
+    import numpy as np
+    from src.geometry_cache import configure_geometry_cache
+    from src.processing import compute_a4_scale_from_mesh, compute_segment_scale
+    from src.volume_pipeline import VOLUME_MODES, compute_scaled_volume, detect_aruco_scale
+
     print("\n=== MÓDULO: VOLUME (MALHA) ===", file=sys.stderr)
+    report_progress(stage="volume")
 
     root_master, created_root = _get_parent_root(parent)
+    # Cada arquivo da sessão (malha, nuvem, fused.ply) é lido do disco uma única vez
+    configure_geometry_cache((cfg.get("parameters", {}).get("geometry_cache") or {}).get("max_mb"))
 
     base_recon = cfg.get("paths", {}).get("colmap_output", "./data/out/reconstructions")
     mesh_path = selecionar_arquivo_malha(base_recon)
@@ -842,18 +939,7 @@ def run_volume_module(cfg, parent=None):
                 }
             else:
                 try:
-                    aruco_result = compute_aruco_scale_from_mesh(
-                        mesh_path=scale_geometry_path,
-                        real_marker_size=aruco_size * 10.0,
-                        input_unit="mm",
-                        aruco_dict=[
-                            "DICT_4X4_50",
-                            "DICT_4X4_100",
-                            "DICT_4X4_250",
-                            "DICT_4X4_1000",
-                        ],
-                        aruco_id=0,
-                    )
+                    aruco_result = detect_aruco_scale(scale_geometry_path, aruco_size)
                 except Exception as e:
                     retry = messagebox.askyesno(
                         "ArUco nao detectado",
@@ -945,26 +1031,8 @@ def run_volume_module(cfg, parent=None):
             root_master.destroy()
         return None
 
-    if choice == "auto":
-        volume_mode = "auto"
-        volume_method = "auto"
-        primitive_fit = True
-    elif choice == "regular":
-        volume_mode = "regular"
-        volume_method = "auto"
-        primitive_fit = True
-    elif choice == "heightmap":
-        volume_mode = "heightmap"
-        volume_method = "heightmap"
-        primitive_fit = False
-    elif choice == "bean_color":
-        volume_mode = "bean_color"
-        volume_method = "heightmap_color"
-        primitive_fit = False
-    else:
-        volume_mode = "mesh"
-        volume_method = "auto"
-        primitive_fit = False
+    volume_mode = choice if choice in VOLUME_MODES else "mesh"
+    volume_method, primitive_fit = VOLUME_MODES[volume_mode]
 
     volumes_output = cfg.get("paths", {}).get("volumes_output", "./data/out/volumes")
     volumes_output = normalize_path(volumes_output)
@@ -973,128 +1041,51 @@ def run_volume_module(cfg, parent=None):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     export_stl = os.path.join(volumes_output, f"mesh_escalada_{timestamp}.stl")
 
-    if volume_method == "heightmap_color":
-        try:
-            color_cfg = cfg.get("parameters", {}).get("bean_color", {})
-            hsv_target = tuple(color_cfg.get("hsv_target", [175, 155, 79]))
-            hsv_tolerance = tuple(color_cfg.get("hsv_tolerance", [12, 80, 80]))
-            hsv_profiles = _extract_hsv_profiles_from_config(color_cfg)
-            detection_cfg = color_cfg.get("detection", {})
-            heightmap_cfg = color_cfg.get("heightmap", {})
-
-            if scale_mode == "aruco" and aruco_result:
-                scale_value = float(aruco_result["scale"])
-            elif scale_mode == "a4" and a4_result:
-                scale_value = float(a4_result["scale"])
-            else:
-                scale_value = float(
-                    compute_segment_scale(
-                        p1=np.asarray(segment_result["p1"], dtype=float),
-                        p2=np.asarray(segment_result["p2"], dtype=float),
-                        real_distance=float(segment_result["real_distance_m"]),
-                    )
-                )
-
-            recon_dir = os.path.dirname(mesh_path)
-            recon_dir = os.path.dirname(recon_dir)
-            pcd, source = _load_colored_point_cloud_from_recon(recon_dir)
-            volume_m3, meta = compute_bean_volume_from_point_cloud(
-                pcd=pcd,
-                scale=scale_value,
-                hsv_target=hsv_target,
-                hsv_tolerance=hsv_tolerance,
-                hsv_profiles=hsv_profiles,
-                detection_cfg=detection_cfg,
-                heightmap_cfg=heightmap_cfg,
-            )
-            meta["source_path"] = normalize_path(source)
-            result = {
-                "volume": volume_m3,
-                "unit": "m3",
-                "method": "heightmap_color",
-                "scale": scale_value,
-                "heightmap": meta,
-            }
-        except Exception as e:
-            messagebox.showerror(
-                "Erro na segmentacao por cor",
-                f"Nao foi possivel calcular somente o feijao por cor:\n{e}",
-                parent=root_master
+    if scale_mode == "aruco" and aruco_result:
+        scale_value = float(aruco_result["scale"])
+    elif scale_mode == "a4" and a4_result:
+        scale_value = float(a4_result["scale"])
+    else:
+        scale_value = float(
+            compute_segment_scale(
+                p1=np.asarray(segment_result["p1"], dtype=float),
+                p2=np.asarray(segment_result["p2"], dtype=float),
+                real_distance=float(segment_result["real_distance_m"]),
             )
-            if created_root:
-                root_master.destroy()
-            return None
-    elif scale_mode == "aruco" and aruco_result:
-        if not ensure_volume_mesh_path():
-            if created_root:
-                root_master.destroy()
-            return None
-        result = compute_volume_from_mesh(
-            mesh_path=volume_mesh_path,
-            scale=aruco_result["scale"],
-            output_unit="m3",
-            volume_method=volume_method,
-            primitive_fit=primitive_fit,
-            export_stl_path=export_stl
         )
-    elif scale_mode == "a4" and a4_result:
-        result = None
-        if volume_method == "heightmap":
-            try:
-                color_cfg_a4 = cfg.get("parameters", {}).get("bean_color", {})
-                hsv_profiles_a4 = _extract_hsv_profiles_from_config(color_cfg_a4)
-                detection_cfg_a4 = color_cfg_a4.get("detection", {})
-                heightmap_cfg_a4 = color_cfg_a4.get("heightmap", {})
-                recon_dir = os.path.dirname(mesh_path)
-                recon_dir = os.path.dirname(recon_dir)
-                pcd, source = _load_colored_point_cloud_from_recon(recon_dir)
-                volume_m3, meta = compute_bean_volume_from_point_cloud(
-                    pcd=pcd,
-                    scale=a4_result["scale"],
-                    hsv_profiles=hsv_profiles_a4,
-                    detection_cfg=detection_cfg_a4,
-                    heightmap_cfg=heightmap_cfg_a4,
-                )
-                meta["source_path"] = normalize_path(source)
-                result = {
-                    "volume": volume_m3,
-                    "unit": "m3",
-                    "method": "heightmap_color",
-                    "scale": float(a4_result["scale"]),
-                    "heightmap": meta,
-                }
-            except Exception:
-                result = None
 
-        if result is None:
-            if not ensure_volume_mesh_path():
-                if created_root:
-                    root_master.destroy()
-                return None
-            result = compute_volume_from_mesh(
-                mesh_path=volume_mesh_path,
-                scale=a4_result["scale"],
-                output_unit="m3",
-                volume_method=volume_method,
-                primitive_fit=primitive_fit,
-                export_stl_path=export_stl
-            )
-    else:
-        if not ensure_volume_mesh_path():
-            if created_root:
-                root_master.destroy()
-            return None
-        result = compute_volume_from_mesh(
-            mesh_path=volume_mesh_path,
-            segment_p1=segment_result["p1"],
-            segment_p2=segment_result["p2"],
-            real_distance=segment_result["real_distance_m"],
-            input_unit="m",
-            output_unit="m3",
+    def prepare_volume_mesh(_path):
+        return volume_mesh_path if ensure_volume_mesh_path() else None
+
+    try:
+        # A4 + método por altura: feijão por cor, com a malha como alternativa
+        result, _ = compute_scaled_volume(
+            mesh_path=mesh_path,
+            recon_dir=os.path.dirname(os.path.dirname(mesh_path)),
+            scale=scale_value,
             volume_method=volume_method,
             primitive_fit=primitive_fit,
-            export_stl_path=export_stl
+            bean_color_cfg=cfg.get("parameters", {}).get("bean_color", {}),
+            color_first=scale_mode == "a4" and bool(a4_result) and volume_method == "heightmap",
+            prepare_mesh=prepare_volume_mesh,
+            export_stl_path=export_stl,
+            return_grid=True,
         )
+    except Exception as e:
+        if volume_method != "heightmap_color":
+            raise
+        messagebox.showerror(
+            "Erro na segmentacao por cor",
+            f"Nao foi possivel calcular somente o feijao por cor:\n{e}",
+            parent=root_master
+        )
+        if created_root:
+            root_master.destroy()
+        return None
+    if result is None:
+        if created_root:
+            root_master.destroy()
+        return None
 
     if volume_mode == "regular" and not result.get("method", "").startswith("primitive_"):
         fallback = messagebox.askyesno(
@@ -1180,7 +1171,12 @@ def run_volume_module(cfg, parent=None):
         }
     }
     if "heightmap" in result:
-        result_payload["heightmap"] = result["heightmap"]
+        heightmap_meta = dict(result["heightmap"])
+        height_grid = heightmap_meta.pop("height_grid", None)
+        result_payload["heightmap"] = heightmap_meta
+        if height_grid is not None:
+            # Grade de alturas (mmap) para reintegrar sem refazer o pipeline
+            result_payload["height_grid"] = normalize_path(height_grid.save(volumes_output, timestamp))
     if "primitive_fit" in result:
         result_payload["primitive_fit"] = result["primitive_fit"]
     if scale_mode == "aruco" and aruco_result:
@@ -1287,6 +1283,8 @@ def run_volume_module(cfg, parent=None):
             f"- Tamanho da célula: **{hm['grid_size']:.6f} m**",
             f"- Pontos acima do plano: **{hm['points_used']}**",
         ]
+        if "height_grid" in result_payload:
+            md_lines.append(f"- Grade de alturas: `{result_payload['height_grid']}`")
     if "primitive_fit" in result_payload:
         pf = result_payload["primitive_fit"]
         md_lines += [
@@ -1316,6 +1314,7 @@ def run_volume_module(cfg, parent=None):
         f.write("\n".join(md_lines))
 
     result_payload["report_md"] = normalize_path(report_file)
+    record_result("volume", result_file)
 
     summary = result_payload["summary"]
     msg = (
@@ -1345,6 +1344,27 @@ def run_volume_module(cfg, parent=None):
     return result_payload
 
 
-
-
-
+# Tarefas disparadas pelas rotas do Flask (task_runner.py, volume_gui.py ou pool de processos)
+BACKEND_TASKS = {
+    "calibration": run_calibration_module,
+    "extraction": run_opencv_module,
+    "reconstruction": run_reconstruction_module,
+    "full": run_full_module,
+    "volume": run_volume_module,
+}
+
+
+def run_backend_task(task):
+    """
+    Executa um módulo pelo nome, relendo o config.yaml a cada chamada (processos persistentes
+    veem as alterações). Retorna o resultado do volume, {"status": "ok", "task"} para os demais
+    ou None quando o usuário cancela.
+    """
+    if task not in BACKEND_TASKS:
+        raise ValueError(f"Tarefa desconhecida: {task}")
+    result = BACKEND_TASKS[task](load_config())
+    if not result:
+        return None
+    if task == "volume":
+        return result
+    return {"status": "ok", "task": task}
@@ -1,9 +1,16 @@
 import cv2
+import hashlib
+import json
 import numpy as np
 import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+from src.task_jobs import report_progress
+
 
 # Extrai o frame do video
 def get_video_frame_rate(video_capture_or_path):
@@ -18,82 +25,779 @@ def get_video_frame_rate(video_capture_or_path):
         return video_capture_or_path.get(cv2.CAP_PROP_FPS)
 
 
-# Controla o fluxo da extração e salvamento de frames
-def save_video_frames_fps(video_path, output_dir, desired_fps):
-    """Salva frames do vídeo na pasta enviada pelo main, com barra de progresso e aviso final em Tkinter."""
+def decoded_frame_size(cap):
+    """
+    (largura, altura) dos frames como o OpenCV os entrega. Em vídeos com rotação nos metadados
+    CAP_PROP_FRAME_WIDTH/HEIGHT descrevem o quadro sem rotação; por isso lê o primeiro frame e
+    volta à posição inicial. Sem frame legível, usa as propriedades do contêiner.
+    """
+    position = cap.get(cv2.CAP_PROP_POS_FRAMES)
+    ok, frame = cap.read()
+    cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+    if ok and frame is not None:
+        return int(frame.shape[1]), int(frame.shape[0])
+    return int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+
+# Motores de leitura: "read" decodifica todos os frames, "grab" só decodifica os escolhidos
+# (grab() avança sem retrieve) e "seek" salta direto para o frame escolhido.
+EXTRACTION_ENGINES = ("auto", "read", "grab", "seek")
+
+
+def keyframe_interval_estimate(fps):
+    """Intervalo típico entre keyframes (GOP) de câmeras e celulares: ~2 s de vídeo."""
+    return max(1, int(round((fps or 30.0) * 2)))
+
+
+def choose_extraction_engine(rate, fps):
+    """
+    Escolhe o motor mais barato pela razão de amostragem. O seek volta ao keyframe anterior e
+    decodifica até o alvo, então só compensa quando o salto é maior que um GOP.
+    """
+    if rate <= 1:
+        return "read"
+    if rate > keyframe_interval_estimate(fps):
+        return "seek"
+    return "grab"
+
+
+def iter_sampled_frames(cap, rate, engine="auto", start_frame=0, end_frame=None):
+    """
+    Gera (índice, frame) para um frame a cada `rate`, a partir de `start_frame` (índices
+    absolutos do vídeo; só são entregues índices múltiplos de `rate`).
+    """
+    rate = max(1, int(rate))
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    end_frame = total if end_frame is None or (total > 0 and end_frame > total) else end_frame
+    if engine == "auto":
+        engine = choose_extraction_engine(rate, get_video_frame_rate(cap))
+    if engine not in EXTRACTION_ENGINES:
+        raise ValueError(f"Motor de extração inválido: {engine}")
+
+    first = ((start_frame + rate - 1) // rate) * rate
+    if start_frame > 0 or engine == "seek":
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first if engine == "seek" else start_frame)
+    position = first if engine == "seek" else start_frame
+    seek_threshold = keyframe_interval_estimate(get_video_frame_rate(cap))
+
+    target = first
+    while end_frame <= 0 or target < end_frame:
+        if engine == "seek" and target - position > seek_threshold:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            position = target
+        # Avança até o alvo sem decodificar ("grab"/"seek") ou decodificando ("read")
+        while position < target:
+            ok = cap.grab() if engine != "read" else cap.read()[0]
+            if not ok:
+                return
+            position += 1
+        ok, frame = cap.read()
+        if not ok:
+            return
+        position += 1
+        yield target, frame
+        target += rate
+
+
+# Formatos de saída dos frames e seus parâmetros de qualidade no cv2.imwrite
+IMAGE_FORMATS = {"png": ".png", "jpg": ".jpg", "jpeg": ".jpg", "webp": ".webp"}
+
+
+def image_write_params(image_format="png", png_compression=3, jpeg_quality=95, webp_quality=95):
+    """Extensão e parâmetros do cv2.imwrite para o formato escolhido."""
+    fmt = str(image_format).lower().lstrip(".")
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"Formato de imagem inválido: {image_format} (use png, jpg ou webp)")
+    if fmt == "png":
+        params = [cv2.IMWRITE_PNG_COMPRESSION, int(png_compression)]
+    elif fmt == "webp":
+        params = [cv2.IMWRITE_WEBP_QUALITY, int(webp_quality)]
+    else:
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]
+    return IMAGE_FORMATS[fmt], params
+
+
+def resize_to_long_side(frame, max_long_side):
+    """Reduz o frame para que o maior lado tenha `max_long_side` px (nunca amplia)."""
+    height, width = frame.shape[:2]
+    long_side = max(height, width)
+    if not max_long_side or long_side <= max_long_side:
+        return frame
+    scale = max_long_side / float(long_side)
+    size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+
+def load_calibration(path):
+    """Lê o .npz da calibração: (mtx, dist, image_size ou None)."""
+    with np.load(path) as data:
+        mtx = np.asarray(data["mtx"], dtype=np.float64)
+        dist = np.asarray(data["dist"], dtype=np.float64).ravel()
+        image_size = tuple(int(v) for v in data["image_size"]) if "image_size" in data else None
+    return mtx, dist, image_size
+
+
+class FrameTransform:
+    """
+    Remoção de distorção (calibração .npz) e redução para `max_long_side`, aplicadas a cada frame.
+    Com calibração, as tabelas de initUndistortRectifyMap são calculadas uma vez por resolução
+    (e já na resolução de saída, então distorção e redução saem de um único remap).
+    """
+
+    def __init__(self, max_long_side=0, calibration_file=None):
+        self.max_long_side = int(max_long_side or 0)
+        self.calibration = load_calibration(calibration_file) if calibration_file else None
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def output_size(self, width, height):
+        long_side = max(width, height)
+        if not self.max_long_side or long_side <= self.max_long_side:
+            return width, height
+        scale = self.max_long_side / float(long_side)
+        return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+    def _source_matrix(self, width, height):
+        mtx, _, image_size = self.calibration
+        mtx = mtx.copy()
+        if image_size and tuple(image_size) != (width, height):
+            # Mesma câmera em outra resolução: intrínsecos escalam com a imagem
+            mtx[0] *= width / float(image_size[0])
+            mtx[1] *= height / float(image_size[1])
+        return mtx
+
+    def _maps_for(self, width, height):
+        key = (width, height)
+        with self._lock:
+            cached = self._maps.get(key)
+            if cached is None:
+                mtx = self._source_matrix(width, height)
+                dist = self.calibration[1]
+                new_mtx, _ = cv2.getOptimalNewCameraMatrix(mtx, dist, (width, height), 0, (width, height))
+                out_w, out_h = self.output_size(width, height)
+                new_mtx[0] *= out_w / float(width)
+                new_mtx[1] *= out_h / float(height)
+                map1, map2 = cv2.initUndistortRectifyMap(mtx, dist, None, new_mtx, (out_w, out_h), cv2.CV_16SC2)
+                cached = (map1, map2, new_mtx)
+                self._maps[key] = cached
+            return cached
+
+    def intrinsics(self, width, height):
+        """Câmera PINHOLE dos frames gravados (None sem calibração)."""
+        if self.calibration is None:
+            return None
+        new_mtx = self._maps_for(width, height)[2]
+        out_w, out_h = self.output_size(width, height)
+        return {
+            "model": "PINHOLE",
+            "width": out_w,
+            "height": out_h,
+            "params": [float(new_mtx[0, 0]), float(new_mtx[1, 1]), float(new_mtx[0, 2]), float(new_mtx[1, 2])],
+        }
+
+    def __call__(self, frame):
+        height, width = frame.shape[:2]
+        if self.calibration is None:
+            return resize_to_long_side(frame, self.max_long_side)
+        map1, map2, _ = self._maps_for(width, height)
+        return cv2.remap(frame, map1, map2, cv2.INTER_LINEAR)
+
+
+CAMERA_INTRINSICS_FILE = "camera_intrinsics.json"
+
+
+def write_camera_intrinsics(output_dir, intrinsics):
+    with open(os.path.join(output_dir, CAMERA_INTRINSICS_FILE), "w", encoding="utf-8") as f:
+        json.dump(intrinsics, f, indent=2)
+
+
+def read_camera_intrinsics(frames_dir):
+    """Intrínsecos PINHOLE gravados pela extração com calibração (None se não houver)."""
+    path = os.path.join(frames_dir, CAMERA_INTRINSICS_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_frame_transform(max_long_side=0, calibration_file=None):
+    """Transformação aplicada a cada frame antes de gravar (None quando não há nada a fazer)."""
+    if not max_long_side and not calibration_file:
+        return None
+    return FrameTransform(max_long_side, calibration_file)
+
+
+def frame_sharpness(frame, analysis_width=640):
+    """Nitidez do frame: variância do Laplaciano em tons de cinza (reduzido para `analysis_width` px)."""
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    gray = resize_to_long_side(gray, analysis_width)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def encode_frame(path, frame, params):
+    """Codifica e grava o frame; devolve a entrada do manifesto (arquivo, nitidez e sha1 dos bytes gravados)."""
+    ok, buffer = cv2.imencode(os.path.splitext(path)[1], frame, params)
+    if not ok:
+        raise IOError(f"Falha ao gravar o frame: {path}")
+    data = buffer.tobytes()
+    with open(path, "wb") as f:
+        f.write(data)
+    return {
+        "file": os.path.basename(path),
+        "sharpness": round(frame_sharpness(frame), 3),
+        "sha1": hashlib.sha1(data).hexdigest(),
+    }
+
+
+FRAME_MANIFEST_FILE = "frames_manifest.jsonl"
+FRAME_MANIFEST_VERSION = 1
+
+
+def video_fingerprint(video_path, cap):
+    """Identifica o vídeo de origem: caminho, tamanho, data de modificação, fps e total de frames."""
+    stat = os.stat(video_path)
+    return {
+        "video": os.path.abspath(video_path),
+        "video_bytes": stat.st_size,
+        "video_mtime": stat.st_mtime,
+        "fps": get_video_frame_rate(cap),
+        "total_frames": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+    }
+
+
+def read_frame_manifest(frames_dir):
+    """
+    Lê o manifesto da extração: (cabeçalho, entradas ordenadas por frame_index) ou None.
+    Uma linha truncada (extração interrompida durante a escrita) é ignorada.
+    """
+    path = os.path.join(frames_dir, FRAME_MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    header = None
+    entries = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if header is None:
+                header = record
+            else:
+                entries[record["frame_index"]] = record
+    if header is None or header.get("version") != FRAME_MANIFEST_VERSION:
+        return None
+    return header, [entries[index] for index in sorted(entries)]
+
+
+def manifest_image_stats(frames_dir):
+    """Quantidade e resolução dos frames pelo manifesto, sem abrir as imagens (None sem manifesto)."""
+    manifest = read_frame_manifest(frames_dir)
+    if manifest is None:
+        return None
+    header, entries = manifest
+    return {"count": len(entries), "width": int(header.get("width") or 0), "height": int(header.get("height") or 0)}
+
+
+def expected_frame_count(frames_dir):
+    """
+    Total de frames que a extração vai gravar, pelo cabeçalho do manifesto (total de frames do
+    vídeo / taxa de amostragem). None sem manifesto ou com amostragem por movimento (imprevisível).
+    """
+    manifest = read_frame_manifest(frames_dir)
+    if manifest is None:
+        return None
+    header = manifest[0]
+    total, rate = int(header.get("total_frames") or 0), int(header.get("rate") or 1)
+    if header.get("sampling") != "fixed" or total <= 0:
+        return None
+    return -(-total // max(1, rate))
+
+
+class FrameManifest:
+    """
+    Manifesto JSONL (frames_manifest.jsonl) escrito durante a extração: a primeira linha descreve o
+    vídeo e as opções; cada linha seguinte, um frame gravado (frame_index, timestamp_s, sharpness, sha1).
+    As entradas são anexadas assim que o frame termina de ser gravado, então uma extração
+    interrompida deixa no disco exatamente os frames concluídos. `entries` (retomada) são
+    reescritas logo após o cabeçalho.
+    """
+
+    def __init__(self, output_dir, header, entries=()):
+        self.path = os.path.join(output_dir, FRAME_MANIFEST_FILE)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in [header, *entries]:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def append(self, entry):
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class FrameWriter:
+    """
+    Codifica e grava frames em threads (cv2.imwrite libera o GIL) enquanto a decodificação
+    continua. No máximo `max_pending` frames ficam em memória: `submit` bloqueia quando a
+    fila enche. `on_written(caminho)` é chamado após cada gravação, na thread do writer, e
+    `on_saved(entrada)` recebe a entrada do manifesto (encode_frame + `meta` do submit).
+    `transform(frame)` (ex.: redimensionamento) roda na mesma thread, antes da codificação.
+    """
 
-    # 1. Validação inicial do vídeo
+    def __init__(self, workers=4, max_pending=16, params=None, on_written=None, transform=None,
+                 on_saved=None):
+        self.params = list(params or [])
+        self.on_written = on_written
+        self.on_saved = on_saved
+        self.transform = transform
+        self._slots = threading.BoundedSemaphore(max(1, int(max_pending)))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="frame-writer")
+        self._error = None
+        self.written = 0
+        self._lock = threading.Lock()
+
+    def submit(self, path, frame, meta=None):
+        if self._error is not None:
+            raise self._error
+        self._slots.acquire()  # contrapressão: espera um frame terminar de ser gravado
+        try:
+            self._executor.submit(self._write, path, frame, meta)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _write(self, path, frame, meta=None):
+        try:
+            if self.transform is not None:
+                frame = self.transform(frame)
+            entry = encode_frame(path, frame, self.params)
+            entry.update(meta or {})
+            with self._lock:
+                self.written += 1
+            if self.on_saved is not None:
+                self.on_saved(entry)
+            if self.on_written is not None:
+                self.on_written(path)
+        except Exception as e:
+            self._error = self._error or e
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Espera as gravações pendentes e propaga o primeiro erro."""
+        self._executor.shutdown(wait=True)
+        if self._error is not None:
+            raise self._error
+        return self.written
+
+
+def motion_between(prev_gray, gray):
+    """Deslocamento mediano (fração da largura) entre dois frames reduzidos, via fluxo óptico."""
+    flow = cv2.calcOpticalFlowFarneback(prev_gray, gray, None, 0.5, 3, 15, 3, 5, 1.2, 0)
+    magnitude = np.sqrt(flow[..., 0] ** 2 + flow[..., 1] ** 2)
+    return float(np.median(magnitude)) / gray.shape[1]
+
+
+def iter_motion_frames(cap, motion_threshold=0.1, probe_fps=10.0, min_gap_s=0.1, max_gap_s=2.0,
+                       analysis_width=160, start_frame=0):
+    """
+    Amostragem adaptativa ao movimento: analisa ~`probe_fps` frames por segundo (reduzidos para
+    `analysis_width` px) e entrega (índice, frame) quando o movimento acumulado desde o último
+    frame entregue passa de `motion_threshold` (fração da largura). `max_gap_s` força um frame
+    mesmo parado; `min_gap_s` evita frames colados em movimentos bruscos.
+    `start_frame` (retomada) começa a análise nesse frame, que é o primeiro entregue.
+    """
+    fps = get_video_frame_rate(cap) or 30.0
+    probe_step = max(1, int(round(fps / probe_fps)))
+    min_gap = max(1, int(round(min_gap_s * fps)))
+    max_gap = max(min_gap, int(round(max_gap_s * fps)))
+
+    prev_gray = None
+    accumulated = 0.0
+    last_emitted = None
+    position = max(0, int(start_frame))
+    if position > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            return
+        index = position
+        position += 1
+
+        height, width = frame.shape[:2]
+        scale = analysis_width / float(width)
+        small = cv2.resize(frame, (analysis_width, max(1, int(round(height * scale)))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        if prev_gray is not None:
+            accumulated += motion_between(prev_gray, gray)
+        prev_gray = gray
+
+        gap = None if last_emitted is None else index - last_emitted
+        if gap is None or (gap >= min_gap and (accumulated >= motion_threshold or gap >= max_gap)):
+            last_emitted = index
+            accumulated = 0.0
+            yield index, frame
+
+        # Frames entre sondagens não são decodificados
+        for _ in range(probe_step - 1):
+            if not cap.grab():
+                return
+            position += 1
+
+
+def frame_filename(nome_projeto, frame_index, rate, extensao):
+    """Nome do frame amostrado: numeração global (índice // rate + 1), igual à extração sequencial."""
+    return f"{nome_projeto}_{frame_index // rate + 1:03d}{extensao}"
+
+
+def split_video_segments(total_frames, rate, segments, start_frame=0):
+    """
+    Divide [start_frame, total_frames) em faixas alinhadas a `rate` (`start_frame` deve ser múltiplo
+    de `rate`); a última vai até o fim do vídeo (None).
+    """
+    samples = max(1, -(-(int(total_frames) - start_frame) // rate))
+    segments = max(1, min(int(segments), samples))
+    bounds = [start_frame + round(i * samples / segments) * rate for i in range(segments + 1)]
+    return [(bounds[i], bounds[i + 1] if i < segments - 1 else None) for i in range(segments)]
+
+
+def extract_video_segment(task):
+    """
+    Processo de trabalho: decodifica uma faixa do vídeo e grava os frames amostrados.
+    Retorna as entradas do manifesto dos frames gravados; índices em `task["skip"]` (já extraídos)
+    são pulados.
+    """
+    cap = cv2.VideoCapture(task["video_path"])
+    transform = build_frame_transform(**task.get("transform", {}))
+    fps = task.get("fps") or get_video_frame_rate(cap) or 30.0
+    skip = set(task.get("skip", ()))
+    entries = []
+    try:
+        for frame_index, frame in iter_sampled_frames(
+                cap, task["rate"], task["engine"], task["start"], task["end"]):
+            if frame_index in skip:
+                continue
+            path = os.path.join(
+                task["output_dir"],
+                frame_filename(task["nome_projeto"], frame_index, task["rate"], task["extensao"]),
+            )
+            if transform is not None:
+                frame = transform(frame)
+            entry = encode_frame(path, frame, task["params"])
+            entry.update({"frame_index": frame_index, "timestamp_s": round(frame_index / fps, 4)})
+            entries.append(entry)
+    finally:
+        cap.release()
+    return entries
+
+
+def start_parallel_extraction(video_path, output_dir, rate, total_frames, workers, engine="auto",
+                              extensao=".png", params=None, segments_per_worker=4, transform=None,
+                              start_frame=0, skip=(), fps=None):
+    """
+    Agenda a decodificação em processos, cada um com sua faixa de tempo (seek até o início).
+    Retorna (executor, futures); cada future devolve as entradas do manifesto gravadas pela faixa.
+    `transform`: kwargs de build_frame_transform, reconstruída em cada processo.
+    Retomada: as faixas começam em `start_frame` e os índices de `skip` não são regravados.
+    """
+    skip = sorted(skip)
+    nome_projeto = os.path.basename(os.path.normpath(output_dir))
+    executor = ProcessPoolExecutor(max_workers=max(1, int(workers)))
+    futures = [
+        executor.submit(extract_video_segment, {
+            "video_path": video_path,
+            "output_dir": output_dir,
+            "nome_projeto": nome_projeto,
+            "rate": rate,
+            "engine": engine,
+            "start": start,
+            "end": end,
+            "extensao": extensao,
+            "params": list(params or []),
+            "transform": dict(transform or {}),
+            "fps": fps,
+            "skip": [i for i in skip if i >= start and (end is None or i < end)],
+        })
+        for start, end in split_video_segments(total_frames, rate, int(workers) * segments_per_worker, start_frame)
+    ]
+    return executor, futures
+
+
+class VideoOpenError(IOError):
+    pass
+
+
+def iter_extract_frames(video_path, output_dir, desired_fps, frame_callback=None, engine="auto",
+                        image_format="png", png_compression=3, jpeg_quality=95, webp_quality=95,
+                        writer_threads=4, writer_queue=16, decode_workers=1, sampling="fixed",
+                        motion_options=None, max_long_side=0, calibration_file=None, resume=True):
+    """
+    Extração sem interface: gera eventos de progresso (dicts) enquanto grava os frames.
+      {"type": "start", "total_frames", "fps", "rate", "resumed"}
+      {"type": "progress", "frame_index", "total_frames", "saved"}
+      {"type": "done", "saved", "resumed", "output_dir", "elapsed_s"}
+    `frame_callback(caminho)` é chamado a cada frame gravado (ex.: extração de features em streaming).
+    `engine`: "auto", "read", "grab" ou "seek" (ver iter_sampled_frames).
+    Os frames são gravados por um FrameWriter (`writer_threads`, fila de `writer_queue` frames).
+    Com `decode_workers` > 1, faixas do vídeo são decodificadas em processos paralelos; os nomes
+    dos arquivos são os mesmos da extração sequencial.
+    `sampling="motion"` usa iter_motion_frames (`motion_options` repassadas); é sempre sequencial.
+    `max_long_side` > 0 reduz cada frame para esse maior lado antes de gravar (uma única passada).
+    `calibration_file` (.npz de run_calibration_process) remove a distorção de cada frame e grava
+    os intrínsecos PINHOLE resultantes em camera_intrinsics.json, na pasta dos frames.
+    Cada frame gravado entra no manifesto (FrameManifest). Com `resume`, se o manifesto existente
+    tiver o mesmo cabeçalho (vídeo inalterado e mesmas opções), os frames já gravados são mantidos
+    ("resumed"), repassados ao `frame_callback` e a extração continua a partir do primeiro faltante.
+    """
+    if desired_fps <= 0 and sampling != "motion":
+        raise ValueError("desired_fps deve ser maior que zero.")
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
-        root_err = tk.Tk()
-        root_err.withdraw()
-        messagebox.showerror("Erro", f"Não foi possível abrir o arquivo de vídeo em:\n{video_path}")
-        root_err.destroy()
-        return
+        raise VideoOpenError(f"Não foi possível abrir o arquivo de vídeo em:\n{video_path}")
 
+    start_time = time.perf_counter()
     fps_original = get_video_frame_rate(cap)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-
-    # 2. Prepara os caminhos
     nome_projeto = os.path.basename(output_dir)
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-
-    # 3. Lógica de amostragem (FPS)
-    if desired_fps <= 0:
-        return
-
-    rate = max(1, int(fps_original / desired_fps))
-    frame_number = 1
-
-    # JANELA DE PROGRESSO TKINTER
-    root_pg = tk.Tk()
-    root_pg.title("Processando Vídeo")
-    root_pg.geometry("400x150")
-    root_pg.attributes('-topmost', True)
-
-    # Centralizar janela
-    screen_width = root_pg.winfo_screenwidth()
-    screen_height = root_pg.winfo_screenheight()
-    x = (screen_width // 2) - (400 // 2)
-    y = (screen_height // 2) - (150 // 2)
-    root_pg.geometry(f"400x150+{x}+{y}")
-
-    label = tk.Label(root_pg, text=f"Extraindo frames para o projeto:\n{nome_projeto}", pady=10)
-    label.pack()
-
-    progress = ttk.Progressbar(root_pg, orient="horizontal", length=300, mode="determinate")
-    progress.pack(pady=5)
-    progress["maximum"] = total_frames
-
-    label_perc = tk.Label(root_pg, text="0%")
-    label_perc.pack()
-
-    # 4. Extração
-    for cont_frame in range(total_frames):
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        if cont_frame % rate == 0:
-            filename = f"{nome_projeto}_{frame_number:03d}.png"
-            caminho_arquivo = os.path.join(output_dir, filename)
-            cv2.imwrite(caminho_arquivo, frame)
-            frame_number += 1
-
-        # Atualiza a interface a cada 5 frames para performance
-        if cont_frame % 5 == 0:
-            progress["value"] = cont_frame
-            porcentagem = int((cont_frame / total_frames) * 100)
-            label_perc.config(text=f"{porcentagem}%")
-            root_pg.update()
-
-    cap.release()
-    root_pg.destroy()  # Fecha a barra de progresso
+    os.makedirs(output_dir, exist_ok=True)
+
+    # round(): fontes de 29.97 fps a 5 fps usam 1 a cada 6 frames, não 1 a cada 5
+    rate = max(1, int(round(fps_original / desired_fps))) if desired_fps > 0 else 1
+    extensao, write_params = image_write_params(image_format, png_compression, jpeg_quality, webp_quality)
+    transform_options = {"max_long_side": max_long_side, "calibration_file": calibration_file}
+    transform = build_frame_transform(**transform_options)
+    # Tamanho dos frames decodificados (não o do contêiner): é nele que FrameTransform atua,
+    # então intrínsecos e manifesto descrevem as imagens efetivamente gravadas
+    width, height = decoded_frame_size(cap)
+    if calibration_file:
+        # Antes do primeiro frame: a extração de features em streaming já usa a câmera conhecida
+        write_camera_intrinsics(output_dir, transform.intrinsics(width, height))
+
+    out_width, out_height = transform.output_size(width, height) if transform is not None else (width, height)
+    header = {
+        "version": FRAME_MANIFEST_VERSION,
+        **video_fingerprint(video_path, cap),
+        "sampling": "motion" if sampling == "motion" else "fixed",
+        "rate": rate,
+        "motion_options": dict(motion_options or {}) if sampling == "motion" else None,
+        "extension": extensao,
+        "write_params": list(write_params),
+        "transform": {"max_long_side": int(max_long_side or 0),
+                      "calibration_file": os.path.abspath(calibration_file) if calibration_file else None},
+        "width": out_width,
+        "height": out_height,
+    }
+    done = {}
+    anterior = read_frame_manifest(output_dir) if resume else None
+    if anterior is not None and anterior[0] == header:
+        done = {e["frame_index"]: e for e in anterior[1] if os.path.exists(os.path.join(output_dir, e["file"]))}
+        if sampling == "motion":
+            # A numeração é sequencial: só o trecho contínuo desde o primeiro frame é reaproveitado
+            prefixo = {}
+            for numero, entrada in enumerate(done[i] for i in sorted(done)):
+                if entrada["file"] != frame_filename(nome_projeto, numero, 1, extensao):
+                    break
+                prefixo[entrada["frame_index"]] = entrada
+            done = prefixo
+    manifest = FrameManifest(output_dir, header, [done[i] for i in sorted(done)])
+
+    def _meta(frame_index):
+        return {"frame_index": frame_index, "timestamp_s": round(frame_index / (fps_original or 30.0), 4)}
+
+    writer = FrameWriter(writer_threads, writer_queue, write_params, on_written=frame_callback,
+                         transform=transform, on_saved=manifest.append)
+    saved = 0
+    # Primeiro índice amostrado ainda não gravado: ponto de retomada da amostragem fixa
+    proximo = 0
+    while proximo in done:
+        proximo += rate
+
+    yield {"type": "start", "total_frames": total_frames, "fps": fps_original, "rate": rate,
+           "resumed": len(done)}
+    try:
+        if frame_callback is not None:
+            for index in sorted(done):
+                frame_callback(os.path.join(output_dir, done[index]["file"]))
+        # Frames descartados não são decodificados, exceto no motor "read"
+        if sampling == "motion":
+            inicio = max(done) if done else 0
+            numero = len(done)
+            for cont_frame, frame in iter_motion_frames(cap, **(motion_options or {}), start_frame=inicio):
+                if cont_frame in done:
+                    continue
+                caminho = os.path.join(output_dir, frame_filename(nome_projeto, numero, 1, extensao))
+                writer.submit(caminho, frame, _meta(cont_frame))
+                numero += 1
+                saved += 1
+                yield {"type": "progress", "frame_index": cont_frame, "total_frames": total_frames, "saved": saved}
+        elif decode_workers > 1 and total_frames > rate:
+            cap.release()
+            executor, futures = start_parallel_extraction(
+                video_path, output_dir, rate, total_frames, decode_workers, engine, extensao, write_params,
+                transform=transform_options, start_frame=proximo, skip=done, fps=fps_original)
+            pendentes = set(futures)
+            try:
+                while pendentes:
+                    concluidos, pendentes = wait(pendentes, timeout=0.1, return_when=FIRST_COMPLETED)
+                    for future in concluidos:
+                        for entrada in future.result():
+                            manifest.append(entrada)
+                            saved += 1
+                            if frame_callback is not None:
+                                frame_callback(os.path.join(output_dir, entrada["file"]))
+                    feitos = len(futures) - len(pendentes)
+                    yield {"type": "progress", "frame_index": int(total_frames * feitos / len(futures)),
+                           "total_frames": total_frames, "saved": saved}
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+        else:
+            for cont_frame, frame in iter_sampled_frames(cap, rate, engine, start_frame=proximo):
+                if cont_frame in done:
+                    continue
+                caminho = os.path.join(output_dir, frame_filename(nome_projeto, cont_frame, rate, extensao))
+                writer.submit(caminho, frame, _meta(cont_frame))
+                saved += 1
+                yield {"type": "progress", "frame_index": cont_frame, "total_frames": total_frames, "saved": saved}
+    finally:
+        cap.release()
+        try:
+            writer.close()
+        finally:
+            manifest.close()
+
+    yield {"type": "done", "saved": saved, "resumed": len(done), "output_dir": output_dir,
+           "elapsed_s": round(time.perf_counter() - start_time, 3)}
+
+
+def extraction_options_from_config(acq_cfg, recon_cfg=None):
+    """
+    Opções de iter_extract_frames a partir de parameters.acquisition (config.yaml).
+    max_long_side: "reconstruction" usa parameters.reconstruction.max_image_size (se definido).
+    """
+    max_long_side = acq_cfg.get("max_long_side") or 0
+    if max_long_side == "reconstruction":
+        max_long_side = (recon_cfg or {}).get("max_image_size") or 0
+    return {
+        "engine": acq_cfg.get("engine", "auto"),
+        "image_format": acq_cfg.get("image_format", "png"),
+        "png_compression": acq_cfg.get("png_compression", 3),
+        "jpeg_quality": acq_cfg.get("jpeg_quality", 95),
+        "webp_quality": acq_cfg.get("webp_quality", 95),
+        "writer_threads": acq_cfg.get("writer_threads", 4),
+        "writer_queue": acq_cfg.get("writer_queue", 16),
+        "decode_workers": acq_cfg.get("decode_workers", 1),
+        "sampling": acq_cfg.get("sampling", "fixed"),
+        "motion_options": acq_cfg.get("motion"),
+        "max_long_side": int(max_long_side),
+        "calibration_file": acq_cfg.get("calibration_file") or None,
+        "resume": bool(acq_cfg.get("resume", True)),
+    }
+
+
+def extract_frames(video_path, output_dir, desired_fps, progress=None, **options):
+    """Executa iter_extract_frames até o fim; `progress(evento)` recebe cada evento. Retorna o evento final."""
+    final = None
+    for event in iter_extract_frames(video_path, output_dir, desired_fps, **options):
+        if progress is not None:
+            progress(event)
+        final = event
+    return final
+
+
+class ExtractionProgressWindow:
+    """Janela Tk de progresso; assinante dos eventos da extração, atualizada no máximo a cada `min_interval` s."""
+
+    def __init__(self, nome_projeto, min_interval=0.1):
+        self.min_interval = min_interval
+        self._last_update = 0.0
+
+        self.root = tk.Tk()
+        self.root.title("Processando Vídeo")
+        self.root.geometry("400x150")
+        self.root.attributes('-topmost', True)
+
+        # Centralizar janela
+        screen_width = self.root.winfo_screenwidth()
+        screen_height = self.root.winfo_screenheight()
+        x = (screen_width // 2) - (400 // 2)
+        y = (screen_height // 2) - (150 // 2)
+        self.root.geometry(f"400x150+{x}+{y}")
+
+        label = tk.Label(self.root, text=f"Extraindo frames para o projeto:\n{nome_projeto}", pady=10)
+        label.pack()
+
+        self.progress = ttk.Progressbar(self.root, orient="horizontal", length=300, mode="determinate")
+        self.progress.pack(pady=5)
+
+        self.label_perc = tk.Label(self.root, text="0%")
+        self.label_perc.pack()
+
+    def __call__(self, event):
+        if event["type"] == "start":
+            self.progress["maximum"] = max(event["total_frames"], 1)
+            return
+        now = time.monotonic()
+        if event["type"] == "progress" and now - self._last_update < self.min_interval:
+            return
+        self._last_update = now
+        if event["type"] == "progress":
+            total = max(event["total_frames"], 1)
+            self.progress["value"] = event["frame_index"]
+            self.label_perc.config(text=f"{int((event['frame_index'] / total) * 100)}%")
+        self.root.update()
+
+    def close(self):
+        try:
+            self.root.destroy()
+        except tk.TclError:
+            pass
+
+
+# Controla o fluxo da extração e salvamento de frames
+def save_video_frames_fps(video_path, output_dir, desired_fps, frame_callback=None, **options):
+    """
+    Salva frames do vídeo na pasta enviada pelo main, com barra de progresso e aviso final em Tkinter.
+    Interface gráfica sobre extract_frames; `options` são repassadas a iter_extract_frames.
+    """
+    if desired_fps <= 0 and options.get("sampling", "fixed") != "motion":
+        return None
+
+    eventos = iter_extract_frames(video_path, output_dir, desired_fps, frame_callback=frame_callback, **options)
+    try:
+        inicio = next(eventos)  # abre o vídeo antes de criar a janela
+    except VideoOpenError as e:
+        root_err = tk.Tk()
+        root_err.withdraw()
+        messagebox.showerror("Erro", str(e))
+        root_err.destroy()
+        return None
+
+    janela = ExtractionProgressWindow(os.path.basename(output_dir))
+    resultado = inicio
+    try:
+        janela(inicio)
+        for evento in eventos:
+            janela(evento)
+            if evento["type"] == "progress":
+                report_progress(current=evento["frame_index"], total=evento["total_frames"])
+            resultado = evento
+    finally:
+        janela.close()  # Fecha a barra de progresso
 
     # AVISO DE FINALIZAÇÃO
+    nome_projeto = os.path.basename(output_dir)
     root_fin = tk.Tk()
     root_fin.withdraw()
     root_fin.attributes('-topmost', True)
     messagebox.showinfo("Sucesso", f"Extração de Frames finalizada!\n\nProjeto: {nome_projeto}\nLocal: {output_dir}")
-    root_fin.destroy()
\ No newline at end of file
+    root_fin.destroy()
+    return resultado
@@ -0,0 +1,250 @@
+import csv
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterable, List, Optional
+
+from src.volume_pipeline import VOLUME_MODES, compute_scaled_volume, detect_aruco_scale, normalize_path
+
+"""
+Módulo: batch_volume
+Responsabilidade:
+    - Pipeline de volume sem interface para uma pasta de reconstrução: escolha da geometria,
+      escala (ArUco, folha A4 ou fator fixo) e cálculo do volume.
+    - Execução em lote de várias reconstruções em processos paralelos, com limite de memória
+      por processo; a falha de uma pasta não interrompe as demais.
+    - Resultados em JSON Lines (uma linha por reconstrução, assim que termina) e resumo em CSV.
+"""
+
+SCALE_MODES = ("aruco", "a4", "fixed")
+
+# Geometrias procuradas em <reconstrução>/dense, em ordem de preferência
+VOLUME_GEOMETRY_CANDIDATES = ("meshed.ply", "mesh_poisson.ply", "mesh_poisson_from_dense.ply", "fused.ply")
+
+CSV_FIELDS = ("recon_dir", "status", "volume_m3", "volume_liters", "method", "scale", "scale_source",
+              "mesh_path", "elapsed_s", "error")
+
+
+def find_volume_geometry(recon_dir: str) -> str:
+    """Malha (ou nuvem) da reconstrução usada no volume: meshed.ply, mesh_poisson.ply, ... em dense/."""
+    for name in VOLUME_GEOMETRY_CANDIDATES:
+        for folder in (os.path.join(recon_dir, "dense"), recon_dir):
+            path = os.path.join(folder, name)
+            if os.path.exists(path):
+                return path
+    raise FileNotFoundError(f"Nenhuma malha ou nuvem encontrada em: {recon_dir}")
+
+
+def compute_reconstruction_volume(
+    recon_dir: str,
+    scale_mode: str,
+    aruco_size_cm: Optional[float] = None,
+    fixed_scale: Optional[float] = None,
+    volume_mode: Optional[str] = None,
+    bean_color_cfg: Optional[Dict] = None,
+    mesh_path: Optional[str] = None,
+) -> Dict:
+    """
+    Volume de uma reconstrução sem diálogos, com as mesmas regras do módulo de volume:
+    escala por ArUco (`aruco_size_cm`), folha A4 (altura do monte por cor, com a malha como
+    alternativa) ou fator fixo (`fixed_scale`). Retorna o resultado no formato do volume_*.json.
+    """
+    from src.processing import compute_a4_scale_from_mesh
+
+    if scale_mode not in SCALE_MODES:
+        raise ValueError(f"Estratégia de escala inválida: {scale_mode} (use {', '.join(SCALE_MODES)})")
+    mesh_path = mesh_path or find_volume_geometry(recon_dir)
+    volume_mode = volume_mode or ("heightmap" if scale_mode == "a4" else "auto")
+    if volume_mode not in VOLUME_MODES:
+        raise ValueError(f"Tipo de volume inválido: {volume_mode} (use {', '.join(VOLUME_MODES)})")
+    volume_method, primitive_fit = VOLUME_MODES[volume_mode]
+
+    scale_info: Dict = {}
+    if scale_mode == "aruco":
+        if not aruco_size_cm or aruco_size_cm <= 0:
+            raise ValueError("Informe o tamanho do ArUco (cm).")
+        aruco = detect_aruco_scale(mesh_path, aruco_size_cm)
+        scale = float(aruco["scale"])
+        scale_info["aruco"] = {
+            "marker_size_m": float(aruco["marker_size_m"]),
+            "marker_size_mesh": float(aruco["marker_size_mesh"]),
+            "source_path": normalize_path(aruco["source_path"]),
+        }
+    elif scale_mode == "a4":
+        a4 = compute_a4_scale_from_mesh(mesh_path=mesh_path, input_unit="mm")
+        scale = float(a4["scale"])
+        scale_info["a4"] = {
+            "sheet_size_m": a4["sheet_size_m"],
+            "sheet_size_mesh": a4["sheet_size_mesh"],
+            "source_path": normalize_path(a4["source_path"]),
+        }
+    else:
+        if not fixed_scale or fixed_scale <= 0:
+            raise ValueError("Informe o fator de escala (> 0).")
+        scale = float(fixed_scale)
+
+    # A4 + método por altura: feijão por cor, com a malha como alternativa
+    result, volume_mesh_path = compute_scaled_volume(
+        mesh_path=mesh_path,
+        recon_dir=recon_dir,
+        scale=scale,
+        volume_method=volume_method,
+        primitive_fit=primitive_fit,
+        bean_color_cfg=bean_color_cfg,
+        color_first=scale_mode == "a4" and volume_method == "heightmap",
+    )
+
+    volume_m3 = float(result["volume"])
+    payload = {
+        "recon_dir": normalize_path(recon_dir),
+        "mesh_path": normalize_path(mesh_path),
+        "mesh_volume_path": normalize_path(volume_mesh_path or mesh_path),
+        "volume": volume_m3,
+        "unit": result["unit"],
+        "method": result["method"],
+        "scale": float(result["scale"]),
+        "scale_source": scale_mode,
+        "volume_method": volume_mode,
+        "summary": {
+            "volume_m3": volume_m3,
+            "volume_liters": volume_m3 * 1000.0,
+            "volume_cm3": volume_m3 * 1e6,
+            "method": result["method"],
+            "scale": float(result["scale"]),
+        },
+    }
+    payload.update(scale_info)
+    for key in ("heightmap", "primitive_fit"):
+        if key in result:
+            payload[key] = result[key]
+    return payload
+
+
+def _limit_worker_memory(memory_limit_mb: Optional[float]):
+    """Inicializador dos processos: limita o espaço de endereçamento (MemoryError em vez de travar a máquina)."""
+    if not memory_limit_mb:
+        return
+    try:
+        import resource
+    except ImportError:  # Windows: sem setrlimit
+        return
+    limit = int(float(memory_limit_mb) * 1024 ** 2)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def volume_task(task: Dict) -> Dict:
+    """Processo de trabalho: uma reconstrução; erros viram {"status": "erro"} sem derrubar o lote."""
+    start = time.perf_counter()
+    recon_dir = task["recon_dir"]
+    try:
+        payload = compute_reconstruction_volume(**task)
+        payload["status"] = "ok"
+    except MemoryError:
+        payload = {"recon_dir": normalize_path(recon_dir), "status": "erro",
+                   "error": "Memória insuficiente (limite por processo atingido)."}
+    except Exception as e:
+        payload = {"recon_dir": normalize_path(recon_dir), "status": "erro", "error": str(e),
+                   "traceback": traceback.format_exc(limit=5)}
+    payload["elapsed_s"] = round(time.perf_counter() - start, 3)
+    return payload
+
+
+def expand_reconstruction_dirs(patterns: Iterable[str]) -> List[str]:
+    """Pastas de reconstrução a partir de caminhos e/ou padrões glob (sem repetições, em ordem)."""
+    folders = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            path = normalize_path(os.path.abspath(path))
+            if os.path.isdir(path) and path not in folders:
+                folders.append(path)
+    return folders
+
+
+def run_volume_batch(
+    recon_dirs: List[str],
+    scale_mode: str,
+    workers: int = 2,
+    memory_limit_mb: Optional[float] = None,
+    on_result: Optional[Callable[[Dict], None]] = None,
+    max_retries: int = 1,
+    **options,
+) -> List[Dict]:
+    """
+    Calcula o volume de cada pasta em um pool de processos. `on_result(resultado)` é chamado assim
+    que cada reconstrução termina (em ordem de conclusão). Um processo encerrado pelo sistema
+    (ex.: falta de memória) quebra o pool e todas as pastas em andamento: elas são refeitas uma
+    por processo, para isolar a culpada, até `max_retries` vezes antes de virarem erro.
+    `options`: aruco_size_cm, fixed_scale, volume_mode, bean_color_cfg.
+    """
+    tasks = {path: dict(options, recon_dir=path, scale_mode=scale_mode) for path in recon_dirs}
+    results = []
+
+    def _emit(result):
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    def _run_round(paths, n_workers):
+        broken = []
+        executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_limit_worker_memory,
+                                       initargs=(memory_limit_mb,))
+        try:
+            futures = {executor.submit(volume_task, tasks[path]): path for path in paths}
+            remaining = set(futures)
+            while remaining:
+                done, remaining = wait(remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        _emit(future.result())
+                    except BrokenProcessPool:
+                        broken.append(futures[future])
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        return broken
+
+    broken = _run_round(list(recon_dirs), max(1, int(workers))) if recon_dirs else []
+    for path in broken:
+        for attempt in range(max_retries + 1):
+            if attempt == max_retries:
+                _emit({"recon_dir": path, "status": "erro",
+                       "error": "Processo de trabalho encerrado (memória ou falha nativa)."})
+            elif not _run_round([path], 1):
+                break
+    return results
+
+
+def write_summary_csv(results: List[Dict], csv_path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(csv_path)), exist_ok=True)
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for result in sorted(results, key=lambda r: r.get("recon_dir", "")):
+            summary = result.get("summary", {})
+            writer.writerow({
+                "recon_dir": result.get("recon_dir"),
+                "status": result.get("status"),
+                "volume_m3": summary.get("volume_m3"),
+                "volume_liters": summary.get("volume_liters"),
+                "method": result.get("method"),
+                "scale": result.get("scale"),
+                "scale_source": result.get("scale_source"),
+                "mesh_path": result.get("mesh_path"),
+                "elapsed_s": result.get("elapsed_s"),
+                "error": result.get("error"),
+            })
+
+
+def json_line_writer(stream=None):
+    """on_result que grava uma linha JSON por reconstrução e força o flush (acompanhamento ao vivo)."""
+    stream = stream or sys.stdout
+
+    def _write(result):
+        stream.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+        stream.flush()
+    return _write
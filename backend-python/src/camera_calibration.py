@@ -1,11 +1,15 @@
 import cv2
+import hashlib
+import json
 import numpy as np
 import glob
 import os
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 import tkinter as tk
 from tkinter import simpledialog, messagebox
 from PIL import Image, ImageTk
+from src.results_index import record_result
 
 
 def exibir_marcador_na_tela(chessboard_size, root_parent=None):
@@ -89,6 +93,322 @@ def exibir_marcador_na_tela(chessboard_size, root_parent=None):
             pass
 
 
+# Critério do cornerSubPix (o mesmo na busca reduzida e no refinamento em resolução cheia)
+SUBPIX_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+
+
+def detect_chessboard(task):
+    """
+    Processo de trabalho: detecta o tabuleiro em uma foto.
+    A busca (findChessboardCorners) roda numa cópia reduzida para `search_long_side` px, onde fotos
+    sem tabuleiro são rejeitadas rapidamente; encontrado o tabuleiro, os cantos são reescalados e
+    refinados com cornerSubPix na resolução original.
+    Retorna {"path", "image_size" (largura, altura) ou None se ilegível, "corners" ou None}.
+    """
+    path = task["path"]
+    chessboard_size = tuple(task["chessboard_size"])
+    img = cv2.imread(path)
+    if img is None:
+        return {"path": path, "image_size": None, "corners": None}
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape
+    corners = find_chessboard_corners(gray, chessboard_size, task.get("search_long_side"))
+    return {"path": path, "image_size": (width, height), "corners": corners}
+
+
+def find_chessboard_corners(gray, chessboard_size, search_long_side=1000):
+    """Busca reduzida + refinamento em resolução cheia (ver detect_chessboard); None sem tabuleiro."""
+    height, width = gray.shape
+    search_long_side = int(search_long_side or 0)
+    scale = 1.0
+    search = gray
+    if search_long_side and max(width, height) > search_long_side:
+        scale = search_long_side / float(max(width, height))
+        search = cv2.resize(gray, (max(1, int(round(width * scale))), max(1, int(round(height * scale)))),
+                            interpolation=cv2.INTER_AREA)
+
+    ret, corners = cv2.findChessboardCorners(search, tuple(chessboard_size), None)
+    if not ret:
+        return None
+
+    if scale != 1.0:
+        corners = cv2.cornerSubPix(search, corners, (5, 5), (-1, -1), SUBPIX_CRITERIA)
+        # Centro do pixel: (x + 0.5) / escala - 0.5
+        corners = ((corners + 0.5) / scale - 0.5).astype(np.float32)
+    corners = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), SUBPIX_CRITERIA)
+    return corners.reshape(-1, 1, 2)
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+CORNER_CACHE_FILE = "corner_cache.json"
+
+
+def _load_corner_cache(cache_path):
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _save_corner_cache(cache_path, cache):
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+
+def corner_cache_key(sha1, chessboard_size, square_size, search_long_side):
+    return f"{sha1}|{chessboard_size[0]}x{chessboard_size[1]}|{float(square_size)}|{int(search_long_side or 0)}"
+
+
+def detect_calibration_points(image_paths, chessboard_size, workers=0, search_long_side=1000, progress=None,
+                              cache_path=None, square_size=1.0):
+    """
+    Detecta o tabuleiro em todas as fotos, em paralelo (`workers` processos; 0 = núcleos da máquina,
+    1 = sequencial). Os resultados saem na ordem de `image_paths`, então a calibração é a mesma da
+    execução sequencial. `progress()` é chamado a cada foto processada.
+    Com `cache_path`, as detecções ficam guardadas por hash do conteúdo, tabuleiro e tamanho do
+    quadrado: fotos já vistas não são reprocessadas.
+    """
+    cache = _load_corner_cache(cache_path)
+    keys = {}
+    results = {}
+    if cache_path:
+        for path in image_paths:
+            keys[path] = corner_cache_key(file_sha1(path), chessboard_size, square_size, search_long_side)
+            cached = cache.get(keys[path])
+            if cached is not None:
+                corners = cached["corners"]
+                results[path] = {
+                    "path": path,
+                    "image_size": tuple(cached["image_size"]) if cached["image_size"] else None,
+                    "corners": None if corners is None else np.array(corners, np.float32).reshape(-1, 1, 2),
+                    "cached": True,
+                }
+                if progress is not None:
+                    progress()
+
+    tasks = [{"path": path, "chessboard_size": tuple(chessboard_size), "search_long_side": search_long_side}
+             for path in image_paths if path not in results]
+    workers = int(workers or os.cpu_count() or 1)
+    workers = max(1, min(workers, len(tasks)))
+    if workers == 1:
+        detected = []
+        for task in tasks:
+            detected.append(detect_chessboard(task))
+            if progress is not None:
+                progress()
+    else:
+        detected = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(detect_chessboard, tasks):
+                detected.append(result)
+                if progress is not None:
+                    progress()
+
+    for result in detected:
+        results[result["path"]] = result
+        if cache_path:
+            cache[keys[result["path"]]] = {
+                "image_size": list(result["image_size"]) if result["image_size"] else None,
+                "corners": None if result["corners"] is None else result["corners"].reshape(-1, 2).tolist(),
+            }
+    if cache_path and detected:
+        _save_corner_cache(cache_path, cache)
+    return [results[path] for path in image_paths]
+
+
+def calibrate_from_detections(detections, chessboard_size, square_size, outlier_factor=2.0, min_outlier_error=0.5):
+    """
+    Calibra a câmera com as detecções (detect_calibration_points) e calcula o erro de reprojeção
+    de cada vista. Vistas com erro acima de `outlier_factor` x mediana (e de `min_outlier_error` px)
+    são descartadas e a solução é refeita a partir dos intrínsecos já obtidos (re-solve rápido).
+    Retorna None sem detecções válidas.
+    """
+    objp = np.zeros((chessboard_size[0] * chessboard_size[1], 3), np.float32)
+    objp[:, :2] = np.mgrid[0:chessboard_size[0], 0:chessboard_size[1]].T.reshape(-1, 2)
+    objp *= square_size
+
+    image_size = None
+    views = []
+    for detection in detections:
+        if detection["image_size"] is None:
+            continue
+        image_size = detection["image_size"]  # tamanho da última foto lida, como na versão sequencial
+        if detection["corners"] is not None:
+            views.append(detection)
+    if not views:
+        return None
+
+    def _solve(vistas, mtx=None, dist=None, flags=0):
+        return cv2.calibrateCameraExtended(
+            [objp] * len(vistas), [v["corners"] for v in vistas], tuple(image_size), mtx, dist, flags=flags)
+
+    rms, mtx, dist, _, _, _, _, errors = _solve(views)
+    per_view = {os.path.basename(v["path"]): float(e) for v, e in zip(views, errors.ravel())}
+
+    excluded = []
+    if len(views) > 3:
+        limit = max(outlier_factor * float(np.median(errors)), min_outlier_error)
+        kept = [v for v, e in zip(views, errors.ravel()) if e <= limit]
+        if len(kept) >= 3 and len(kept) < len(views):
+            excluded = [os.path.basename(v["path"]) for v, e in zip(views, errors.ravel()) if e > limit]
+            rms, mtx, dist, _, _, _, _, _ = _solve(kept, mtx.copy(), dist.copy(), cv2.CALIB_USE_INTRINSIC_GUESS)
+            views = kept
+
+    return {
+        "rms": float(rms),
+        "mtx": mtx,
+        "dist": dist,
+        "image_size": tuple(image_size),
+        "per_view_errors": per_view,
+        "excluded": excluded,
+        "used": len(views),
+    }
+
+
+def calibration_report(calibration, chessboard_size, square_size):
+    """Relatório JSON salvo ao lado do .npz (erros por vista e vistas descartadas)."""
+    report = {
+        "rms": calibration["rms"],
+        "image_size": list(calibration["image_size"]),
+        "chessboard_size": list(chessboard_size),
+        "square_size": float(square_size),
+        "used_views": calibration["used"],
+        "excluded_views": calibration["excluded"],
+        "per_view_errors": calibration["per_view_errors"],
+    }
+    # Calibração por vídeo: frames analisados e vistas escolhidas
+    for key in ("probed_frames", "detected_views", "selected_frames"):
+        if key in calibration:
+            report[key] = calibration[key]
+    return report
+
+
+def view_statistics(corners, chessboard_size, image_size):
+    """
+    Estatísticas 2D baratas de uma vista do tabuleiro: centro, escala, inclinação (razão entre
+    lados opostos, em log) e rotação no plano. Servem de substituto da pose na escolha das vistas.
+    """
+    cols, rows = chessboard_size
+    pts = corners.reshape(rows, cols, 2).astype(np.float64)
+    width, height = image_size
+    tl, tr, br, bl = pts[0, 0], pts[0, -1], pts[-1, -1], pts[-1, 0]
+    top, bottom = np.linalg.norm(tr - tl), np.linalg.norm(br - bl)
+    left, right = np.linalg.norm(bl - tl), np.linalg.norm(br - tr)
+    area = cv2.contourArea(np.float32([tl, tr, br, bl]))
+    # Ângulo dobrado: a detecção pode devolver o tabuleiro girado de 180°
+    angle = 2.0 * np.arctan2(tr[1] - tl[1], tr[0] - tl[0])
+    center = pts.reshape(-1, 2).mean(axis=0)
+    return np.array([
+        center[0] / width,
+        center[1] / height,
+        np.sqrt(abs(area) / float(width * height)),
+        np.log(max(top, 1e-6) / max(bottom, 1e-6)),
+        np.log(max(left, 1e-6) / max(right, 1e-6)),
+        0.25 * np.cos(angle),
+        0.25 * np.sin(angle),
+    ])
+
+
+def view_coverage(corners, image_size, grid=(8, 6)):
+    """Células de uma grade `grid` (colunas, linhas) da imagem ocupadas pelos cantos."""
+    width, height = image_size
+    pts = corners.reshape(-1, 2)
+    cx = np.clip((pts[:, 0] / width * grid[0]).astype(int), 0, grid[0] - 1)
+    cy = np.clip((pts[:, 1] / height * grid[1]).astype(int), 0, grid[1] - 1)
+    return set(zip(cx.tolist(), cy.tolist()))
+
+
+def select_diverse_views(views, chessboard_size, max_views=20, grid=(8, 6), coverage_weight=1.0):
+    """
+    Escolhe até `max_views` vistas com poses e cobertura da imagem variadas (farthest point nas
+    estatísticas de view_statistics + ganho de células ainda não cobertas). Vistas quase repetidas
+    do vídeo ficam de fora. Retorna as vistas escolhidas, na ordem original.
+    """
+    if len(views) <= max_views:
+        return list(views)
+    stats = np.array([view_statistics(v["corners"], chessboard_size, v["image_size"]) for v in views])
+    cells = [view_coverage(v["corners"], v["image_size"], grid) for v in views]
+    total_cells = float(grid[0] * grid[1])
+
+    first = max(range(len(views)), key=lambda i: (len(cells[i]), stats[i, 2]))
+    selected = [first]
+    covered = set(cells[first])
+    min_dist = np.linalg.norm(stats - stats[first], axis=1)
+    while len(selected) < max_views:
+        gain = np.array([len(c - covered) / total_cells for c in cells])
+        score = min_dist + coverage_weight * gain
+        score[selected] = -np.inf
+        best = int(np.argmax(score))
+        if score[best] <= 1e-6:
+            break  # o restante repete vistas já escolhidas
+        selected.append(best)
+        covered |= cells[best]
+        min_dist = np.minimum(min_dist, np.linalg.norm(stats - stats[best], axis=1))
+    return [views[i] for i in sorted(selected)]
+
+
+def calibrate_from_video(video_path, chessboard_size, square_size, probe_fps=2.0, max_probe_frames=300,
+                         max_views=20, search_long_side=1000, progress=None):
+    """
+    Calibração a partir de um vídeo do tabuleiro. O vídeo é decimado (no máximo `probe_fps`
+    frames por segundo e `max_probe_frames` frames no total, com seek entre eles), o tabuleiro é
+    procurado em cada frame e só um subconjunto de até `max_views` vistas diversas
+    (select_diverse_views) vai para o calibrateCamera: o custo não cresce com a duração do vídeo.
+    `progress(feitos, total)` é chamado a cada frame analisado. Retorna None sem detecções.
+    """
+    from src.acquisition import VideoOpenError, get_video_frame_rate, iter_sampled_frames
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise VideoOpenError(f"Não foi possível abrir o arquivo de vídeo em:\n{video_path}")
+    try:
+        fps = get_video_frame_rate(cap) or 30.0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        rate = max(1, int(round(fps / probe_fps)))
+        if total_frames > 0:
+            rate = max(rate, -(-total_frames // int(max_probe_frames)))
+        probes = -(-total_frames // rate) if total_frames > 0 else 0
+
+        views = []
+        image_size = None
+        for feitos, (frame_index, frame) in enumerate(iter_sampled_frames(cap, rate), start=1):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            image_size = (gray.shape[1], gray.shape[0])
+            corners = find_chessboard_corners(gray, chessboard_size, search_long_side)
+            if corners is not None:
+                views.append({"path": f"frame_{frame_index:06d}", "frame_index": frame_index,
+                              "image_size": image_size, "corners": corners})
+            if progress is not None:
+                progress(feitos, probes)
+    finally:
+        cap.release()
+
+    selected = select_diverse_views(views, chessboard_size, max_views)
+    calibracao = calibrate_from_detections(selected, chessboard_size, square_size)
+    if calibracao is None:
+        return None
+    calibracao.update({
+        "probed_frames": probes,
+        "detected_views": len(views),
+        "selected_frames": [v["frame_index"] for v in selected],
+    })
+    return calibracao
+
+
 def run_calibration_process(settings):
     """Executa a calibração matemática e valida duplicatas antes de salvar."""
     chessboard_size = settings["chessboard_size"]
@@ -96,16 +416,9 @@ def run_calibration_process(settings):
     image_folder = settings["calibration_folder"]
     output_folder = settings["output_folder"]
 
-    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
-
-    objp = np.zeros((chessboard_size[0] * chessboard_size[1], 3), np.float32)
-    objp[:, :2] = np.mgrid[0:chessboard_size[0], 0:chessboard_size[1]].T.reshape(-1, 2)
-    objp *= square_size
-
-    objpoints, imgpoints = [], []
     image_paths = []
     # Busca robusta (case insensitive extensions)
-    for ext in ("*.jpg", "*.jpeg", "*.png", "*.bmp", "*.tiff"):
+    for ext in ("*.jpg", "*.jpeg", "*.png", "*.bmp", "*.tiff", "*.webp"):
         # Tenta buscar lowercase e uppercase
         image_paths.extend(glob.glob(os.path.join(image_folder, ext)))
         image_paths.extend(glob.glob(os.path.join(image_folder, ext.upper())))
@@ -123,29 +436,21 @@ def run_calibration_process(settings):
 
     print(f"\n> Processando {len(image_paths)} Fotos para Calibração...")
     pbar = tqdm(total=len(image_paths), colour='red', desc="Progresso")
-
-    gray = None
-    sucesso_count = 0
-
-    for fname in image_paths:
-        img = cv2.imread(fname)
-        if img is None:
-            pbar.update(1)
-            continue
-
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        ret, corners = cv2.findChessboardCorners(gray, chessboard_size, None)
-
-        if ret:
-            objpoints.append(objp)
-            corners2 = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria)
-            imgpoints.append(corners2)
-            sucesso_count += 1
-
-        pbar.update(1)
+    resultados = detect_calibration_points(
+        image_paths, chessboard_size,
+        workers=settings.get("workers", 0),
+        search_long_side=settings.get("search_long_side", 1000),
+        progress=lambda: pbar.update(1),
+        cache_path=os.path.join(output_folder, CORNER_CACHE_FILE),
+        square_size=square_size,
+    )
     pbar.close()
+    reaproveitadas = sum(1 for r in resultados if r.get("cached"))
+    if reaproveitadas:
+        print(f"Detecções reaproveitadas do cache: {reaproveitadas} de {len(resultados)} fotos.")
 
-    if not objpoints:
+    calibracao = calibrate_from_detections(resultados, chessboard_size, square_size)
+    if calibracao is None:
         root_err = tk.Tk()
         root_err.withdraw()
         root_err.attributes('-topmost', True)
@@ -153,89 +458,145 @@ def run_calibration_process(settings):
         root_err.destroy()
         return
 
-    print(f"Calculando matrizes intrínsecas (Usando {sucesso_count} imagens válidas)...")
-    ret, mtx, dist, rvecs, tvecs = cv2.calibrateCamera(objpoints, imgpoints, gray.shape[::-1], None, None)
+    if calibracao["excluded"]:
+        print(f"Vistas descartadas (erro de reprojeção alto): {', '.join(calibracao['excluded'])}")
+    print(f"Calibração com {calibracao['used']} imagens válidas | erro RMS: {calibracao['rms']:.3f} px")
+    _salvar_calibracao(calibracao, output_folder, chessboard_size, square_size)
 
-    if ret:
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder, exist_ok=True)
 
-        # Inicia Root Master para os diálogos
-        root_master = tk.Tk()
-        root_master.withdraw()
-        root_master.attributes('-topmost', True)
+def _salvar_calibracao(calibracao, output_folder, chessboard_size, square_size):
+    """Pede o nome do arquivo e salva o .npz (mtx, dist, image_size) e o relatório ao lado."""
+    mtx, dist, image_size = calibracao["mtx"], calibracao["dist"], calibracao["image_size"]
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder, exist_ok=True)
 
-        while True:
-            nome_arquivo = simpledialog.askstring(
-                "Salvar Calibração",
-                "Digite um nome para o arquivo de calibração:",
-                initialvalue="camera_param",
-                parent=root_master)
+    # Inicia Root Master para os diálogos
+    root_master = tk.Tk()
+    root_master.withdraw()
+    root_master.attributes('-topmost', True)
 
-            if not nome_arquivo:
-                print("[!] Operação de salvamento cancelada.")
-                break
+    while True:
+        nome_arquivo = simpledialog.askstring(
+            "Salvar Calibração",
+            "Digite um nome para o arquivo de calibração:",
+            initialvalue="camera_param",
+            parent=root_master)
 
-            if not nome_arquivo.endswith('.npz'):
-                nome_arquivo += '.npz'
+        if not nome_arquivo:
+            print("[!] Operação de salvamento cancelada.")
+            break
 
-            caminho_final = os.path.join(output_folder, nome_arquivo)
+        if not nome_arquivo.endswith('.npz'):
+            nome_arquivo += '.npz'
 
-            # --- VERIFICAÇÃO DE ARQUIVO REPETIDO ---
-            if os.path.exists(caminho_final):
-                existentes = [f for f in os.listdir(output_folder) if f.endswith('.npz')]
+        caminho_final = os.path.join(output_folder, nome_arquivo)
 
-                root_erro = tk.Toplevel(root_master)
-                root_erro.title("Erro: Arquivo já existe")
-                root_erro.geometry("400x350")
-                root_erro.attributes('-topmost', True)
-                root_erro.grab_set()
+        # --- VERIFICAÇÃO DE ARQUIVO REPETIDO ---
+        if os.path.exists(caminho_final):
+            existentes = [f for f in os.listdir(output_folder) if f.endswith('.npz')]
 
-                sw, sh = root_erro.winfo_screenwidth(), root_erro.winfo_screenheight()
-                root_erro.geometry(f"400x350+{int(sw / 2 - 200)}+{int(sh / 2 - 175)}")
+            root_erro = tk.Toplevel(root_master)
+            root_erro.title("Erro: Arquivo já existe")
+            root_erro.geometry("400x350")
+            root_erro.attributes('-topmost', True)
+            root_erro.grab_set()
 
-                tk.Label(root_erro, text=f"O arquivo '{nome_arquivo}' já existe!",
-                         font=("Arial", 11, "bold"), fg="red", pady=10).pack()
+            sw, sh = root_erro.winfo_screenwidth(), root_erro.winfo_screenheight()
+            root_erro.geometry(f"400x350+{int(sw / 2 - 200)}+{int(sh / 2 - 175)}")
 
-                tk.Label(root_erro, text="Arquivos de calibração existentes:", font=("Arial", 10)).pack(anchor="w",
-                                                                                                        padx=20)
+            tk.Label(root_erro, text=f"O arquivo '{nome_arquivo}' já existe!",
+                     font=("Arial", 11, "bold"), fg="red", pady=10).pack()
 
-                frame_lista = tk.Frame(root_erro)
-                frame_lista.pack(expand=True, fill='both', padx=20, pady=5)
+            tk.Label(root_erro, text="Arquivos de calibração existentes:", font=("Arial", 10)).pack(anchor="w",
+                                                                                                    padx=20)
 
-                scrollbar = tk.Scrollbar(frame_lista)
-                scrollbar.pack(side="right", fill="y")
+            frame_lista = tk.Frame(root_erro)
+            frame_lista.pack(expand=True, fill='both', padx=20, pady=5)
 
-                lista_box = tk.Listbox(frame_lista, yscrollcommand=scrollbar.set, font=("Consolas", 10))
-                for item in sorted(existentes):
-                    lista_box.insert("end", f" • {item}")
-                lista_box.pack(expand=True, fill='both')
-                scrollbar.config(command=lista_box.yview)
+            scrollbar = tk.Scrollbar(frame_lista)
+            scrollbar.pack(side="right", fill="y")
 
-                tk.Label(root_erro, text="Deseja tentar outro nome?", pady=10).pack()
+            lista_box = tk.Listbox(frame_lista, yscrollcommand=scrollbar.set, font=("Consolas", 10))
+            for item in sorted(existentes):
+                lista_box.insert("end", f" • {item}")
+            lista_box.pack(expand=True, fill='both')
+            scrollbar.config(command=lista_box.yview)
 
-                resposta = tk.BooleanVar(value=False)
+            tk.Label(root_erro, text="Deseja tentar outro nome?", pady=10).pack()
 
-                def decidir(valor):
-                    resposta.set(valor)
-                    root_erro.destroy()
+            resposta = tk.BooleanVar(value=False)
 
-                btn_frame = tk.Frame(root_erro)
-                btn_frame.pack(pady=(0, 20))
-                tk.Button(btn_frame, text="Sim, tentar outro", width=18, command=lambda: decidir(True)).pack(
-                    side="left", padx=5)
-                tk.Button(btn_frame, text="Não, cancelar", width=15, command=lambda: decidir(False)).pack(side="left",
-                                                                                                          padx=5)
+            def decidir(valor):
+                resposta.set(valor)
+                root_erro.destroy()
 
-                root_erro.wait_window()
+            btn_frame = tk.Frame(root_erro)
+            btn_frame.pack(pady=(0, 20))
+            tk.Button(btn_frame, text="Sim, tentar outro", width=18, command=lambda: decidir(True)).pack(
+                side="left", padx=5)
+            tk.Button(btn_frame, text="Não, cancelar", width=15, command=lambda: decidir(False)).pack(side="left",
+                                                                                                      padx=5)
 
-                if not resposta.get():
-                    break
-                continue
+            root_erro.wait_window()
 
-            np.savez(caminho_final, mtx=mtx, dist=dist)
-            messagebox.showinfo("Sucesso", f"Calibração concluída!\nSalvo em: {caminho_final}", parent=root_master)
-            print(f"[OK] Calibração salva: {caminho_final}")
-            break
+            if not resposta.get():
+                break
+            continue
+
+        # image_size (largura, altura) permite reescalar mtx para outras resoluções
+        np.savez(caminho_final, mtx=mtx, dist=dist, image_size=np.array(image_size))
+        with open(os.path.splitext(caminho_final)[0] + "_report.json", "w", encoding="utf-8") as f:
+            json.dump(calibration_report(calibracao, chessboard_size, square_size), f, indent=2)
+        record_result("calibration", caminho_final)
+        messagebox.showinfo("Sucesso", f"Calibração concluída!\nSalvo em: {caminho_final}", parent=root_master)
+        print(f"[OK] Calibração salva: {caminho_final}")
+        break
+
+    root_master.destroy()
+
+
+def run_video_calibration_process(settings):
+    """Calibração a partir de um vídeo do tabuleiro (settings["calibration_video"]) e salvamento do .npz."""
+    chessboard_size = settings["chessboard_size"]
+    square_size = settings["square_size"]
+    video_path = settings["calibration_video"]
+    output_folder = settings["output_folder"]
+
+    print(f"\n> Procurando o tabuleiro no vídeo: {video_path}")
+    pbar = tqdm(total=0, colour='red', desc="Progresso")
+
+    def _progresso(feitos, total):
+        pbar.total = total
+        pbar.update(feitos - pbar.n)
+
+    try:
+        calibracao = calibrate_from_video(
+            video_path, chessboard_size, square_size,
+            probe_fps=settings.get("video_probe_fps", 2.0),
+            max_probe_frames=settings.get("video_max_probe_frames", 300),
+            max_views=settings.get("video_max_views", 20),
+            search_long_side=settings.get("search_long_side", 1000),
+            progress=_progresso,
+        )
+    except IOError as e:
+        pbar.close()
+        root_err = tk.Tk()
+        root_err.withdraw()
+        root_err.attributes('-topmost', True)
+        messagebox.showerror("Erro", str(e))
+        root_err.destroy()
+        return
+    pbar.close()
+
+    if calibracao is None:
+        root_err = tk.Tk()
+        root_err.withdraw()
+        root_err.attributes('-topmost', True)
+        messagebox.showwarning("Aviso", "O tabuleiro não foi detectado em nenhum frame do vídeo.")
+        root_err.destroy()
+        return
 
-        root_master.destroy()
\ No newline at end of file
+    print(f"Tabuleiro detectado em {calibracao['detected_views']} de {calibracao['probed_frames']} frames "
+          f"analisados; {len(calibracao['selected_frames'])} vistas escolhidas.")
+    print(f"Calibração com {calibracao['used']} vistas | erro RMS: {calibracao['rms']:.3f} px")
+    _salvar_calibracao(calibracao, output_folder, chessboard_size, square_size)
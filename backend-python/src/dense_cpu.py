@@ -0,0 +1,400 @@
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+"""
+Módulo: dense_cpu
+Responsabilidade:
+    - Substituir patch_match_stereo/stereo_fusion (que exigem CUDA) em máquinas sem GPU.
+    - Ler o modelo esparso gerado pelo image_undistorter (dense/sparse/*.bin).
+    - Calcular profundidade por estéreo semi-global (SGBM) em pares de imagens vizinhas,
+      distribuindo os pares em um pool de processos.
+    - Fundir as nuvens parciais em dense/fused.ply, compatível com o restante do pipeline.
+"""
+
+
+# Número de parâmetros por modelo de câmera do COLMAP (id -> (nome, n_params))
+CAMERA_MODELS = {
+    0: ("SIMPLE_PINHOLE", 3),
+    1: ("PINHOLE", 4),
+    2: ("SIMPLE_RADIAL", 4),
+    3: ("RADIAL", 5),
+    4: ("OPENCV", 8),
+    5: ("OPENCV_FISHEYE", 8),
+    6: ("FULL_OPENCV", 12),
+    7: ("FOV", 5),
+    8: ("SIMPLE_RADIAL_FISHEYE", 4),
+    9: ("RADIAL_FISHEYE", 5),
+    10: ("THIN_PRISM_FISHEYE", 12),
+}
+
+
+def _read(fid, fmt: str):
+    fmt = "<" + fmt
+    size = struct.calcsize(fmt)
+    data = fid.read(size)
+    if len(data) != size:
+        raise ValueError("Arquivo binário do COLMAP truncado.")
+    return struct.unpack(fmt, data)
+
+
+def read_cameras_binary(path: str) -> Dict[int, Dict]:
+    cameras = {}
+    with open(path, "rb") as fid:
+        (num_cameras,) = _read(fid, "Q")
+        for _ in range(num_cameras):
+            camera_id, model_id, width, height = _read(fid, "iiQQ")
+            if model_id not in CAMERA_MODELS:
+                raise ValueError(f"Modelo de câmera desconhecido: {model_id}")
+            model_name, num_params = CAMERA_MODELS[model_id]
+            params = _read(fid, "d" * num_params)
+            cameras[camera_id] = {
+                "id": camera_id,
+                "model": model_name,
+                "width": int(width),
+                "height": int(height),
+                "params": np.array(params, dtype=float),
+            }
+    return cameras
+
+
+def read_images_binary(path: str) -> Dict[int, Dict]:
+    images = {}
+    with open(path, "rb") as fid:
+        (num_images,) = _read(fid, "Q")
+        for _ in range(num_images):
+            image_id, qw, qx, qy, qz, tx, ty, tz, camera_id = _read(fid, "idddddddi")
+            name_bytes = b""
+            while True:
+                ch = fid.read(1)
+                if ch in (b"\x00", b""):
+                    break
+                name_bytes += ch
+            (num_points2d,) = _read(fid, "Q")
+            raw = fid.read(24 * num_points2d)
+            if len(raw) != 24 * num_points2d:
+                raise ValueError("Arquivo binário do COLMAP truncado.")
+            point_ids = np.frombuffer(raw, dtype=np.int64).reshape(-1, 3)[:, 2] if num_points2d else np.empty(0, np.int64)
+            images[image_id] = {
+                "id": image_id,
+                "qvec": np.array([qw, qx, qy, qz], dtype=float),
+                "tvec": np.array([tx, ty, tz], dtype=float),
+                "camera_id": camera_id,
+                "name": name_bytes.decode("utf-8"),
+                "point3D_ids": point_ids[point_ids >= 0].copy(),
+            }
+    return images
+
+
+def read_points3d_binary(path: str) -> Dict[int, np.ndarray]:
+    points = {}
+    with open(path, "rb") as fid:
+        (num_points,) = _read(fid, "Q")
+        for _ in range(num_points):
+            point_id, x, y, z, _r, _g, _b, _err = _read(fid, "QdddBBBd")
+            (track_length,) = _read(fid, "Q")
+            fid.seek(8 * track_length, os.SEEK_CUR)
+            points[point_id] = np.array([x, y, z], dtype=float)
+    return points
+
+
+def qvec_to_rotmat(qvec: np.ndarray) -> np.ndarray:
+    w, x, y, z = [float(v) for v in qvec]
+    return np.array([
+        [1 - 2 * y * y - 2 * z * z, 2 * x * y - 2 * w * z, 2 * z * x + 2 * w * y],
+        [2 * x * y + 2 * w * z, 1 - 2 * x * x - 2 * z * z, 2 * y * z - 2 * w * x],
+        [2 * z * x - 2 * w * y, 2 * y * z + 2 * w * x, 1 - 2 * x * x - 2 * y * y],
+    ], dtype=float)
+
+
+def camera_matrix(camera: Dict) -> np.ndarray:
+    params = camera["params"]
+    if camera["model"] == "PINHOLE":
+        fx, fy, cx, cy = params[:4]
+    elif camera["model"] in ("SIMPLE_PINHOLE", "SIMPLE_RADIAL", "RADIAL"):
+        fx = fy = params[0]
+        cx, cy = params[1], params[2]
+    else:
+        fx, fy, cx, cy = params[:4]
+    return np.array([[fx, 0.0, cx], [0.0, fy, cy], [0.0, 0.0, 1.0]], dtype=float)
+
+
+def select_neighbor_pairs(
+    images: Dict[int, Dict],
+    max_neighbors: int = 2,
+    min_shared_points: int = 30,
+) -> List[Tuple[int, int]]:
+    """Para cada imagem, escolhe as vizinhas com mais pontos 3D em comum."""
+    observers: Dict[int, List[int]] = {}
+    for image_id, image in images.items():
+        for pid in np.unique(image["point3D_ids"]).tolist():
+            observers.setdefault(pid, []).append(image_id)
+
+    shared: Dict[Tuple[int, int], int] = {}
+    for ids in observers.values():
+        if len(ids) < 2:
+            continue
+        ids = sorted(ids)
+        for i in range(len(ids)):
+            for j in range(i + 1, len(ids)):
+                key = (ids[i], ids[j])
+                shared[key] = shared.get(key, 0) + 1
+
+    per_image: Dict[int, List[Tuple[int, int]]] = {}
+    for (a, b), count in shared.items():
+        if count < min_shared_points:
+            continue
+        per_image.setdefault(a, []).append((count, b))
+        per_image.setdefault(b, []).append((count, a))
+
+    pairs = set()
+    for image_id, neighbors in per_image.items():
+        neighbors.sort(key=lambda item: (-item[0], item[1]))
+        for _, other in neighbors[:max_neighbors]:
+            pairs.add((min(image_id, other), max(image_id, other)))
+    return sorted(pairs)
+
+
+def _depth_range(image: Dict, points3d: Dict[int, np.ndarray]) -> Optional[Tuple[float, float]]:
+    ids = [pid for pid in image["point3D_ids"].tolist() if pid in points3d]
+    if len(ids) < 10:
+        return None
+    xyz = np.array([points3d[pid] for pid in ids], dtype=float)
+    r = qvec_to_rotmat(image["qvec"])
+    depths = (xyz @ r.T + image["tvec"])[:, 2]
+    depths = depths[depths > 0]
+    if depths.size < 10:
+        return None
+    low, high = np.percentile(depths, [2.0, 98.0])
+    return float(low * 0.8), float(high * 1.2)
+
+
+def _resize_for_stereo(img: np.ndarray, k: np.ndarray, max_image_size: int):
+    h, w = img.shape[:2]
+    factor = 1.0
+    if max_image_size and max(h, w) > max_image_size:
+        factor = max_image_size / float(max(h, w))
+        img = cv2.resize(img, (int(round(w * factor)), int(round(h * factor))), interpolation=cv2.INTER_AREA)
+        k = k.copy()
+        k[:2] *= factor
+    return img, k
+
+
+def compute_pair_points(task: Dict) -> Dict[str, np.ndarray]:
+    """Worker: retifica um par, calcula disparidade SGBM e devolve pontos no referencial do mundo."""
+    img_left = cv2.imread(task["left_path"], cv2.IMREAD_COLOR)
+    img_right = cv2.imread(task["right_path"], cv2.IMREAD_COLOR)
+    empty = {"points": np.empty((0, 3), np.float32), "colors": np.empty((0, 3), np.uint8)}
+    if img_left is None or img_right is None:
+        return empty
+
+    img_left, k1 = _resize_for_stereo(img_left, np.asarray(task["k_left"], dtype=float), task["max_image_size"])
+    img_right, k2 = _resize_for_stereo(img_right, np.asarray(task["k_right"], dtype=float), task["max_image_size"])
+    if img_left.shape != img_right.shape:
+        img_right = cv2.resize(img_right, (img_left.shape[1], img_left.shape[0]), interpolation=cv2.INTER_AREA)
+    size = (img_left.shape[1], img_left.shape[0])
+
+    r_left = np.asarray(task["r_left"], dtype=float)
+    t_left = np.asarray(task["t_left"], dtype=float)
+    r_right = np.asarray(task["r_right"], dtype=float)
+    t_right = np.asarray(task["t_right"], dtype=float)
+    r_rel = r_right @ r_left.T
+    t_rel = t_right - r_rel @ t_left
+
+    r1, r2, p1, p2, q, _, _ = cv2.stereoRectify(
+        k1, np.zeros(5), k2, np.zeros(5), size, r_rel, t_rel.reshape(3, 1), flags=cv2.CALIB_ZERO_DISPARITY, alpha=0
+    )
+    # SGBM só trabalha com pares horizontais; pares verticais ficam para outro vizinho.
+    if abs(p2[1, 3]) > abs(p2[0, 3]):
+        return empty
+
+    map1x, map1y = cv2.initUndistortRectifyMap(k1, np.zeros(5), r1, p1, size, cv2.CV_32FC1)
+    map2x, map2y = cv2.initUndistortRectifyMap(k2, np.zeros(5), r2, p2, size, cv2.CV_32FC1)
+    rect_left = cv2.remap(img_left, map1x, map1y, cv2.INTER_LINEAR)
+    rect_right = cv2.remap(img_right, map2x, map2y, cv2.INTER_LINEAR)
+
+    # Câmera "direita" à esquerda na imagem retificada: espelha o par para o SGBM
+    # e depois devolve a disparidade ao referencial original (com sinal invertido).
+    swapped = p2[0, 3] > 0
+    if swapped:
+        rect_left_m, rect_right_m = cv2.flip(rect_left, 1), cv2.flip(rect_right, 1)
+    else:
+        rect_left_m, rect_right_m = rect_left, rect_right
+
+    gray_left = cv2.cvtColor(rect_left_m, cv2.COLOR_BGR2GRAY)
+    gray_right = cv2.cvtColor(rect_right_m, cv2.COLOR_BGR2GRAY)
+
+    num_disp = int(task["num_disparities"])
+    block = int(task["block_size"])
+    sgbm = cv2.StereoSGBM_create(
+        minDisparity=0,
+        numDisparities=num_disp,
+        blockSize=block,
+        P1=8 * 3 * block * block,
+        P2=32 * 3 * block * block,
+        disp12MaxDiff=1,
+        uniquenessRatio=10,
+        speckleWindowSize=100,
+        speckleRange=2,
+        mode=cv2.STEREO_SGBM_MODE_SGBM_3WAY,
+    )
+    disparity = sgbm.compute(gray_left, gray_right).astype(np.float32) / 16.0
+    if swapped:
+        disparity = cv2.flip(disparity, 1)
+        valid = disparity > 0
+        disparity = -disparity
+    else:
+        valid = disparity > 0
+
+    xyz_rect = cv2.reprojectImageTo3D(disparity, q, handleMissingValues=False)
+    valid &= np.isfinite(xyz_rect).all(axis=2)
+    if not np.any(valid):
+        return empty
+
+    step = max(1, int(task["pixel_step"]))
+    if step > 1:
+        grid = np.zeros_like(valid)
+        grid[::step, ::step] = True
+        valid &= grid
+
+    pts_rect = xyz_rect[valid].astype(np.float64)
+    colors = rect_left[valid][:, ::-1].astype(np.uint8)
+
+    # Retificado -> câmera esquerda -> mundo
+    pts_cam = pts_rect @ r1
+    depth = pts_cam[:, 2]
+    keep = depth > 0
+    if task.get("depth_range"):
+        d_min, d_max = task["depth_range"]
+        keep &= (depth >= d_min) & (depth <= d_max)
+    pts_cam = pts_cam[keep]
+    colors = colors[keep]
+    pts_world = (pts_cam - t_left) @ r_left
+    return {"points": pts_world.astype(np.float32), "colors": colors}
+
+
+def fuse_point_sets(
+    point_sets: List[Dict[str, np.ndarray]],
+    voxel_size: float,
+    min_support: int = 2,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Funde as nuvens parciais em voxels; mantém voxels vistos por pelo menos `min_support` pares."""
+    sets = [s for s in point_sets if len(s["points"]) > 0]
+    if not sets:
+        return np.empty((0, 3), np.float64), np.empty((0, 3), np.uint8)
+    points = np.concatenate([s["points"] for s in sets]).astype(np.float64)
+    colors = np.concatenate([s["colors"] for s in sets]).astype(np.float64)
+    source = np.concatenate([np.full(len(s["points"]), i, dtype=np.int64) for i, s in enumerate(sets)])
+
+    voxel_size = max(float(voxel_size), 1e-9)
+    keys = np.floor(points / voxel_size).astype(np.int64)
+    _, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    n_voxels = len(counts)
+
+    sums = np.zeros((n_voxels, 3), dtype=np.float64)
+    col_sums = np.zeros((n_voxels, 3), dtype=np.float64)
+    np.add.at(sums, inverse, points)
+    np.add.at(col_sums, inverse, colors)
+
+    if min_support > 1 and len(sets) > 1:
+        pair_keys = np.unique(np.column_stack([inverse, source]), axis=0)
+        support = np.bincount(pair_keys[:, 0], minlength=n_voxels)
+        keep = support >= min_support
+    else:
+        keep = np.ones(n_voxels, dtype=bool)
+
+    fused = sums[keep] / counts[keep, None]
+    fused_colors = np.clip(col_sums[keep] / counts[keep, None], 0, 255).astype(np.uint8)
+    return fused, fused_colors
+
+
+def run_cpu_dense_reconstruction(
+    dense_dir: str,
+    output_path: Optional[str] = None,
+    max_image_size: int = 1600,
+    max_neighbors: int = 2,
+    num_disparities: int = 128,
+    block_size: int = 5,
+    pixel_step: int = 2,
+    voxel_fraction: float = 0.002,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, object]:
+    """Densificação CPU a partir do workspace do image_undistorter (dense/images + dense/sparse)."""
+    import open3d as o3d
+
+    sparse_dir = os.path.join(dense_dir, "sparse")
+    images_dir = os.path.join(dense_dir, "images")
+    output_path = output_path or os.path.join(dense_dir, "fused.ply")
+
+    cameras = read_cameras_binary(os.path.join(sparse_dir, "cameras.bin"))
+    images = read_images_binary(os.path.join(sparse_dir, "images.bin"))
+    points3d_path = os.path.join(sparse_dir, "points3D.bin")
+    points3d = read_points3d_binary(points3d_path) if os.path.exists(points3d_path) else {}
+
+    pairs = select_neighbor_pairs(images, max_neighbors=max_neighbors)
+    if not pairs:
+        raise ValueError("Nenhum par de imagens vizinhas com pontos em comum para a densificação CPU.")
+
+    num_disparities = max(16, int(np.ceil(num_disparities / 16.0)) * 16)
+    block_size = max(3, int(block_size) | 1)
+    tasks = []
+    for left_id, right_id in pairs:
+        left, right = images[left_id], images[right_id]
+        tasks.append({
+            "left_path": os.path.join(images_dir, left["name"]),
+            "right_path": os.path.join(images_dir, right["name"]),
+            "k_left": camera_matrix(cameras[left["camera_id"]]),
+            "k_right": camera_matrix(cameras[right["camera_id"]]),
+            "r_left": qvec_to_rotmat(left["qvec"]),
+            "t_left": left["tvec"],
+            "r_right": qvec_to_rotmat(right["qvec"]),
+            "t_right": right["tvec"],
+            "depth_range": _depth_range(left, points3d),
+            "max_image_size": int(max_image_size),
+            "num_disparities": num_disparities,
+            "block_size": block_size,
+            "pixel_step": int(pixel_step),
+        })
+
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    results = []
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(compute_pair_points, task) for task in tasks]
+        for future in as_completed(futures):
+            results.append(future.result())
+            done += 1
+            if progress:
+                progress(done, len(tasks))
+
+    if points3d:
+        sparse_xyz = np.array(list(points3d.values()), dtype=float)
+        low, high = np.percentile(sparse_xyz, [2.0, 98.0], axis=0)
+        diag = float(np.linalg.norm(high - low))
+    else:
+        all_pts = np.concatenate([r["points"] for r in results if len(r["points"])] or [np.zeros((1, 3))])
+        diag = float(np.linalg.norm(all_pts.max(axis=0) - all_pts.min(axis=0)))
+    voxel_size = max(diag * voxel_fraction, 1e-6)
+
+    fused, fused_colors = fuse_point_sets(results, voxel_size, min_support=2 if len(results) > 1 else 1)
+    if len(fused) == 0:
+        raise ValueError("Densificação CPU não gerou pontos consistentes.")
+
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(fused)
+    pcd.colors = o3d.utility.Vector3dVector(fused_colors.astype(np.float64) / 255.0)
+    pcd.estimate_normals()
+    o3d.io.write_point_cloud(output_path, pcd)
+
+    return {
+        "output_ply": output_path,
+        "pairs": len(pairs),
+        "points": int(len(fused)),
+        "voxel_size": float(voxel_size),
+    }
@@ -0,0 +1,146 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+"""
+Módulo: geometry_cache
+Responsabilidade:
+    - Cache LRU, compartilhado pelo processo, das geometrias lidas do disco (malhas e nuvens
+      Open3D, malhas trimesh), chaveado por caminho + data de modificação + tamanho.
+    - Limite de memória com descarte das entradas menos usadas.
+    - Devolver sempre cópias: quem recebe pode escalar/filtrar a geometria sem afetar o cache.
+"""
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def _o3d():
+    import open3d as o3d
+    o3d.utility.set_verbosity_level(o3d.utility.VerbosityLevel.Error)
+    return o3d
+
+
+def _nbytes(*arrays) -> int:
+    return int(sum(np.asarray(a).nbytes for a in arrays if a is not None))
+
+
+def _is_trimesh(geometry) -> bool:
+    return type(geometry).__module__.startswith("trimesh")
+
+
+def _geometry_nbytes(geometry) -> int:
+    """Tamanho aproximado em memória (vértices, faces, cores e normais)."""
+    if _is_trimesh(geometry):
+        if hasattr(geometry, "geometry"):  # Scene
+            return sum(_geometry_nbytes(g) for g in geometry.geometry.values())
+        return _nbytes(getattr(geometry, "vertices", None), getattr(geometry, "faces", None))
+    if hasattr(geometry, "triangles"):
+        return _nbytes(geometry.vertices, geometry.triangles, geometry.vertex_colors, geometry.vertex_normals)
+    if hasattr(geometry, "points"):
+        return _nbytes(geometry.points, geometry.colors, geometry.normals)
+    return 0
+
+
+def _copy(geometry):
+    if _is_trimesh(geometry):
+        return geometry.copy()
+    return type(geometry)(geometry)  # Open3D: construtor de cópia
+
+
+class GeometryCache:
+    """LRU de geometrias com limite de `max_bytes`; `get` relê o arquivo quando ele muda no disco."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Tuple, object, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, kind: str, loader: Callable[[str], object]):
+        key = (os.path.abspath(path), kind)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # Arquivo ausente: sem cache, o leitor decide (o Open3D devolve geometria vazia)
+            with self._lock:
+                self._discard(key)
+            return loader(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(entry[1])
+            self.misses += 1
+
+        geometry = loader(path)
+        size = _geometry_nbytes(geometry)
+        with self._lock:
+            self._discard(key)
+            if size <= self.max_bytes:
+                self._entries[key] = (signature, geometry, size)
+                self._bytes += size
+                self._evict()
+        return _copy(geometry)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+
+    def set_limit(self, max_bytes: int):
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+_CACHE = GeometryCache()
+
+
+def geometry_cache() -> GeometryCache:
+    return _CACHE
+
+
+def configure_geometry_cache(max_mb: Optional[float]):
+    """Ajusta o limite de memória do cache (parameters.geometry_cache.max_mb; 0 desativa)."""
+    if max_mb is not None:
+        _CACHE.set_limit(float(max_mb) * 1024 ** 2)
+
+
+def read_triangle_mesh(path: str):
+    """o3d.io.read_triangle_mesh (com pós-processamento), via cache."""
+    return _CACHE.get(path, "o3d_mesh", lambda p: _o3d().io.read_triangle_mesh(p, enable_post_processing=True))
+
+
+def read_point_cloud(path: str):
+    """o3d.io.read_point_cloud, via cache."""
+    return _CACHE.get(path, "o3d_pcd", lambda p: _o3d().io.read_point_cloud(p))
+
+
+def load_trimesh(path: str):
+    """trimesh.load(force="mesh"), via cache (pode devolver uma Scene)."""
+    def _load(p):
+        import trimesh
+        return trimesh.load(p, force="mesh")
+    return _CACHE.get(path, "trimesh", _load)
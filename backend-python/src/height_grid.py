@@ -0,0 +1,243 @@
+import json
+import os
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+"""
+Módulo: height_grid
+Responsabilidade:
+    - Guardar a grade de alturas do volume por altura (heightmap_color) ao lado do
+      volume_*.json: alturas finais, alturas brutas (máximo por célula, antes do preenchimento
+      e da suavização), máscara de dados e o referencial do plano (origem, normal, u, v,
+      canto da grade e tamanho da célula).
+    - As três camadas ficam em um único .npy (3 x altura x largura, float32) aberto com
+      mmap: a reanálise lê só o que usa, sem carregar a nuvem nem refazer a segmentação.
+    - Reintegrar a grade em milissegundos: volume acima de outro limiar de altura, de um
+      recorte da área ou com outra suavização/preenchimento (refeitos sobre as alturas brutas).
+"""
+
+GRID_PREFIX = "heightgrid_"
+LAYER_HEIGHT, LAYER_RAW, LAYER_MASK = 0, 1, 2
+
+
+def fill_and_smooth_height_grid(
+    raw_grid: np.ndarray,
+    gaussian_sigma: float = 1.0,
+    fill_holes: bool = True,
+    fill_max_radius: int = 3,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Preenchimento de buracos e suavização da grade bruta (alturas > 0 = célula com dados).
+    Retorna (grade final, máscara de dados); `raw_grid` não é alterada.
+    """
+    from scipy.ndimage import gaussian_filter, uniform_filter
+
+    height_grid = np.array(raw_grid, dtype=np.float32, copy=True)
+    data_mask = height_grid > 0
+
+    # Hole filling: only fill empty cells that are truly surrounded by data
+    # (majority of 3x3 neighbours must be filled — threshold > 0.5)
+    if fill_holes and fill_max_radius > 0:
+        empty = ~data_mask
+        for _ in range(fill_max_radius):
+            if not np.any(empty):
+                break
+            count = uniform_filter(data_mask.astype(np.float32), size=3, mode="constant")
+            h_sum = uniform_filter(height_grid, size=3, mode="constant")
+            # Only fill cells where >50% of 3x3 neighbourhood has data
+            fillable = empty & (count > 0.5)
+            if not np.any(fillable):
+                break
+            height_grid[fillable] = h_sum[fillable] / np.clip(count[fillable], 1e-9, None)
+            data_mask = height_grid > 0
+            empty = ~data_mask
+
+    # Normalized Gaussian smoothing: avoids zero-bleeding from empty cells
+    if gaussian_sigma > 0 and np.any(data_mask):
+        weight = data_mask.astype(np.float32)
+        smoothed_h = gaussian_filter(height_grid * weight, sigma=gaussian_sigma)
+        smoothed_w = gaussian_filter(weight, sigma=gaussian_sigma)
+        valid = smoothed_w > 1e-9
+        height_grid[valid & data_mask] = smoothed_h[valid & data_mask] / smoothed_w[valid & data_mask]
+        height_grid[~data_mask] = 0.0
+
+    return height_grid, data_mask
+
+
+class HeightGrid:
+    """
+    Grade de alturas (m) sobre o plano da mesa. A célula (linha i, coluna j) cobre, no
+    referencial do plano, x em min_xy[0] + j*grid_size e y em min_xy[1] + i*grid_size,
+    com x ao longo de `u` e y ao longo de `v` a partir de `origin`.
+    """
+
+    def __init__(
+        self,
+        height: np.ndarray,
+        raw: np.ndarray,
+        mask: np.ndarray,
+        grid_size: float,
+        origin: Sequence[float],
+        normal: Sequence[float],
+        u: Sequence[float],
+        v: Sequence[float],
+        min_xy: Sequence[float],
+        gaussian_sigma: float = 1.0,
+        fill_holes: bool = True,
+        fill_max_radius: int = 3,
+        path: Optional[str] = None,
+    ):
+        self.height = height
+        self.raw = raw
+        self.mask = mask
+        self.grid_size = float(grid_size)
+        self.origin = [float(x) for x in origin]
+        self.normal = [float(x) for x in normal]
+        self.u = [float(x) for x in u]
+        self.v = [float(x) for x in v]
+        self.min_xy = [float(x) for x in min_xy]
+        self.gaussian_sigma = float(gaussian_sigma)
+        self.fill_holes = bool(fill_holes)
+        self.fill_max_radius = int(fill_max_radius)
+        self.path = path
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return tuple(self.height.shape)
+
+    def frame(self) -> Dict:
+        return {
+            "grid_size": self.grid_size,
+            "grid_height": int(self.shape[0]),
+            "grid_width": int(self.shape[1]),
+            "origin": self.origin,
+            "normal": self.normal,
+            "u": self.u,
+            "v": self.v,
+            "min_xy": self.min_xy,
+            "gaussian_sigma": self.gaussian_sigma,
+            "fill_holes": self.fill_holes,
+            "fill_max_radius": self.fill_max_radius,
+            "unit": "m",
+            "layers": ["height", "raw", "mask"],
+        }
+
+    def save(self, folder: str, timestamp: str) -> str:
+        """Grava heightgrid_<timestamp>.npy + .json em `folder`; retorna o caminho do .npy."""
+        os.makedirs(folder, exist_ok=True)
+        npy_path = os.path.join(folder, f"{GRID_PREFIX}{timestamp}.npy")
+        layers = np.stack([
+            np.asarray(self.height, dtype=np.float32),
+            np.asarray(self.raw, dtype=np.float32),
+            np.asarray(self.mask, dtype=np.float32),
+        ])
+        np.save(npy_path, layers)
+        frame = self.frame()
+        frame["volume_m3"] = float(np.asarray(self.height, dtype=np.float64).sum() * self.grid_size ** 2)
+        with open(os.path.splitext(npy_path)[0] + ".json", "w", encoding="utf-8") as f:
+            json.dump(frame, f, ensure_ascii=False, indent=2)
+        self.path = npy_path
+        return npy_path
+
+
+def load_height_grid(path: str, mmap: bool = True) -> HeightGrid:
+    """Abre a grade gravada por HeightGrid.save (aceita o .npy ou o .json)."""
+    base = os.path.splitext(path)[0]
+    with open(base + ".json", "r", encoding="utf-8") as f:
+        frame = json.load(f)
+    layers = np.load(base + ".npy", mmap_mode="r" if mmap else None)
+    if layers.ndim != 3 or layers.shape[0] != 3:
+        raise ValueError(f"Grade de alturas inválida: {base}.npy")
+    return HeightGrid(
+        height=layers[LAYER_HEIGHT],
+        raw=layers[LAYER_RAW],
+        mask=layers[LAYER_MASK] > 0,
+        grid_size=frame["grid_size"],
+        origin=frame["origin"],
+        normal=frame["normal"],
+        u=frame["u"],
+        v=frame["v"],
+        min_xy=frame["min_xy"],
+        gaussian_sigma=frame.get("gaussian_sigma", 1.0),
+        fill_holes=frame.get("fill_holes", True),
+        fill_max_radius=frame.get("fill_max_radius", 3),
+        path=base + ".npy",
+    )
+
+
+def height_grid_path_for_volume(volume_json_path: str) -> Optional[str]:
+    """Grade associada a um volume_*.json (campo height_grid); None quando o volume não tem grade."""
+    with open(volume_json_path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    path = payload.get("height_grid")
+    if not path:
+        return None
+    if not os.path.isabs(path) and not os.path.exists(path):
+        path = os.path.join(os.path.dirname(volume_json_path), os.path.basename(path))
+    return path
+
+
+def _crop_slices(grid: HeightGrid, crop: Sequence[float]) -> Tuple[slice, slice]:
+    """Recorte (x_min, y_min, x_max, y_max) em metros no referencial do plano -> fatias da grade."""
+    if len(crop) != 4:
+        raise ValueError("Recorte deve ter 4 valores: x_min, y_min, x_max, y_max (m).")
+    x_min, y_min, x_max, y_max = (float(c) for c in crop)
+    if x_max <= x_min or y_max <= y_min:
+        raise ValueError("Recorte vazio: use x_max > x_min e y_max > y_min.")
+    rows, cols = grid.shape
+    cell, (gx, gy) = grid.grid_size, grid.min_xy
+    c0 = int(np.clip(np.floor((x_min - gx) / cell), 0, cols))
+    c1 = int(np.clip(np.ceil((x_max - gx) / cell), 0, cols))
+    r0 = int(np.clip(np.floor((y_min - gy) / cell), 0, rows))
+    r1 = int(np.clip(np.ceil((y_max - gy) / cell), 0, rows))
+    return slice(r0, r1), slice(c0, c1)
+
+
+def reintegrate_height_grid(
+    grid: HeightGrid,
+    threshold: float = 0.0,
+    crop: Optional[Sequence[float]] = None,
+    gaussian_sigma: Optional[float] = None,
+    fill_holes: Optional[bool] = None,
+    fill_max_radius: Optional[int] = None,
+) -> Dict:
+    """
+    Volume (m³) da grade acima de `threshold` metros do plano, opcionalmente só no recorte
+    `crop` e com outra suavização/preenchimento. Sem parâmetros reproduz o volume original.
+    """
+    start = time.perf_counter()
+    sigma = grid.gaussian_sigma if gaussian_sigma is None else float(gaussian_sigma)
+    fill = grid.fill_holes if fill_holes is None else bool(fill_holes)
+    radius = grid.fill_max_radius if fill_max_radius is None else int(fill_max_radius)
+    resmoothed = (sigma, fill, radius) != (grid.gaussian_sigma, grid.fill_holes, grid.fill_max_radius)
+
+    rows, cols = (slice(None), slice(None)) if crop is None else _crop_slices(grid, crop)
+    if resmoothed:
+        # O recorte vem depois: a suavização da borda depende das células vizinhas
+        height, mask = fill_and_smooth_height_grid(grid.raw, sigma, fill, radius)
+        height, mask = height[rows, cols], mask[rows, cols]
+    else:
+        height, mask = np.asarray(grid.height[rows, cols]), np.asarray(grid.mask[rows, cols])
+
+    above = np.clip(height.astype(np.float64) - float(threshold), 0.0, None)
+    above[~mask] = 0.0
+    cell_area = grid.grid_size ** 2
+    covered = above > 0
+    return {
+        "volume_m3": float(above.sum() * cell_area),
+        "volume_liters": float(above.sum() * cell_area * 1000.0),
+        "area_m2": float(covered.sum() * cell_area),
+        "max_height_m": float(above.max()) if above.size else 0.0,
+        "cells": int(covered.sum()),
+        "threshold_m": float(threshold),
+        "crop": None if crop is None else [float(c) for c in crop],
+        "crop_cells": [rows.start or 0, rows.stop if rows.stop is not None else grid.shape[0],
+                       cols.start or 0, cols.stop if cols.stop is not None else grid.shape[1]],
+        "gaussian_sigma": sigma,
+        "fill_holes": fill,
+        "fill_max_radius": radius,
+        "resmoothed": resmoothed,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000.0, 3),
+    }
@@ -0,0 +1,326 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from src.reconstruction import (
+    _has_cuda_gpu,
+    build_reconstruction_steps,
+    normalize_path,
+    plan_reconstruction,
+    run_step_headless,
+)
+from src.resource_planner import DEFAULT_RAM_GB, detect_hardware
+from src.results_index import record_result
+
+"""
+Módulo: job_queue
+Responsabilidade:
+    - Fila de reconstruções COLMAP: recebe várias pastas de frames e executa as pipelines
+      em paralelo, sem diálogos Tk.
+    - Controle de admissão por orçamento de CPU, RAM e GPU em cada etapa (ex.: um único
+      patch-match por vez, várias extrações de features simultâneas).
+    - Estado persistido em JSON: após reiniciar o backend, jobs interrompidos voltam para a
+      fila e retomam a partir da última etapa concluída.
+"""
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Custo de cada estágio: fração dos núcleos, RAM (GB) e fração da GPU.
+# Custos maiores que a capacidade são limitados a ela (o estágio roda sozinho).
+DEFAULT_STAGE_COSTS = {
+    "features": {"cpu": 0.5, "ram_gb": 2.0, "gpu": 0.25},
+    "matching": {"cpu": 0.5, "ram_gb": 2.0, "gpu": 0.25},
+    "mapping": {"cpu": 0.5, "ram_gb": 4.0, "gpu": 0.0},
+    "undistort": {"cpu": 0.25, "ram_gb": 1.0, "gpu": 0.0},
+    "dense": {"cpu": 0.25, "ram_gb": 6.0, "gpu": 1.0},
+    "dense_cpu": {"cpu": 1.0, "ram_gb": 6.0, "gpu": 0.0},
+    "fusion": {"cpu": 0.5, "ram_gb": 6.0, "gpu": 0.0},
+    "mesh": {"cpu": 0.5, "ram_gb": 4.0, "gpu": 0.0},
+}
+
+
+class ResourceBudget:
+    """Orçamento compartilhado de CPU/RAM/GPU; `acquire` bloqueia até o custo caber."""
+
+    def __init__(self, cpu: float = 1.0, ram_gb: float = DEFAULT_RAM_GB, gpu: float = 1.0):
+        self.capacity = {"cpu": float(cpu), "ram_gb": float(ram_gb), "gpu": float(gpu)}
+        self.used = {key: 0.0 for key in self.capacity}
+        self._cond = threading.Condition()
+
+    def _clamp(self, cost: Dict) -> Dict:
+        return {key: min(max(float(cost.get(key, 0.0)), 0.0), cap) for key, cap in self.capacity.items()}
+
+    def _fits(self, need: Dict) -> bool:
+        return all(self.used[key] + need[key] <= self.capacity[key] + 1e-9 for key in need)
+
+    def try_acquire(self, cost: Dict) -> Optional[Dict]:
+        need = self._clamp(cost)
+        with self._cond:
+            if not self._fits(need):
+                return None
+            for key, value in need.items():
+                self.used[key] += value
+            return need
+
+    def acquire(self, cost: Dict, stop_event: Optional[threading.Event] = None) -> Optional[Dict]:
+        need = self._clamp(cost)
+        with self._cond:
+            while not self._fits(need):
+                if stop_event is not None and stop_event.is_set():
+                    return None
+                self._cond.wait(timeout=0.5)
+            for key, value in need.items():
+                self.used[key] += value
+            return need
+
+    def release(self, need: Optional[Dict]):
+        if not need:
+            return
+        with self._cond:
+            for key, value in need.items():
+                self.used[key] = max(0.0, self.used[key] - value)
+            self._cond.notify_all()
+
+
+def _unique_project_dir(colmap_root_dir: str, name: str) -> str:
+    base = os.path.join(colmap_root_dir, name or "reconstrucao")
+    path, n = base, 2
+    while os.path.exists(path):
+        path = f"{base}_{n}"
+        n += 1
+    return path
+
+
+class ReconstructionJobQueue:
+    """
+    Fila persistente de reconstruções. `runner(cmd, step_name, log)` executa cada etapa
+    (padrão: run_step_headless); pode ser substituído em testes.
+    """
+
+    def __init__(
+        self,
+        state_path: str,
+        colmap_root_dir: str,
+        resources_dir: str,
+        overrides: Optional[Dict] = None,
+        max_jobs: int = 2,
+        stage_costs: Optional[Dict] = None,
+        hardware: Optional[Dict] = None,
+        runner=None,
+    ):
+        self.state_path = state_path
+        self.colmap_root_dir = colmap_root_dir
+        self.resources_dir = resources_dir
+        self.overrides = dict(overrides or {})
+        self.max_jobs = max(1, int(max_jobs))
+        self.stage_costs = {key: dict(value) for key, value in DEFAULT_STAGE_COSTS.items()}
+        for stage, cost in (stage_costs or {}).items():
+            self.stage_costs.setdefault(stage, {}).update(cost)
+        self.hardware = hardware or detect_hardware(has_gpu=_has_cuda_gpu())
+        self.budget = ResourceBudget(
+            cpu=1.0,
+            ram_gb=float(self.hardware.get("ram_gb") or DEFAULT_RAM_GB) * 0.8,
+            gpu=1.0 if self.hardware.get("gpu") else 0.0,
+        )
+        self.runner = runner or run_step_headless
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._jobs: List[Dict] = []
+        self._load()
+
+    # Persistência
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning("Estado da fila ilegível (%s); iniciando vazia.", e)
+            return
+        for job in data.get("jobs", []):
+            # Jobs interrompidos por reinício voltam para a fila
+            if job.get("status") == JOB_RUNNING:
+                job["status"] = JOB_QUEUED
+            self._jobs.append(job)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"jobs": self._jobs}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    # API
+    def submit(self, frames_dir: str, name: Optional[str] = None) -> Dict:
+        frames_dir = normalize_path(os.path.abspath(frames_dir))
+        if not os.path.isdir(frames_dir):
+            raise FileNotFoundError(f"Pasta de frames não encontrada: {frames_dir}")
+        with self._lock:
+            project_dir = _unique_project_dir(self.colmap_root_dir, name or os.path.basename(frames_dir))
+            os.makedirs(project_dir)
+            job = {
+                "id": uuid.uuid4().hex[:12],
+                "name": os.path.basename(project_dir),
+                "frames_dir": frames_dir,
+                "project_dir": normalize_path(project_dir),
+                "status": JOB_QUEUED,
+                "stage": None,
+                "step": 0,
+                "total_steps": None,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "error": None,
+            }
+            self._jobs.append(job)
+            self._save()
+            self._wakeup.notify_all()
+            return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            for job in self._jobs:
+                if job["id"] == job_id:
+                    return dict(job)
+        return None
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            return [dict(job) for job in self._jobs]
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.max_jobs):
+            thread = threading.Thread(target=self._worker, name=f"recon-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        with self._lock:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Espera até não haver jobs na fila nem em execução."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._lock:
+                if not any(job["status"] in (JOB_QUEUED, JOB_RUNNING) for job in self._jobs):
+                    return True
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    # Execução
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            for job in self._jobs:
+                if job["id"] == job_id:
+                    job.update(fields)
+                    break
+            self._save()
+
+    def _next_job(self) -> Optional[Dict]:
+        with self._lock:
+            while not self._stop.is_set():
+                for job in self._jobs:
+                    if job["status"] == JOB_QUEUED:
+                        job["status"] = JOB_RUNNING
+                        job["started_at"] = job.get("started_at") or time.time()
+                        self._save()
+                        return dict(job)
+                self._wakeup.wait(timeout=1.0)
+        return None
+
+    def _worker(self):
+        while not self._stop.is_set():
+            job = self._next_job()
+            if job is None:
+                return
+            self._run_job(job)
+
+    def _job_logger(self, job: Dict) -> logging.Logger:
+        log = logging.getLogger(f"reconstruction.job.{job['id']}")
+        log.setLevel(logging.INFO)
+        log.propagate = False
+        if not log.handlers:
+            handler = logging.FileHandler(os.path.join(job["project_dir"], "reconstruction.log"), encoding="utf-8")
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+            log.addHandler(handler)
+        return log
+
+    def _job_overrides(self) -> Dict:
+        overrides = dict(self.overrides)
+        if self.max_jobs > 1 and "threads" not in overrides:
+            # Com jobs simultâneos, cada COLMAP usa só a sua fatia dos núcleos
+            cores = int(self.hardware.get("cores") or 1)
+            overrides["threads"] = max(1, round(cores * self.stage_costs["features"]["cpu"]))
+        return overrides
+
+    def _run_job(self, job: Dict):
+        log = self._job_logger(job)
+        job_id = job["id"]
+        try:
+            plan = plan_reconstruction(job["frames_dir"], self._job_overrides(), log=log)
+            steps = build_reconstruction_steps(job["frames_dir"], job["project_dir"], self.resources_dir, plan, log=log)
+            self._update(job_id, total_steps=len(steps), dense_backend=plan["dense_backend"])
+
+            for index in range(int(job.get("step") or 0), len(steps)):
+                cmd, title, stage = steps[index]
+                need = self.budget.acquire(self.stage_costs.get(stage, {}), self._stop)
+                if need is None:
+                    # Backend encerrando: o job continua "running" no disco e é retomado no reinício
+                    return
+                self._update(job_id, stage=stage)
+                try:
+                    self.runner(cmd, title, log)
+                finally:
+                    self.budget.release(need)
+                if stage == "mapping" and not os.path.exists(os.path.join(job["project_dir"], "sparse", "0")):
+                    raise RuntimeError("Modelo esparso não gerado. Poucas correspondências.")
+                self._update(job_id, step=index + 1)
+
+            self._update(job_id, status=JOB_DONE, stage=None, finished_at=time.time())
+            record_result("reconstruction", job["project_dir"])
+            log.info("Job %s concluído.", job_id)
+        except Exception as e:
+            log.exception("Job %s falhou", job_id)
+            self._update(job_id, status=JOB_FAILED, error=str(e), finished_at=time.time())
+        finally:
+            for handler in log.handlers[:]:
+                handler.close()
+                log.removeHandler(handler)
+
+
+def create_job_queue_from_config(cfg: Dict, base_dir: str = ".") -> ReconstructionJobQueue:
+    """Cria a fila a partir do config.yaml (paths.colmap_output e parameters.reconstruction)."""
+    def _abs(path):
+        return path if os.path.isabs(path) else os.path.normpath(os.path.join(base_dir, path))
+
+    recon_cfg = dict(cfg.get("parameters", {}).get("reconstruction", {}) or {})
+    queue_cfg = recon_cfg.pop("queue", {}) or {}
+    colmap_root = _abs(cfg["paths"]["colmap_output"])
+    return ReconstructionJobQueue(
+        state_path=_abs(queue_cfg.get("state_file") or os.path.join(colmap_root, "job_queue.json")),
+        colmap_root_dir=colmap_root,
+        resources_dir=_abs(cfg["paths"]["resources"]),
+        overrides=recon_cfg,
+        max_jobs=queue_cfg.get("max_jobs", 2),
+        stage_costs=queue_cfg.get("stage_costs"),
+    )
@@ -0,0 +1,96 @@
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+"""
+Módulo: mesh_export
+Responsabilidade:
+    - Converter a malha da reconstrução (meshed.ply) para OBJ, STL binário ou glTF binário (.glb).
+    - Gerar cada formato sob demanda, com cache por data de modificação: a conversão só é refeita
+      quando a malha de origem muda.
+    - A reconstrução não espera conversões: cada formato é gerado quando um consumidor o pede
+      (GET /exportar-malha), em uma thread de fundo que atende pedidos repetidos com o mesmo Future.
+"""
+
+EXPORT_FORMATS = {"obj": ".obj", "stl": ".stl", "glb": ".glb"}
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_IN_FLIGHT: Dict[tuple, Future] = {}
+_LOCK = threading.Lock()
+
+
+def export_path_for(mesh_path: str, fmt: str) -> str:
+    fmt = fmt.lower().lstrip(".")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportação não suportado: {fmt} (use {', '.join(EXPORT_FORMATS)})")
+    return os.path.splitext(mesh_path)[0] + EXPORT_FORMATS[fmt]
+
+
+def is_export_current(mesh_path: str, output_path: str) -> bool:
+    return os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(mesh_path)
+
+
+def export_mesh(mesh_path: str, fmt: str, output_path: Optional[str] = None) -> str:
+    """Converte `mesh_path` para `fmt`; reaproveita o arquivo existente se estiver atualizado."""
+    import trimesh
+
+    if not os.path.exists(mesh_path):
+        raise FileNotFoundError(f"Malha não encontrada: {mesh_path}")
+    output_path = output_path or export_path_for(mesh_path, fmt)
+    if is_export_current(mesh_path, output_path):
+        return output_path
+
+    mesh = trimesh.load(mesh_path, force="mesh", process=False)
+    if not isinstance(mesh, trimesh.Trimesh) or len(mesh.faces) == 0:
+        # Nuvem de pontos não vira OBJ/STL/GLB: o consumidor deve usar o .ply original
+        raise ValueError(f"O arquivo não contém faces (nuvem de pontos): {mesh_path}")
+
+    tmp_path = f"{output_path}.tmp"
+    mesh.export(tmp_path, file_type=fmt.lower().lstrip("."))
+    os.replace(tmp_path, output_path)
+    logging.info("Malha exportada: %s -> %s", mesh_path, output_path)
+    return output_path
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mesh-export")
+    return _EXECUTOR
+
+
+def _run_export(key, mesh_path, fmt):
+    try:
+        return export_mesh(mesh_path, fmt)
+    except Exception as e:
+        logging.warning("Exportação %s falhou para %s: %s", fmt, mesh_path, e)
+        raise
+    finally:
+        with _LOCK:
+            _IN_FLIGHT.pop(key, None)
+
+
+def export_in_background(mesh_path: str, formats: Iterable[str]) -> Dict[str, Future]:
+    """Agenda as conversões na thread de fundo; pedidos repetidos reutilizam o mesmo Future."""
+    futures = {}
+    with _LOCK:
+        for fmt in formats:
+            fmt = fmt.lower().lstrip(".")
+            export_path_for(mesh_path, fmt)  # valida o formato antes de agendar
+            key = (os.path.abspath(mesh_path), fmt)
+            future = _IN_FLIGHT.get(key)
+            if future is None:
+                future = _executor().submit(_run_export, key, mesh_path, fmt)
+                _IN_FLIGHT[key] = future
+            futures[fmt] = future
+    return futures
+
+
+def get_export(mesh_path: str, fmt: str, timeout: Optional[float] = None) -> str:
+    """Formato pedido por um consumidor: usa o cache, ou espera a conversão (em andamento ou nova)."""
+    output_path = export_path_for(mesh_path, fmt)
+    if os.path.exists(mesh_path) and is_export_current(mesh_path, output_path):
+        return output_path
+    return export_in_background(mesh_path, [fmt])[fmt.lower().lstrip(".")].result(timeout)
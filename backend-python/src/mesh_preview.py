@@ -0,0 +1,179 @@
+import logging
+import math
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+"""
+Módulo: mesh_preview
+Responsabilidade:
+    - Gerar a prévia leve (nível de detalhe reduzido) da geometria de uma reconstrução para o
+      visualizador 3D do histórico: malha decimada ou nuvem de pontos subamostrada.
+    - Cache em disco ao lado do original (<nome>_preview.ply), refeito só quando o original
+      muda (data de modificação); geometria já dentro do orçamento é usada como está.
+    - Geração em uma thread de fundo, uma vez por arquivo: pedidos repetidos reutilizam o Future.
+    - Prévia logo ao fim da reconstrução só em processos de longa duração (interface, pool de
+      trabalho); nos de uma tarefa só ela fica para o histórico, sob demanda.
+"""
+
+# Ordem de preferência da geometria exibida para uma reconstrução
+VIEW_CANDIDATES = ("meshed.ply", "mesh_poisson.ply", "fused.ply")
+PREVIEW_SUFFIX = "_preview.ply"
+DEFAULT_MAX_TRIANGLES = 200_000
+DEFAULT_MAX_POINTS = 500_000
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_IN_FLIGHT: Dict[str, Future] = {}
+_WITHIN_BUDGET: Dict[str, float] = {}  # original já pequeno (caminho -> mtime): não relê o arquivo
+_LOCK = threading.Lock()
+_BACKGROUND_PREVIEWS = False
+
+
+def find_view_geometry(recon_dir: str) -> Optional[str]:
+    """Geometria completa da reconstrução (dense/meshed.ply, mesh_poisson.ply ou fused.ply)."""
+    dense_dir = os.path.join(recon_dir, "dense")
+    return next((os.path.join(dense_dir, name) for name in VIEW_CANDIDATES
+                 if os.path.exists(os.path.join(dense_dir, name))), None)
+
+
+def preview_path_for(source_path: str) -> str:
+    return os.path.splitext(source_path)[0] + PREVIEW_SUFFIX
+
+
+def is_preview_current(source_path: str, preview_path: Optional[str] = None) -> bool:
+    preview_path = preview_path or preview_path_for(source_path)
+    return os.path.exists(preview_path) and os.path.getmtime(preview_path) >= os.path.getmtime(source_path)
+
+
+def read_view_geometry(path: str, with_normals: bool = False):
+    """Malha com triângulos ou, na falta deles, nuvem de pontos."""
+    import open3d as o3d
+
+    o3d.utility.set_verbosity_level(o3d.utility.VerbosityLevel.Error)
+    mesh = o3d.io.read_triangle_mesh(path)
+    if not mesh.is_empty() and len(mesh.triangles) > 0:
+        if with_normals:
+            mesh.compute_vertex_normals()
+        return mesh
+    cloud = o3d.io.read_point_cloud(path)
+    if cloud.is_empty():
+        raise ValueError(f"Arquivo vazio: {path}")
+    return cloud
+
+
+def _decimate_mesh(mesh, max_triangles: int):
+    # Agrupamento de vértices é linear no tamanho da malha: leva malhas de milhões de
+    # triângulos para perto do orçamento; a decimação quádrica (lenta) só fecha a diferença.
+    extent = mesh.get_max_bound() - mesh.get_min_bound()
+    diag = float((extent ** 2).sum() ** 0.5)
+    ratio = len(mesh.triangles) / float(max_triangles)
+    if ratio > 4.0 and diag > 0:
+        mean_edge = diag / math.sqrt(len(mesh.triangles))
+        mesh = mesh.simplify_vertex_clustering(voxel_size=mean_edge * math.sqrt(ratio) * 0.5)
+    if len(mesh.triangles) > max_triangles:
+        mesh = mesh.simplify_quadric_decimation(target_number_of_triangles=int(max_triangles))
+    mesh.remove_unreferenced_vertices()
+    return mesh
+
+
+def build_preview(
+    source_path: str,
+    max_triangles: int = DEFAULT_MAX_TRIANGLES,
+    max_points: int = DEFAULT_MAX_POINTS,
+) -> str:
+    """
+    Caminho da geometria a exibir primeiro: a prévia em cache, uma prévia nova ou o próprio
+    original quando ele já cabe no orçamento de triângulos/pontos.
+    """
+    import open3d as o3d
+
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"Geometria não encontrada: {source_path}")
+    preview_path = preview_path_for(source_path)
+    if is_preview_current(source_path, preview_path):
+        return preview_path
+    key, mtime = os.path.abspath(source_path), os.path.getmtime(source_path)
+    if _WITHIN_BUDGET.get(key) == mtime:
+        return source_path
+
+    geom = read_view_geometry(source_path)
+    if isinstance(geom, o3d.geometry.TriangleMesh):
+        if len(geom.triangles) <= max_triangles:
+            _WITHIN_BUDGET[key] = mtime
+            return source_path
+        preview = _decimate_mesh(geom, max_triangles)
+        write = o3d.io.write_triangle_mesh
+    else:
+        count = len(geom.points)
+        if count <= max_points:
+            _WITHIN_BUDGET[key] = mtime
+            return source_path
+        preview = geom.uniform_down_sample(int(math.ceil(count / float(max_points))))
+        write = o3d.io.write_point_cloud
+
+    tmp_path = preview_path[:-4] + ".tmp.ply"  # o Open3D escolhe o formato pela extensão
+    if not write(tmp_path, preview):
+        raise RuntimeError(f"Falha ao gravar a prévia: {preview_path}")
+    os.replace(tmp_path, preview_path)
+    logging.info("Prévia gerada: %s -> %s", source_path, preview_path)
+    return preview_path
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mesh-preview")
+    return _EXECUTOR
+
+
+def _run_preview(key, source_path, max_triangles, max_points):
+    try:
+        return build_preview(source_path, max_triangles, max_points)
+    except Exception as e:
+        logging.warning("Prévia falhou para %s: %s", source_path, e)
+        raise
+    finally:
+        with _LOCK:
+            _IN_FLIGHT.pop(key, None)
+
+
+def preview_in_background(
+    source_path: str,
+    max_triangles: int = DEFAULT_MAX_TRIANGLES,
+    max_points: int = DEFAULT_MAX_POINTS,
+) -> Future:
+    """Agenda a prévia na thread de fundo; pedidos repetidos reutilizam o mesmo Future."""
+    key = os.path.abspath(source_path)
+    if os.path.exists(source_path) and is_preview_current(source_path):
+        done = Future()
+        done.set_result(preview_path_for(source_path))
+        return done
+    with _LOCK:
+        future = _IN_FLIGHT.get(key)
+        if future is None:
+            future = _executor().submit(_run_preview, key, source_path, int(max_triangles), int(max_points))
+            _IN_FLIGHT[key] = future
+    return future
+
+
+def enable_background_previews(enabled: bool = True):
+    """
+    Marca o processo como de longa duração. Em um processo de uma tarefa só (task_runner,
+    main.py) a thread de fundo, que não é daemon, seguraria a saída do interpretador.
+    """
+    global _BACKGROUND_PREVIEWS
+    _BACKGROUND_PREVIEWS = bool(enabled)
+
+
+def background_previews_enabled() -> bool:
+    return _BACKGROUND_PREVIEWS
+
+
+def preview_options(cfg: Optional[Dict]) -> Dict:
+    """Orçamentos de parameters.preview (max_triangles, max_points)."""
+    preview_cfg = ((cfg or {}).get("parameters") or {}).get("preview") or {}
+    return {
+        "max_triangles": int(preview_cfg.get("max_triangles", DEFAULT_MAX_TRIANGLES)),
+        "max_points": int(preview_cfg.get("max_points", DEFAULT_MAX_POINTS)),
+    }
@@ -4,7 +4,8 @@ import numpy as np
 import trimesh
 import open3d as o3d
 import cv2
-from scipy.ndimage import gaussian_filter
+from src.geometry_cache import load_trimesh, read_point_cloud, read_triangle_mesh
+from src.height_grid import HeightGrid, fill_and_smooth_height_grid
 
 """
 Módulo: processing
@@ -17,7 +18,7 @@ Responsabilidade:
 
 
 def load_mesh(mesh_path: str) -> trimesh.Trimesh:
-    mesh = trimesh.load(mesh_path, force="mesh")
+    mesh = load_trimesh(mesh_path)
     if isinstance(mesh, trimesh.Scene):
         geometries = list(mesh.geometry.values())
         if not geometries:
@@ -44,7 +45,7 @@ def generate_mesh_from_dense_point_cloud(
     radius_scale: float = 0.01,
     keep_largest_component: bool = True,
 ) -> Dict[str, Union[str, int, float]]:
-    pcd = o3d.io.read_point_cloud(dense_ply_path)
+    pcd = read_point_cloud(dense_ply_path)
     if pcd.is_empty():
         raise ValueError("Nuvem de pontos densa vazia ou inválida.")
 
@@ -141,6 +142,59 @@ def compute_segment_scale(
     return real_distance / dist_mesh
 
 
+def downsample_for_display(
+    pcd: o3d.geometry.PointCloud,
+    max_points: int = 300_000,
+    max_iterations: int = 8,
+) -> Tuple[o3d.geometry.PointCloud, float]:
+    """
+    Nuvem para exibição com no máximo `max_points` pontos (voxel: cobertura uniforme da cena).
+    Retorna (nuvem, tamanho do voxel); voxel 0.0 quando a nuvem já cabe no orçamento.
+    """
+    count = len(pcd.points)
+    if count <= max_points:
+        return pcd, 0.0
+    diag = float(np.linalg.norm(pcd.get_max_bound() - pcd.get_min_bound()))
+    # Superfícies escaneadas: pontos ~ área / voxel², então o voxel cresce com sqrt(razão)
+    voxel = max(diag / np.sqrt(float(max_points)) * 0.5, 1e-9)
+    display = pcd
+    for _ in range(max_iterations):
+        display = pcd.voxel_down_sample(voxel)
+        if len(display.points) <= max_points:
+            return display, float(voxel)
+        voxel *= max(np.sqrt(len(display.points) / float(max_points)), 1.1)
+    step = int(np.ceil(len(display.points) / float(max_points)))
+    return display.uniform_down_sample(step), float(voxel)
+
+
+def snap_to_full_resolution(
+    tree,
+    points: np.ndarray,
+    hint: np.ndarray,
+    radius: float = 0.0,
+    ray_origin: Optional[np.ndarray] = None,
+    ray_dir: Optional[np.ndarray] = None,
+) -> Tuple[int, np.ndarray]:
+    """
+    Ponto da nuvem completa correspondente a uma seleção feita na nuvem de exibição.
+    `tree` é o cKDTree de `points`. Com o raio de visada, escolhe entre os pontos a até
+    `radius` de `hint` o mais próximo do raio (o que está sob a mira); senão, o mais próximo de `hint`.
+    """
+    hint = np.asarray(hint, dtype=float)
+    if radius > 0 and ray_origin is not None and ray_dir is not None:
+        candidates = tree.query_ball_point(hint, r=radius)
+        if candidates:
+            idxs = np.asarray(candidates, dtype=int)
+            direction = np.asarray(ray_dir, dtype=float)
+            direction = direction / max(float(np.linalg.norm(direction)), 1e-12)
+            w = points[idxs] - np.asarray(ray_origin, dtype=float)
+            perp = w - (w @ direction)[:, None] * direction[None, :]
+            idx = int(idxs[int(np.argmin(np.einsum("ij,ij->i", perp, perp)))])
+            return idx, np.asarray(points[idx], dtype=float)
+    _, idx = tree.query(hint)
+    return int(idx), np.asarray(points[int(idx)], dtype=float)
+
+
 def scale_mesh(mesh: trimesh.Trimesh, scale: float) -> trimesh.Trimesh:
     if scale <= 0:
         raise ValueError("scale deve ser > 0.")
@@ -585,7 +639,9 @@ def _improved_heightmap_volume(
     gaussian_sigma: float = 1.0,
     fill_holes: bool = True,
     fill_max_radius: int = 3,
+    return_grid: bool = False,
 ) -> Tuple[float, Dict[str, Union[float, int, List[float]]]]:
+    # return_grid: inclui meta["height_grid"] (HeightGrid) para gravar e reintegrar depois
     # Build 2D coordinate system on the plane
     helper = np.array([1.0, 0.0, 0.0], dtype=float)
     if abs(np.dot(helper, normal)) > 0.9:
@@ -623,37 +679,13 @@ def _improved_heightmap_volume(
     height_grid = np.zeros((h, w), dtype=np.float32)
     np.maximum.at(height_grid, (yi, xi), heights.astype(np.float32))
 
-    data_mask = height_grid > 0
-
-    # Hole filling: only fill empty cells that are truly surrounded by data
-    # (majority of 3x3 neighbours must be filled — threshold > 0.5)
-    if fill_holes and fill_max_radius > 0:
-        from scipy.ndimage import uniform_filter
-        empty = ~data_mask
-        for _ in range(fill_max_radius):
-            if not np.any(empty):
-                break
-            count = uniform_filter(data_mask.astype(np.float32), size=3, mode="constant")
-            h_sum = uniform_filter(height_grid, size=3, mode="constant")
-            # Only fill cells where >50% of 3x3 neighbourhood has data
-            fillable = empty & (count > 0.5)
-            if not np.any(fillable):
-                break
-            height_grid[fillable] = h_sum[fillable] / np.clip(count[fillable], 1e-9, None)
-            data_mask = height_grid > 0
-            empty = ~data_mask
-
-    # Normalized Gaussian smoothing: avoids zero-bleeding from empty cells
-    if gaussian_sigma > 0 and np.any(data_mask):
-        weight = data_mask.astype(np.float32)
-        smoothed_h = gaussian_filter(height_grid * weight, sigma=gaussian_sigma)
-        smoothed_w = gaussian_filter(weight, sigma=gaussian_sigma)
-        valid = smoothed_w > 1e-9
-        height_grid[valid & data_mask] = smoothed_h[valid & data_mask] / smoothed_w[valid & data_mask]
-        height_grid[~data_mask] = 0.0
+    raw_grid = height_grid
+    height_grid, data_mask = fill_and_smooth_height_grid(
+        raw_grid, gaussian_sigma=gaussian_sigma, fill_holes=fill_holes, fill_max_radius=fill_max_radius
+    )
 
     volume = float(height_grid.sum() * (grid_size ** 2))
-    return volume, {
+    meta = {
         "grid_size": float(grid_size),
         "grid_width": w,
         "grid_height": h,
@@ -661,6 +693,13 @@ def _improved_heightmap_volume(
         "gaussian_sigma": float(gaussian_sigma),
         "fill_holes": fill_holes,
     }
+    if return_grid:
+        meta["height_grid"] = HeightGrid(
+            height=height_grid, raw=raw_grid, mask=data_mask, grid_size=grid_size,
+            origin=p0, normal=normal, u=u, v=v, min_xy=min_xy,
+            gaussian_sigma=gaussian_sigma, fill_holes=fill_holes, fill_max_radius=fill_max_radius,
+        )
+    return volume, meta
 
 
 def compute_heightmap_volume_from_point_cloud(
@@ -763,6 +802,7 @@ def compute_bean_volume_from_point_cloud(
     hsv_profiles: Optional[List[Dict[str, Tuple[int, int, int]]]] = None,
     detection_cfg: Optional[Dict] = None,
     heightmap_cfg: Optional[Dict] = None,
+    return_grid: bool = False,
 ) -> Tuple[float, Dict[str, Union[float, int, List[float]]]]:
     if scale <= 0:
         raise ValueError("scale deve ser > 0.")
@@ -850,6 +890,7 @@ def compute_bean_volume_from_point_cloud(
         gaussian_sigma=hm_cfg.get("gaussian_sigma", 1.0),
         fill_holes=hm_cfg.get("fill_holes", True),
         fill_max_radius=hm_cfg.get("fill_max_radius", 3),
+        return_grid=return_grid,
     )
 
     # Step 10: Assemble metadata
@@ -1104,7 +1145,7 @@ def _refine_corners_subpix(gray: np.ndarray, corners: np.ndarray) -> np.ndarray:
 
 
 def _point_cloud_from_mesh(mesh_path: str) -> Optional[o3d.geometry.PointCloud]:
-    mesh = o3d.io.read_triangle_mesh(mesh_path, enable_post_processing=True)
+    mesh = read_triangle_mesh(mesh_path)
     if mesh.is_empty():
         return None
     if len(mesh.vertex_colors) == 0:
@@ -1120,13 +1161,13 @@ def _load_colored_point_cloud(mesh_path: str) -> Tuple[o3d.geometry.PointCloud,
     if pcd is not None and not pcd.is_empty() and pcd.has_colors():
         return pcd, mesh_path
 
-    pcd = o3d.io.read_point_cloud(mesh_path)
+    pcd = read_point_cloud(mesh_path)
     if not pcd.is_empty() and pcd.has_colors():
         return pcd, mesh_path
 
     candidate = os.path.join(os.path.dirname(mesh_path), "fused.ply")
     if os.path.exists(candidate):
-        pcd = o3d.io.read_point_cloud(candidate)
+        pcd = read_point_cloud(candidate)
         if not pcd.is_empty() and pcd.has_colors():
             return pcd, candidate
 
@@ -1148,7 +1189,7 @@ def _load_colored_point_cloud_from_recon(
         if not os.path.exists(path):
             continue
         try:
-            pcd = o3d.io.read_point_cloud(path)
+            pcd = read_point_cloud(path)
             if not pcd.is_empty() and pcd.has_colors():
                 return pcd, path
         except Exception:
@@ -1156,6 +1197,32 @@ def _load_colored_point_cloud_from_recon(
     raise ValueError("Não foi possível obter uma nuvem colorida da reconstrução.")
 
 
+def ensure_volume_mesh(mesh_path: str) -> str:
+    """
+    Caminho de uma malha triangulada para o cálculo de volume: o próprio arquivo, ou uma malha
+    Poisson gerada ao lado (mesh_poisson_from_dense.ply) quando o arquivo é uma nuvem de pontos.
+    """
+    mesh = read_triangle_mesh(mesh_path)
+    if not mesh.is_empty() and len(mesh.triangles) > 0 and len(mesh.vertices) > 0:
+        return mesh_path
+
+    pcd = read_point_cloud(mesh_path)
+    if pcd.is_empty():
+        raise ValueError(
+            "Arquivo selecionado sem malha valida e sem nuvem de pontos valida."
+        )
+
+    dense_dir = os.path.dirname(mesh_path)
+    output_ply = os.path.join(dense_dir, "mesh_poisson_from_dense.ply")
+    output_stl = os.path.join(dense_dir, "mesh_poisson_from_dense.stl")
+    generate_mesh_from_dense_point_cloud(
+        dense_ply_path=mesh_path,
+        output_ply_path=output_ply,
+        output_stl_path=output_stl,
+    )
+    return output_ply
+
+
 def _plane_basis(plane_model: List[float]):
     normal = np.array(plane_model[:3], dtype=float)
     norm = float(np.linalg.norm(normal))
@@ -3,11 +3,18 @@ import os
 import platform
 import logging
 import re
+import sqlite3
+import threading
 import time
+from functools import lru_cache
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk, simpledialog
 from collections import deque
-import open3d as o3d  # Certifique-se de ter instalado: pip install open3d
+from src.acquisition import expected_frame_count, manifest_image_stats, read_camera_intrinsics
+from src.dense_cpu import run_cpu_dense_reconstruction
+from src.mesh_export import export_mesh
+from src.resource_planner import detect_hardware, format_plan, inspect_images, plan_colmap_resources, query_nvidia_gpus
+from src.task_jobs import report_progress
 
 
 def _center_dialog_parent(root, width=420, height=320):
@@ -29,27 +36,12 @@ def _center_dialog_parent(root, width=420, height=320):
 
 
 def converter_ply_para_obj(arquivo_ply):
-    if not os.path.exists(arquivo_ply):
-        logging.error(f"Conversão falhou: Arquivo {arquivo_ply} não encontrado.")
-        return
-
-    arquivo_obj = arquivo_ply.replace(".ply", ".obj")
-    logging.info(f"Iniciando conversão de malha: {arquivo_ply} -> {arquivo_obj}")
-
+    """Exporta o .ply como OBJ (síncrono). Nuvens de pontos sem faces não são convertidas."""
     try:
-        # Tenta carregar como malha (TriangleMesh)
-        mesh = o3d.io.read_triangle_mesh(arquivo_ply)
-
-        if not mesh.has_triangles():
-            logging.warning("O arquivo .ply não contém triângulos (faces). Salvando como nuvem de pontos no .obj.")
-            pcd = o3d.io.read_point_cloud(arquivo_ply)
-            o3d.io.write_point_cloud(arquivo_obj, pcd)
-        else:
-            o3d.io.write_triangle_mesh(arquivo_obj, mesh)
-
-        logging.info("Conversão para .obj concluída com sucesso.")
+        return export_mesh(arquivo_ply, "obj")
     except Exception as e:
-        logging.error(f"Erro técnico na conversão: {str(e)}")
+        logging.error(f"Conversão para .obj falhou: {str(e)}")
+        return None
 
 
 # Log para visuzalição da execução:
@@ -72,6 +64,7 @@ def normalize_path(path: str) -> str:
     return path.replace("\\", "/")
 
 
+@lru_cache(maxsize=None)
 def _colmap_help(tool: str) -> str:
     try:
         return subprocess.check_output(
@@ -147,27 +140,130 @@ def _ini_to_args(entries: dict, exclude: set, tool: str) -> str:
     return " ".join(parts)
 
 
-def _feature_extractor_opts(config) -> str:
-    opts = []
-    if _colmap_has_option("feature_extractor", "--FeatureExtraction.use_gpu"):
-        opts += ["--FeatureExtraction.use_gpu", str(config["use_gpu"])]
-    elif _colmap_has_option("feature_extractor", "--SiftExtraction.use_gpu"):
-        opts += ["--SiftExtraction.use_gpu", str(config["use_gpu"])]
+# Caminhos definidos pela pipeline; nunca vêm dos .ini
+_INI_EXCLUDE_COMMON = frozenset({
+    "project_path",
+    "database_path",
+    "image_path",
+    "input_path",
+    "output_path",
+    "workspace_path",
+})
+
+
+def _first_supported_option(tool: str, names) -> str:
+    for name in names:
+        if _colmap_has_option(tool, f"--{name}"):
+            return name
+    return ""
+
+
+def _ini_explicit_value(ini_entries: dict, names):
+    """Valor definido no .ini para a opção (qualquer nome alternativo); None se ausente, vazio ou -1."""
+    for name in names:
+        value = str(ini_entries.get(name, "")).strip()
+        if value and value != "-1":
+            return value
+    return None
+
+
+def _plan_forced_keys(plan) -> set:
+    """Chaves do plano que prevalecem sobre o .ini: as do config.yaml e use_gpu quando não há GPU."""
+    forced = set(plan.get("overrides") or ())
+    if not plan.get("use_gpu"):
+        forced.add("use_gpu")  # use_gpu=1 no .ini quebraria a execução sem GPU
+    return forced
+
+
+def _planned_args(tool: str, candidates, ini_entries: dict, exclude: set, forced=frozenset()):
+    """
+    Monta (args do plano, args do .ini) de uma ferramenta do COLMAP.
+    `candidates` é uma lista de (nomes alternativos da opção, valor, chave do plano). Valores
+    ajustados no .ini prevalecem sobre o plano, que só preenche opções ausentes ou em -1; chaves em
+    `forced` (config.yaml) e candidatos sem chave do plano (intrínsecos da calibração) sempre valem.
+    O primeiro nome aceito pela versão instalada recebe o valor e todos os nomes saem do .ini.
+    """
+    planned = []
+    planned_names = set()
+    for names, value, plan_key in candidates:
+        if plan_key is not None and plan_key not in forced:
+            ini_value = _ini_explicit_value(ini_entries, names)
+            if ini_value is not None:
+                value = ini_value
+        planned_names.update(names)
+        name = _first_supported_option(tool, names)
+        if name:
+            planned.append(f"--{name} {value}")
+    ini_args = _ini_to_args(ini_entries, exclude | planned_names, tool)
+    return " ".join(planned), ini_args
+
+
+def _feature_extractor_opts(plan, intrinsics=None) -> list:
+    opts = [
+        (("FeatureExtraction.use_gpu", "SiftExtraction.use_gpu"), plan["use_gpu"], "use_gpu"),
+        (("FeatureExtraction.num_threads", "SiftExtraction.num_threads"), plan["feature_threads"], "feature_threads"),
+        (("FeatureExtraction.max_image_size", "SiftExtraction.max_image_size"), plan["max_image_size"],
+         "max_image_size"),
+    ]
+    if intrinsics:
+        # Frames sem distorção (calibração aplicada na extração): câmera PINHOLE conhecida
+        opts += [
+            (("ImageReader.camera_model",), intrinsics["model"], None),
+            (("ImageReader.camera_params",), ",".join(f"{v:.6f}" for v in intrinsics["params"]), None),
+        ]
+    return opts
+
+
+_CUDA_GPU_CACHE = None
+
+
+def _has_cuda_gpu() -> bool:
+    """Detecta GPU CUDA: nvidia-smi lista alguma placa e o COLMAP não foi compilado sem CUDA."""
+    global _CUDA_GPU_CACHE
+    if _CUDA_GPU_CACHE is not None:
+        return _CUDA_GPU_CACHE
+    has_gpu = bool(query_nvidia_gpus())
+    if has_gpu and "without CUDA" in _colmap_help("patch_match_stereo"):
+        has_gpu = False
+    _CUDA_GPU_CACHE = has_gpu
+    return has_gpu
 
-    if _colmap_has_option("feature_extractor", "--FeatureExtraction.num_threads"):
-        opts += ["--FeatureExtraction.num_threads", str(config["threads"])]
-    elif _colmap_has_option("feature_extractor", "--SiftExtraction.num_threads"):
-        opts += ["--SiftExtraction.num_threads", str(config["threads"])]
-    return " ".join(opts)
+
+def _exhaustive_matcher_opts(plan) -> list:
+    return [
+        (("FeatureMatching.use_gpu", "SiftMatching.use_gpu"), plan["use_gpu"], "use_gpu"),
+        (("FeatureMatching.num_threads", "SiftMatching.num_threads"), plan["matcher_threads"], "matcher_threads"),
+    ]
+
+
+def _mapper_opts(plan, intrinsics=None) -> list:
+    opts = [
+        (("Mapper.num_threads",), plan["mapper_threads"], "mapper_threads"),
+    ]
+    if intrinsics:
+        # Intrínsecos vindos da calibração: o bundle adjustment não os refina
+        opts += [
+            (("Mapper.ba_refine_focal_length",), 0, None),
+            (("Mapper.ba_refine_principal_point",), 0, None),
+            (("Mapper.ba_refine_extra_params",), 0, None),
+        ]
+    return opts
 
 
-def _exhaustive_matcher_opts(config) -> str:
-    opts = []
-    if _colmap_has_option("exhaustive_matcher", "--FeatureMatching.use_gpu"):
-        opts += ["--FeatureMatching.use_gpu", str(config["use_gpu"])]
-    elif _colmap_has_option("exhaustive_matcher", "--SiftMatching.use_gpu"):
-        opts += ["--SiftMatching.use_gpu", str(config["use_gpu"])]
-    return " ".join(opts)
+def _patch_match_opts(plan) -> list:
+    return [
+        (("PatchMatchStereo.gpu_index",), plan["gpu_index"], "gpu_index"),
+        (("PatchMatchStereo.max_image_size",), plan["max_image_size"], "max_image_size"),
+        (("PatchMatchStereo.window_radius",), plan["patch_match_window_radius"], "patch_match_window_radius"),
+        (("PatchMatchStereo.cache_size",), plan["patch_match_cache_size"], "patch_match_cache_size"),
+    ]
+
+
+def _stereo_fusion_opts(plan) -> list:
+    return [
+        (("StereoFusion.num_threads",), plan["fusion_threads"], "fusion_threads"),
+        (("StereoFusion.cache_size",), plan["fusion_cache_size"], "fusion_cache_size"),
+    ]
 
 
 # Janela de Progresso Gráfica
@@ -245,8 +341,10 @@ class ReconstructProgressWindow:
             pct = int((current / total) * 100)
             self._last_progress = (current, total)
             self.label_sub.config(text=f"Processando: {current} / {total} ({pct}%)")
+            report_progress(current=current, total=total)
         else:
             self.label_sub.config(text=line[:140])
+            report_progress(message=line)
         self._append_log(line)
         self._update_time()
         self.root.update()
@@ -373,6 +471,22 @@ def run_cmd_gui(cmd, step_name, gui_window):
         raise subprocess.CalledProcessError(process.returncode, cmd)
 
 
+# Executa uma etapa Python (sem subprocesso) com o mesmo log e GUI dos comandos:
+def run_callable_gui(fn, step_name, gui_window):
+    print(f"> {step_name}...")
+    gui_window.start_step(step_name)
+
+    def progress(current, total):
+        line = f"[{current}/{total}] {step_name}"
+        logging.info(line)
+        gui_window.update_sub_progress(line)
+
+    result = fn(progress)
+    logging.info("%s: %s", step_name, result)
+    gui_window.stop_spinner()
+    return result
+
+
 # Janela de Erro simplificada: Ver Log de Erro ou Fechar
 def exibir_erro_com_log(mensagem, log_path, sistema):
     """Mostra janela de erro com opções diretas de ação."""
@@ -461,7 +575,7 @@ def selecionar_pasta_frames(caminho_base_cfg):
         return None
 
     # 4. TRATAMENTO: Verificar se a pasta contém fotos válidas
-    extensoes_fotos = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.JPG', '.JPEG', '.PNG')
+    extensoes_fotos = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp', '.JPG', '.JPEG', '.PNG')
     try:
         arquivos_na_pasta = os.listdir(pasta_selecionada)
         fotos_encontradas = [f for f in arquivos_na_pasta if f.lower().endswith(extensoes_fotos)]
@@ -494,7 +608,7 @@ def selecionar_pasta_frames(caminho_base_cfg):
                     fotos_encontradas = [f for f in arquivos_na_pasta if f.lower().endswith(extensoes_fotos)]
 
         if not fotos_encontradas:
-            tipos_str = ", ".join(['.jpg', '.png', '.jpeg'])
+            tipos_str = ", ".join(['.jpg', '.png', '.jpeg', '.webp'])
             messagebox.showerror("Pasta sem Fotos",
                                  f"A pasta selecionada não contém fotos válidas!\n\n"
                                  f"Certifique-se de que os frames (extensões {tipos_str}) estão dentro desta pasta.",
@@ -597,31 +711,32 @@ def obter_pasta_reconstrucao(pasta_base_colmap):
         return caminho_final
 
 
-# Pipeline Principal
-def run_colmap_reconstruction(frames_root_dir, colmap_root_dir, resources_dir):
-    sistema = platform.system()
-    CONFIG = {"threads": 10, "use_gpu": 1, "gpu_index": "0", "max_img_size": 4000}
-    overall_start = time.time()
-
-    pasta_frames = selecionar_pasta_frames(frames_root_dir)
-    if not pasta_frames:
-        return None
-    pasta_projeto = obter_pasta_reconstrucao(colmap_root_dir)
-    if not pasta_projeto:
-        return None
-
-    log_path = configurar_logging(pasta_projeto)
-    img_dir = normalize_path(pasta_frames)
-    proj_dir = normalize_path(pasta_projeto)
-
+def plan_reconstruction(img_dir, overrides=None, log=logging, images=None):
+    """Plano de recursos (hardware + imagens) com overrides do config.yaml; registra no log."""
+    # Sem GPU CUDA o plano escolhe o estéreo em CPU ("auto" é o padrão).
+    # Frames extraídos do vídeo: quantidade e resolução vêm do manifesto, sem reabrir imagens
+    images = images or manifest_image_stats(img_dir)
+    plan = plan_colmap_resources(
+        img_dir, overrides, hardware=detect_hardware(has_gpu=_has_cuda_gpu()), images=images)
+    for line in format_plan(plan):
+        log.info("Plano de recursos | %s", line)
+    return plan
+
+
+def build_reconstruction_steps(img_dir, proj_dir, resources_dir, plan, log=logging, features_done=False):
+    """
+    Monta as etapas da pipeline sem GUI: lista de (comando ou callable, título, estágio).
+    O estágio (features, matching, mapping, undistort, dense, dense_cpu, fusion, mesh) é usado
+    pela fila de jobs para o controle de recursos. `features_done` omite a extração de features
+    (já feita em streaming por StreamingFeatureExtractor).
+    """
+    dense_backend = plan["dense_backend"]
     db, sparse, dense = f"{proj_dir}/database.db", f"{proj_dir}/sparse", f"{proj_dir}/dense"
-    os.makedirs(sparse, exist_ok=True);
+    os.makedirs(sparse, exist_ok=True)
     os.makedirs(dense, exist_ok=True)
-
-    print("\n" + "=" * 50 + "\n      INICIANDO RECONSTRUÇÃO 3D\n" + "=" * 50)
-
-    feature_opts = _feature_extractor_opts(CONFIG)
-    matcher_opts = _exhaustive_matcher_opts(CONFIG)
+    intrinsics = read_camera_intrinsics(img_dir)
+    if intrinsics:
+        log.info("Intrínsecos da calibração: %s %s", intrinsics["model"], intrinsics["params"])
 
     ini_dir = resources_dir or ""
     ini_feature = _load_colmap_ini(os.path.join(ini_dir, "feature_extractor.ini"))
@@ -631,91 +746,276 @@ def run_colmap_reconstruction(frames_root_dir, colmap_root_dir, resources_dir):
     ini_patch_match = _load_colmap_ini(os.path.join(ini_dir, "patch_match_stereo.ini"))
     ini_fusion = _load_colmap_ini(os.path.join(ini_dir, "stereo_fusion.ini"))
 
-    exclude_common = {
-        "project_path",
-        "database_path",
-        "image_path",
-        "input_path",
-        "output_path",
-        "workspace_path",
-    }
-    ini_feature_args = _ini_to_args(ini_feature, exclude_common, "feature_extractor")
-    ini_matcher_args = _ini_to_args(ini_matcher, exclude_common, "exhaustive_matcher")
-    ini_mapper_args = _ini_to_args(ini_mapper, exclude_common, "mapper")
-    ini_undistorter_args = _ini_to_args(ini_undistorter, exclude_common, "image_undistorter")
-    ini_patch_match_args = _ini_to_args(ini_patch_match, exclude_common, "patch_match_stereo")
-    ini_fusion_args = _ini_to_args(ini_fusion, exclude_common, "stereo_fusion")
-    logging.info("Config .ini carregadas do diretório: %s", normalize_path(ini_dir))
-    logging.info("feature_extractor.ini: %s", "OK" if ini_feature else "vazio/ausente")
-    logging.info("exhaustive_matcher.ini: %s", "OK" if ini_matcher else "vazio/ausente")
-    logging.info("mapper.ini: %s", "OK" if ini_mapper else "vazio/ausente")
-    logging.info("image_undistorter.ini: %s", "OK" if ini_undistorter else "vazio/ausente")
-    logging.info("patch_match_stereo.ini: %s", "OK" if ini_patch_match else "vazio/ausente")
-    logging.info("stereo_fusion.ini: %s", "OK" if ini_fusion else "vazio/ausente")
-    logging.info("Args feature_extractor: %s", ini_feature_args or "(nenhum)")
-    logging.info("Args exhaustive_matcher: %s", ini_matcher_args or "(nenhum)")
-    logging.info("Args mapper: %s", ini_mapper_args or "(nenhum)")
-    logging.info("Args image_undistorter: %s", ini_undistorter_args or "(nenhum)")
-    logging.info("Args patch_match_stereo: %s", ini_patch_match_args or "(nenhum)")
-    logging.info("Args stereo_fusion: %s", ini_fusion_args or "(nenhum)")
-
-    base_steps = [
+    exclude_common = _INI_EXCLUDE_COMMON
+    # Prioridade: config.yaml > valores ajustados nos .ini > plano de recursos (preenche o resto)
+    forced = _plan_forced_keys(plan)
+    feature_opts, ini_feature_args = _planned_args(
+        "feature_extractor", _feature_extractor_opts(plan, intrinsics), ini_feature, exclude_common, forced)
+    matcher_opts, ini_matcher_args = _planned_args(
+        "exhaustive_matcher", _exhaustive_matcher_opts(plan), ini_matcher, exclude_common, forced)
+    mapper_opts, ini_mapper_args = _planned_args(
+        "mapper", _mapper_opts(plan, intrinsics), ini_mapper, exclude_common, forced)
+    ini_undistorter_args = _ini_to_args(ini_undistorter, exclude_common | {"max_image_size"}, "image_undistorter")
+    patch_match_opts, ini_patch_match_args = _planned_args(
+        "patch_match_stereo", _patch_match_opts(plan), ini_patch_match, exclude_common, forced)
+    fusion_opts, ini_fusion_args = _planned_args(
+        "stereo_fusion", _stereo_fusion_opts(plan), ini_fusion, exclude_common, forced)
+    log.info("Config .ini carregadas do diretório: %s", normalize_path(ini_dir))
+    log.info("feature_extractor.ini: %s", "OK" if ini_feature else "vazio/ausente")
+    log.info("exhaustive_matcher.ini: %s", "OK" if ini_matcher else "vazio/ausente")
+    log.info("mapper.ini: %s", "OK" if ini_mapper else "vazio/ausente")
+    log.info("image_undistorter.ini: %s", "OK" if ini_undistorter else "vazio/ausente")
+    log.info("patch_match_stereo.ini: %s", "OK" if ini_patch_match else "vazio/ausente")
+    log.info("stereo_fusion.ini: %s", "OK" if ini_fusion else "vazio/ausente")
+    log.info("Args feature_extractor: %s", " ".join(filter(None, [feature_opts, ini_feature_args])) or "(nenhum)")
+    log.info("Args exhaustive_matcher: %s", " ".join(filter(None, [matcher_opts, ini_matcher_args])) or "(nenhum)")
+    log.info("Args mapper: %s", " ".join(filter(None, [mapper_opts, ini_mapper_args])) or "(nenhum)")
+    log.info("Args image_undistorter: %s", ini_undistorter_args or "(nenhum)")
+    log.info("Args patch_match_stereo: %s", " ".join(filter(None, [patch_match_opts, ini_patch_match_args])) or "(nenhum)")
+    log.info("Args stereo_fusion: %s", " ".join(filter(None, [fusion_opts, ini_fusion_args])) or "(nenhum)")
+    log.info("Densificação: %s", "patch_match_stereo (CUDA)" if dense_backend == "colmap" else "estéreo CPU")
+
+    steps = [
         (f"colmap feature_extractor --database_path {db} --image_path {img_dir} {feature_opts} {ini_feature_args}".strip(),
-         "Extração de Features"),
+         "Extração de Features", "features"),
         (f"colmap exhaustive_matcher --database_path {db} {matcher_opts} {ini_matcher_args}".strip(),
-         "Matcher Exaustivo"),
-        (f"colmap mapper --database_path {db} --image_path {img_dir} --output_path {sparse} {ini_mapper_args}".strip(),
-         "Reconstrução Esparsa"),
-        (f"colmap image_undistorter --image_path {img_dir} --input_path {sparse}/0 --output_path {dense} --output_type COLMAP --max_image_size {CONFIG['max_img_size']} {ini_undistorter_args}".strip(),
-         "Removendo Distorção"),
-        (f"colmap patch_match_stereo --workspace_path {dense} --PatchMatchStereo.gpu_index {CONFIG['gpu_index']} {ini_patch_match_args}".strip(),
-         "Patch Match Stereo"),
-        (f"colmap stereo_fusion --workspace_path {dense} --output_path {dense}/fused.ply {ini_fusion_args}".strip(),
-         "Fusão de Nuvem de Pontos"),
+         "Matcher Exaustivo", "matching"),
+        (f"colmap mapper --database_path {db} --image_path {img_dir} --output_path {sparse} {mapper_opts} {ini_mapper_args}".strip(),
+         "Reconstrução Esparsa", "mapping"),
+        (f"colmap image_undistorter --image_path {img_dir} --input_path {sparse}/0 --output_path {dense} --output_type COLMAP --max_image_size {plan['max_image_size']} {ini_undistorter_args}".strip(),
+         "Removendo Distorção", "undistort"),
     ]
 
-    if _colmap_has_command("stereo_mesher"):
+    if dense_backend == "colmap":
+        steps += [
+            (f"colmap patch_match_stereo --workspace_path {dense} {patch_match_opts} {ini_patch_match_args}".strip(),
+             "Patch Match Stereo", "dense"),
+            (f"colmap stereo_fusion --workspace_path {dense} --output_path {dense}/fused.ply {fusion_opts} {ini_fusion_args}".strip(),
+             "Fusão de Nuvem de Pontos", "fusion"),
+        ]
+    else:
+        steps.append((
+            lambda progress: run_cpu_dense_reconstruction(
+                dense, workers=plan["cpu_dense_workers"], progress=progress),
+            "Estéreo CPU e Fusão de Nuvem de Pontos",
+            "dense_cpu",
+        ))
+
+    # stereo_mesher depende do fused.ply.vis gerado pelo stereo_fusion.
+    if dense_backend == "colmap" and _colmap_has_command("stereo_mesher"):
         mesher_cmd = f"colmap stereo_mesher --input_path {dense}/fused.ply --output_path {dense}/meshed.ply"
-        mesher_title = "Geração de Malha Final"
-        base_steps.append((mesher_cmd, mesher_title))
+        steps.append((mesher_cmd, "Geração de Malha Final", "mesh"))
     elif _colmap_has_command("poisson_mesher"):
         mesher_cmd = f"colmap poisson_mesher --input_path {dense}/fused.ply --output_path {dense}/meshed.ply"
-        mesher_title = "Geração de Malha Final (Poisson)"
-        base_steps.append((mesher_cmd, mesher_title))
+        steps.append((mesher_cmd, "Geração de Malha Final (Poisson)", "mesh"))
     else:
-        logging.warning(
+        log.warning(
             "Nenhum mesher disponível no COLMAP (stereo_mesher/poisson_mesher). "
             "Etapa de malha será ignorada; use a malha Poisson do Open3D."
         )
+    if features_done:
+        steps = [step for step in steps if step[2] != "features"]
+    return steps
+
+
+# Executa uma etapa sem GUI, com a saída do COLMAP no log informado:
+def run_step_headless(cmd, step_name, log=logging):
+    log.info("> %s", step_name)
+    if callable(cmd):
+        def progress(current, total):
+            log.info("[%s/%s] %s", current, total, step_name)
+
+        result = cmd(progress)
+        log.info("%s: %s", step_name, result)
+        return result
+
+    process = subprocess.Popen(
+        cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        text=True, encoding='utf-8', errors='replace'
+    )
+    for line in iter(process.stdout.readline, ""):
+        line_clean = line.strip()
+        if line_clean:
+            log.info(line_clean)
+    process.wait()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+    return None
+
+
+def _ini_flag(entries: dict, key: str) -> bool:
+    return str(entries.get(key, "")).strip().lower() in ("1", "true", "yes")
+
+
+def _first_camera_id(database_path: str):
+    try:
+        with sqlite3.connect(database_path) as conn:
+            row = conn.execute("SELECT MIN(camera_id) FROM cameras").fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+class StreamingFeatureExtractor:
+    """
+    Extrai features em lotes enquanto os frames ainda estão sendo gravados.
+    Cada lote roda `colmap feature_extractor --image_list_path` sobre o mesmo database.db;
+    com ImageReader.single_camera=1, os lotes seguintes reutilizam a câmera do primeiro
+    (--ImageReader.existing_camera_id). Os lotes rodam em série numa thread própria.
+    """
+
+    def __init__(self, project_dir, resources_dir, overrides=None, batch_size=25, log=logging, runner=None,
+                 expected_frames=None):
+        self.project_dir = normalize_path(project_dir)
+        self.database_path = f"{self.project_dir}/database.db"
+        self.list_dir = os.path.join(self.project_dir, "image_lists")
+        self.overrides = overrides
+        self.batch_size = max(1, int(batch_size))
+        self.log = log
+        self.runner = runner or run_step_headless
+        self.expected_frames = expected_frames
+        self.image_dir = None
+        self.images_done = 0
+        self.batches = 0
+        self.plan = None
+        self.intrinsics = None
+
+        self._ini = _load_colmap_ini(os.path.join(resources_dir or "", "feature_extractor.ini"))
+        self._camera_id = None
+        self._pending = []
+        self._closed = False
+        self._error = None
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._worker, name="streaming-features", daemon=True)
+        self._thread.start()
+
+    def add(self, image_path):
+        """Registra um frame recém-gravado (compatível com frame_callback da extração)."""
+        image_dir, name = os.path.split(normalize_path(image_path))
+        with self._cond:
+            if self._error is not None:
+                return
+            if self.image_dir is None:
+                self.image_dir = image_dir
+            elif image_dir != self.image_dir:
+                raise ValueError("Todos os frames devem estar na mesma pasta.")
+            self._pending.append(name)
+            self._cond.notify_all()
+
+    def close(self):
+        """Processa o lote restante, espera a thread e propaga falhas do COLMAP."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        self.log.info("Features em streaming: %s imagens em %s lotes.", self.images_done, self.batches)
+        return self.images_done
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._closed and len(self._pending) < self.batch_size:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # Lotes acumulados enquanto o anterior rodava seguem juntos
+                batch, self._pending = self._pending, []
+            try:
+                self._extract(batch)
+            except Exception as e:
+                with self._cond:
+                    self._error = e
+                    self._pending = []
+                return
+
+    def _extract(self, batch):
+        if self.plan is None:
+            # O primeiro lote chega com a extração em andamento: o plano usa o total previsto de
+            # frames (`expected_frames` ou o manifesto), não só os já gravados
+            images = manifest_image_stats(self.image_dir) or inspect_images(self.image_dir)
+            expected = self.expected_frames or expected_frame_count(self.image_dir)
+            if expected:
+                images["count"] = max(images["count"], int(expected))
+            self.plan = plan_reconstruction(self.image_dir, self.overrides, log=self.log, images=images)
+            self.intrinsics = read_camera_intrinsics(self.image_dir)
+        os.makedirs(self.list_dir, exist_ok=True)
+        self.batches += 1
+        list_path = normalize_path(os.path.join(self.list_dir, f"batch_{self.batches:03d}.txt"))
+        with open(list_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(batch) + "\n")
+
+        exclude = set(_INI_EXCLUDE_COMMON) | {"image_list_path"}
+        extra = f"--image_list_path {list_path}"
+        if self._camera_id is not None:
+            exclude.add("ImageReader.existing_camera_id")
+            extra += f" --ImageReader.existing_camera_id {self._camera_id}"
+        planned, ini_args = _planned_args(
+            "feature_extractor", _feature_extractor_opts(self.plan, self.intrinsics), self._ini, exclude,
+            _plan_forced_keys(self.plan))
+        cmd = (f"colmap feature_extractor --database_path {self.database_path} --image_path {self.image_dir} "
+               f"{extra} {planned} {ini_args}").strip()
+        self.runner(cmd, f"Extração de Features (lote {self.batches}: {len(batch)} imagens)", self.log)
+        self.images_done += len(batch)
+
+        if self._camera_id is None and _ini_flag(self._ini, "ImageReader.single_camera"):
+            self._camera_id = _first_camera_id(self.database_path)
+
+
+# Pipeline Principal
+def run_colmap_reconstruction(frames_root_dir, colmap_root_dir, resources_dir, overrides=None,
+                              frames_dir=None, project_dir=None, features_done=False):
+    """
+    `overrides`: chaves de parameters.reconstruction (config.yaml) que sobrescrevem o plano de
+    recursos (threads, use_gpu, max_image_size, dense_backend, ...).
+    `frames_dir`/`project_dir` pulam os diálogos de seleção; `features_done` pula a extração de
+    features (já feita em streaming).
+    """
+    sistema = platform.system()
+    overall_start = time.time()
+
+    pasta_frames = frames_dir or selecionar_pasta_frames(frames_root_dir)
+    if not pasta_frames:
+        return None
+    pasta_projeto = project_dir or obter_pasta_reconstrucao(colmap_root_dir)
+    if not pasta_projeto:
+        return None
+
+    log_path = configurar_logging(pasta_projeto)
+    img_dir = normalize_path(pasta_frames)
+    proj_dir = normalize_path(pasta_projeto)
+    sparse = f"{proj_dir}/sparse"
+    dense = f"{proj_dir}/dense"
+
+    print("\n" + "=" * 50 + "\n      INICIANDO RECONSTRUÇÃO 3D\n" + "=" * 50)
+
+    plan = plan_reconstruction(img_dir, overrides)
+    for line in format_plan(plan):
+        print(line)
+    base_steps = build_reconstruction_steps(img_dir, proj_dir, resources_dir, plan, features_done=features_done)
 
     steps = [
-        (cmd, f"{i}/{len(base_steps)}: {title}")
-        for i, (cmd, title) in enumerate(base_steps, 1)
+        (cmd, f"{i}/{len(base_steps)}: {title}", stage)
+        for i, (cmd, title, stage) in enumerate(base_steps, 1)
     ]
 
     gui = ReconstructProgressWindow(len(steps))
 
     try:
         # Loop que executa os 7 passos do COLMAP
-        for i, (cmd, name) in enumerate(steps, 1):
+        for i, (cmd, name, stage) in enumerate(steps, 1):
+            report_progress(stage=stage, step=i, steps=len(steps), message=name)
             gui.update_step(name, i, len(steps))
-            run_cmd_gui(cmd, name, gui)
-            if i == 3 and not os.path.exists(f"{sparse}/0"):
+            if callable(cmd):
+                run_callable_gui(cmd, name, gui)
+            else:
+                run_cmd_gui(cmd, name, gui)
+            if stage == "mapping" and not os.path.exists(f"{sparse}/0"):
                 raise Exception("Modelo esparso não gerado. Poucas correspondências.")
 
 
-        caminho_meshed_ply = os.path.join(dense, "meshed.ply")
-
-        # Verifica se o COLMAP realmente criou o arquivo antes de tentar converter
-        if os.path.exists(caminho_meshed_ply):
-            gui.label_step.config(text="Etapa Extra: Convertendo Formatos")
-            gui.label_sub.config(text="Gerando arquivo .OBJ...")
-
-            # Chama a função que definimos lá no topo do arquivo
-            converter_ply_para_obj(caminho_meshed_ply)
-        else:
-            logging.warning("O arquivo meshed.ply não foi encontrado. Pulando conversão para OBJ.")
-
+        # OBJ/STL/GLB não são gerados aqui: saem sob demanda (GET /exportar-malha), com cache
         gui.close()
         total_seconds = int(time.time() - overall_start)
         logging.info("Reconstrução finalizada em %ss", total_seconds)
@@ -724,7 +1024,7 @@ def run_colmap_reconstruction(frames_root_dir, colmap_root_dir, resources_dir):
         root = tk.Tk()
         root.withdraw()
         root.attributes('-topmost', True)
-        messagebox.showinfo("Sucesso", "Reconstrução e conversão concluídas com sucesso!")
+        messagebox.showinfo("Sucesso", "Reconstrução concluída com sucesso!")
         root.destroy()
         return proj_dir
 
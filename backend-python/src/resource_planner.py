@@ -0,0 +1,232 @@
+import os
+import subprocess
+from typing import Dict, List, Optional
+
+"""
+Módulo: resource_planner
+Responsabilidade:
+    - Inspecionar a máquina (núcleos, RAM disponível, GPU) e o conjunto de imagens
+      (quantidade e resolução).
+    - Derivar a configuração do COLMAP por etapa: threads, max_image_size, janela e
+      cache do patch-match/fusão e uso de GPU.
+    - Permitir que chaves de parameters.reconstruction (config.yaml) sobrescrevam o plano.
+"""
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp')
+
+# Chaves que podem ser sobrescritas pelo config.yaml (parameters.reconstruction)
+BASE_KEYS = ("threads", "use_gpu", "gpu_index", "max_image_size")
+DERIVED_KEYS = (
+    "feature_threads",
+    "matcher_threads",
+    "mapper_threads",
+    "fusion_threads",
+    "patch_match_window_radius",
+    "patch_match_cache_size",
+    "fusion_cache_size",
+    "dense_backend",
+    "cpu_dense_workers",
+)
+STAGE_THREAD_KEYS = ("feature_threads", "matcher_threads", "mapper_threads", "fusion_threads")
+
+# Memória aproximada da extração SIFT em CPU por thread (GB por megapixel)
+SIFT_GB_PER_MEGAPIXEL = 0.12
+DEFAULT_RAM_GB = 8.0
+
+
+def query_nvidia_gpus() -> List[int]:
+    """Memória total (MB) de cada GPU listada pelo nvidia-smi; lista vazia sem GPU/driver."""
+    try:
+        out = subprocess.check_output(
+            ["nvidia-smi", "--query-gpu=memory.total", "--format=csv,noheader,nounits"],
+            text=True,
+            encoding="utf-8",
+            errors="ignore",
+            stderr=subprocess.DEVNULL,
+        )
+    except Exception:
+        return []
+    gpus = []
+    for line in out.splitlines():
+        line = line.strip()
+        if line.isdigit():
+            gpus.append(int(line))
+    return gpus
+
+
+def available_ram_gb() -> Optional[float]:
+    try:
+        import psutil  # opcional
+        return psutil.virtual_memory().available / (1024 ** 3)
+    except Exception:
+        pass
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / (1024 ** 2)
+    except Exception:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / (1024 ** 3)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def detect_hardware(has_gpu: Optional[bool] = None) -> Dict:
+    gpus = query_nvidia_gpus()
+    if has_gpu is None:
+        has_gpu = bool(gpus)
+    return {
+        "cores": os.cpu_count() or 1,
+        "ram_gb": available_ram_gb(),
+        "gpu": bool(has_gpu),
+        "gpu_memory_mb": gpus[0] if (has_gpu and gpus) else None,
+    }
+
+
+def inspect_images(image_dir: str, sample: int = 5) -> Dict:
+    try:
+        names = sorted(f for f in os.listdir(image_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+    except Exception:
+        names = []
+    width = height = 0
+    if names:
+        step = max(1, len(names) // sample)
+        for name in names[::step][:sample]:
+            size = _image_size(os.path.join(image_dir, name))
+            if size:
+                width = max(width, size[0])
+                height = max(height, size[1])
+    return {"count": len(names), "width": width, "height": height}
+
+
+def _image_size(path: str):
+    try:
+        from PIL import Image
+        with Image.open(path) as img:  # lê só o cabeçalho
+            return img.size
+    except Exception:
+        pass
+    try:
+        import cv2
+        img = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if img is not None:
+            return img.shape[1] * 8, img.shape[0] * 8
+    except Exception:
+        pass
+    return None
+
+
+def _max_image_size_for(ram_gb: float, gpu_memory_mb: Optional[int], source_size: int) -> int:
+    if ram_gb < 8:
+        size = 2000
+    elif ram_gb < 16:
+        size = 3200
+    else:
+        size = 4000
+    if gpu_memory_mb is not None:
+        if gpu_memory_mb < 4096:
+            size = min(size, 2000)
+        elif gpu_memory_mb < 8192:
+            size = min(size, 3200)
+    if source_size > 0:
+        size = min(size, source_size)
+    return int(size)
+
+
+def plan_colmap_resources(
+    image_dir: Optional[str] = None,
+    overrides: Optional[Dict] = None,
+    hardware: Optional[Dict] = None,
+    images: Optional[Dict] = None,
+) -> Dict:
+    """Monta o plano de recursos do COLMAP; valores de `overrides` têm prioridade."""
+    overrides = {k: v for k, v in (overrides or {}).items() if v is not None}
+    hardware = hardware or detect_hardware()
+    images = images or (inspect_images(image_dir) if image_dir else {"count": 0, "width": 0, "height": 0})
+
+    cores = max(1, int(hardware.get("cores") or 1))
+    ram_gb = float(hardware.get("ram_gb") or DEFAULT_RAM_GB)
+    source_size = max(int(images.get("width") or 0), int(images.get("height") or 0))
+
+    plan = {
+        "threads": cores - 1 if cores > 2 else cores,
+        "use_gpu": 1 if hardware.get("gpu") else 0,
+        "gpu_index": "0",
+        "max_image_size": _max_image_size_for(ram_gb, hardware.get("gpu_memory_mb"), source_size),
+    }
+    for key in BASE_KEYS:
+        if key in overrides:
+            plan[key] = overrides[key]
+    plan["threads"] = max(1, int(plan["threads"]))
+    plan["use_gpu"] = 1 if int(plan["use_gpu"]) else 0
+    plan["gpu_index"] = str(plan["gpu_index"])
+    plan["max_image_size"] = int(plan["max_image_size"])
+
+    threads = plan["threads"]
+    megapixels = (plan["max_image_size"] ** 2) * 0.75 / 1e6  # proporção 4:3 como referência
+    ram_budget = ram_gb * 0.7
+    if plan["use_gpu"]:
+        feature_threads = threads
+    else:
+        per_thread = max(megapixels * SIFT_GB_PER_MEGAPIXEL, 0.1)
+        feature_threads = max(1, min(threads, int(ram_budget / per_thread)))
+
+    if plan["max_image_size"] <= 1600:
+        window_radius = 4
+    elif plan["max_image_size"] <= 2400:
+        window_radius = 5
+    else:
+        window_radius = 7
+
+    cache_gb = int(max(2, min(64, ram_gb * 0.5)))
+    # Estéreo CPU: ~1.5 GB por par em 1600 px
+    cpu_workers = max(1, min(threads, int(ram_budget / 1.5)))
+
+    plan.update({
+        "feature_threads": feature_threads,
+        "matcher_threads": threads,
+        "mapper_threads": threads,
+        "fusion_threads": threads,
+        "patch_match_window_radius": window_radius,
+        "patch_match_cache_size": cache_gb,
+        "fusion_cache_size": cache_gb,
+        "dense_backend": "colmap" if plan["use_gpu"] else "cpu",
+        "cpu_dense_workers": cpu_workers,
+    })
+    overridden = [key for key in BASE_KEYS if key in overrides]
+    if "threads" in overrides:
+        # threads do config.yaml também fixam as threads de cada etapa (derivadas dele) sobre o .ini
+        overridden += [key for key in STAGE_THREAD_KEYS if key not in overrides]
+    for key in DERIVED_KEYS:
+        value = overrides.get(key)
+        if key == "dense_backend" and value == "auto":
+            continue
+        if value is not None:
+            plan[key] = value
+            overridden.append(key)
+
+    # Valores do config.yaml prevalecem sobre os .ini; os calculados só preenchem o que o .ini não define
+    plan["overrides"] = overridden
+
+    plan["hardware"] = dict(hardware)
+    plan["images"] = dict(images)
+    return plan
+
+
+def format_plan(plan: Dict) -> List[str]:
+    hw = plan.get("hardware", {})
+    imgs = plan.get("images", {})
+    ram = hw.get("ram_gb")
+    return [
+        f"Hardware: {hw.get('cores')} núcleos | RAM livre: {f'{ram:.1f} GB' if ram else 'desconhecida'} | "
+        f"GPU: {'sim' if hw.get('gpu') else 'não'}"
+        + (f" ({hw['gpu_memory_mb']} MB)" if hw.get("gpu_memory_mb") else ""),
+        f"Imagens: {imgs.get('count', 0)} ({imgs.get('width', 0)}x{imgs.get('height', 0)})",
+        f"Threads: {plan['threads']} | Features: {plan['feature_threads']} | GPU: {plan['use_gpu']} "
+        f"(índice {plan['gpu_index']})",
+        f"max_image_size: {plan['max_image_size']} | Patch-match: janela {plan['patch_match_window_radius']}, "
+        f"cache {plan['patch_match_cache_size']} GB | Fusão: cache {plan['fusion_cache_size']} GB",
+        f"Densificação: {plan['dense_backend']} (workers CPU: {plan['cpu_dense_workers']})",
+    ]
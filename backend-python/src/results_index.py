@@ -0,0 +1,419 @@
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+"""
+Módulo: results_index
+Responsabilidade:
+    - Índice SQLite dos resultados do pipeline (volumes, calibrações, pastas de frames e
+      reconstruções) com as métricas principais de cada um, gravado ao fim de cada execução.
+    - Consultas filtradas, ordenadas e paginadas para o histórico (Flask e interface), sem
+      listar pastas nem abrir cada JSON.
+    - Importação das pastas existentes (execuções anteriores ao índice); reimportar só relê os
+      arquivos alterados e remove do índice o que foi apagado do disco.
+"""
+
+DEFAULT_DB_PATH = "./data/out/results_index.sqlite"
+RESULT_KINDS = ("volume", "calibration", "frames", "reconstruction")
+SORT_COLUMNS = ("created_at", "name", "volume_m3", "method", "scale", "rms", "views", "frames")
+MAX_PAGE_SIZE = 1000
+
+# Mesmo nome de src.acquisition.FRAME_MANIFEST_FILE (sem importar o OpenCV aqui)
+FRAME_MANIFEST_FILE = "frames_manifest.jsonl"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    mtime REAL,
+    status TEXT,
+    volume_m3 REAL,
+    method TEXT,
+    scale REAL,
+    scale_source TEXT,
+    rms REAL,
+    views INTEGER,
+    frames INTEGER,
+    source TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_kind_created ON results (kind, created_at);
+CREATE INDEX IF NOT EXISTS idx_results_kind_volume ON results (kind, volume_m3);
+CREATE INDEX IF NOT EXISTS idx_results_kind_name ON results (kind, name);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+_COLUMNS = ("kind", "path", "name", "created_at", "mtime", "status", "volume_m3", "method", "scale",
+            "scale_source", "rms", "views", "frames", "source", "data")
+
+
+def normalize_path(p: str) -> str:
+    return os.path.abspath(p).replace("\\", "/")
+
+
+def _timestamp_from_name(name: str) -> Optional[float]:
+    """volume_20250101_120000.json -> data da execução (o nome guarda o início do cálculo)."""
+    match = re.search(r"(\d{8}_\d{6})", name)
+    if not match:
+        return None
+    try:
+        return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").timestamp()
+    except ValueError:
+        return None
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# --- descrição de cada tipo de resultado a partir do disco ---
+def describe_volume(path: str) -> Dict:
+    payload = _read_json(path)
+    if payload is None:
+        raise ValueError(f"JSON de volume inválido: {path}")
+    summary = payload.get("summary", {})
+    return {
+        "volume_m3": summary.get("volume_m3", payload.get("volume")),
+        "method": summary.get("method", payload.get("method")),
+        "scale": summary.get("scale", payload.get("scale")),
+        "scale_source": payload.get("scale_source"),
+        "source": payload.get("mesh_path"),
+        "status": "ok",
+        "data": {"summary": summary, "volume_method": payload.get("volume_method"),
+                 "report_md": payload.get("report_md")},
+    }
+
+
+def describe_calibration(path: str) -> Dict:
+    report = _read_json(os.path.splitext(path)[0] + "_report.json") or {}
+    used = report.get("used_views")
+    return {
+        "rms": report.get("rms"),
+        "views": len(used) if isinstance(used, list) else None,
+        "status": "ok",
+        "data": {key: report[key] for key in ("image_size", "chessboard_size", "square_size", "excluded_views",
+                                              "probed_frames", "detected_views") if key in report},
+    }
+
+
+def describe_frames(path: str) -> Dict:
+    manifest = os.path.join(path, FRAME_MANIFEST_FILE)
+    header, count = None, 0
+    if os.path.exists(manifest):
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if header is None:
+                    header = record
+                else:
+                    count += 1
+    else:
+        count = sum(1 for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+    header = header or {}
+    return {
+        "frames": count,
+        "source": header.get("video"),
+        "method": header.get("sampling"),
+        "status": "ok" if count else "empty",
+        "data": {key: header[key] for key in ("width", "height", "fps", "rate", "extension") if key in header},
+    }
+
+
+def describe_reconstruction(path: str) -> Dict:
+    dense = os.path.join(path, "dense")
+    mesh = next((os.path.join(dense, name) for name in ("meshed.ply", "mesh_poisson.ply", "fused.ply")
+                 if os.path.exists(os.path.join(dense, name))), None)
+    sparse = os.path.join(path, "sparse")
+    models = len([d for d in os.listdir(sparse) if os.path.isdir(os.path.join(sparse, d))]) if os.path.isdir(sparse) else 0
+    images = os.path.join(dense, "images")
+    return {
+        "frames": len(os.listdir(images)) if os.path.isdir(images) else None,
+        "source": normalize_path(mesh) if mesh else None,
+        "status": "complete" if mesh else ("sparse" if models else "incomplete"),
+        "data": {"sparse_models": models, "mesh": os.path.basename(mesh) if mesh else None},
+    }
+
+
+DESCRIBERS = {
+    "volume": describe_volume,
+    "calibration": describe_calibration,
+    "frames": describe_frames,
+    "reconstruction": describe_reconstruction,
+}
+
+
+def _folder_candidates(kind: str, folder: str) -> List[str]:
+    if not os.path.isdir(folder):
+        return []
+    names = sorted(os.listdir(folder))
+    if kind == "volume":
+        return [os.path.join(folder, n) for n in names if n.startswith("volume_") and n.endswith(".json")]
+    if kind == "calibration":
+        return [os.path.join(folder, n) for n in names if n.endswith(".npz")]
+    return [os.path.join(folder, n) for n in names if os.path.isdir(os.path.join(folder, n))]
+
+
+class ResultsIndex:
+    """Índice em um arquivo SQLite; uma conexão por operação (seguro entre threads do Flask)."""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+                    conn = sqlite3.connect(self.db_path)
+                    try:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.executescript(_SCHEMA)
+                    finally:
+                        conn.close()
+                    self._ready = True
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # --- escrita ---
+    def record(self, kind: str, path: str, created_at: Optional[float] = None, **metrics) -> int:
+        """Insere ou atualiza o resultado `path` (chave única) com as métricas informadas."""
+        if kind not in RESULT_KINDS:
+            raise ValueError(f"Tipo de resultado inválido: {kind}")
+        path = normalize_path(path)
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        name = os.path.basename(path.rstrip("/"))
+        row = {column: None for column in _COLUMNS}
+        row.update(metrics)
+        row.update(kind=kind, path=path, name=name, mtime=mtime,
+                   created_at=created_at or _timestamp_from_name(name) or mtime or time.time())
+        if row["data"] is not None and not isinstance(row["data"], str):
+            row["data"] = json.dumps(row["data"], ensure_ascii=False, default=str)
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in _COLUMNS if c != "path")
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(f"INSERT INTO results ({', '.join(_COLUMNS)}) VALUES ({placeholders}) "
+                             f"ON CONFLICT(path) DO UPDATE SET {updates}", [row[c] for c in _COLUMNS])
+                return conn.execute("SELECT id FROM results WHERE path = ?", (path,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def record_path(self, kind: str, path: str) -> int:
+        """Lê as métricas do resultado no disco (JSON, relatório, manifesto) e grava no índice."""
+        return self.record(kind, path, **DESCRIBERS[kind](path))
+
+    def remove(self, path: str) -> bool:
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute("DELETE FROM results WHERE path = ?", (normalize_path(path),)).rowcount > 0
+        finally:
+            conn.close()
+
+    def import_folders(self, folders: Dict[str, str], prune: bool = True) -> Dict[str, Dict]:
+        """
+        Indexa os resultados já existentes: {"volume": pasta, "calibration": pasta, ...}.
+        Arquivos com a mesma data de modificação do índice são pulados; com `prune`, entradas
+        da pasta que não existem mais no disco são removidas.
+        """
+        counts = {}
+        for kind, folder in folders.items():
+            if kind not in RESULT_KINDS or not folder:
+                continue
+            prefix = normalize_path(folder).rstrip("/") + "/"
+            conn = self._connect()
+            try:
+                known = {row["path"]: row["mtime"] for row in conn.execute(
+                    "SELECT path, mtime FROM results WHERE kind = ? AND substr(path, 1, ?) = ?",
+                    (kind, len(prefix), prefix))}
+            finally:
+                conn.close()
+            stats = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0, "errors": 0}
+            seen = set()
+            for path in _folder_candidates(kind, folder):
+                norm = normalize_path(path)
+                seen.add(norm)
+                if norm in known and known[norm] == os.path.getmtime(path):
+                    stats["unchanged"] += 1
+                    continue
+                try:
+                    self.record_path(kind, path)
+                    stats["updated" if norm in known else "added"] += 1
+                except Exception as e:
+                    print(f"[results_index] {path}: {e}", file=sys.stderr)
+                    stats["errors"] += 1
+            if prune:
+                for path in set(known) - seen:
+                    if not os.path.exists(path) and self.remove(path):
+                        stats["removed"] += 1
+            self._set_meta(f"imported:{kind}:{prefix}", str(time.time()))
+            counts[kind] = stats
+        return counts
+
+    def ensure_imported(self, kind: str, folder: str) -> bool:
+        """Importa `folder` uma única vez (primeiro uso do índice); True se importou agora."""
+        prefix = normalize_path(folder).rstrip("/") + "/"
+        if self._get_meta(f"imported:{kind}:{prefix}") is not None:
+            return False
+        self.import_folders({kind: folder})
+        return True
+
+    def _set_meta(self, key: str, value: str):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+        finally:
+            conn.close()
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    # --- consulta ---
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict:
+        item = dict(row)
+        item["data"] = json.loads(item["data"]) if item.get("data") else {}
+        return item
+
+    def get(self, result_id: int) -> Optional[Dict]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM results WHERE id = ?", (int(result_id),)).fetchone()
+            return self._row(row) if row else None
+        finally:
+            conn.close()
+
+    def query(
+        self,
+        kind: Optional[str] = None,
+        method: Optional[str] = None,
+        scale_source: Optional[str] = None,
+        status: Optional[str] = None,
+        search: Optional[str] = None,
+        folder: Optional[str] = None,
+        created_from: Optional[float] = None,
+        created_to: Optional[float] = None,
+        volume_min: Optional[float] = None,
+        volume_max: Optional[float] = None,
+        sort: str = "created_at",
+        order: str = "desc",
+        page: int = 1,
+        page_size: int = 50,
+    ) -> Dict:
+        """Resultados filtrados e paginados: {"total", "page", "page_size", "pages", "items"}."""
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Ordenação inválida: {sort} (use {', '.join(SORT_COLUMNS)})")
+        direction = "ASC" if str(order).lower() == "asc" else "DESC"
+        page = max(1, int(page))
+        page_size = min(max(1, int(page_size)), MAX_PAGE_SIZE)
+
+        where, params = [], []
+        for column, value in (("kind", kind), ("method", method), ("scale_source", scale_source),
+                              ("status", status)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if search:
+            where.append("(name LIKE ? OR source LIKE ?)")
+            params += [f"%{search}%"] * 2
+        if folder:
+            prefix = normalize_path(folder).rstrip("/") + "/"
+            where.append("substr(path, 1, ?) = ?")
+            params += [len(prefix), prefix]
+        for column, op, value in (("created_at", ">=", created_from), ("created_at", "<=", created_to),
+                                  ("volume_m3", ">=", volume_min), ("volume_m3", "<=", volume_max)):
+            if value is not None:
+                where.append(f"{column} {op} ?")
+                params.append(float(value))
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        conn = self._connect()
+        try:
+            total = conn.execute(f"SELECT COUNT(*) FROM results {clause}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM results {clause} ORDER BY {sort} IS NULL, {sort} {direction}, id {direction} "
+                f"LIMIT ? OFFSET ?", params + [page_size, (page - 1) * page_size]).fetchall()
+        finally:
+            conn.close()
+        return {"total": total, "page": page, "page_size": page_size,
+                "pages": (total + page_size - 1) // page_size, "items": [self._row(r) for r in rows]}
+
+
+_INDEX: Optional[ResultsIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def configure_results_index(db_path: Optional[str]):
+    """Define o arquivo do índice (paths.results_index); chamado ao carregar o config.yaml."""
+    global _INDEX
+    with _INDEX_LOCK:
+        path = db_path or DEFAULT_DB_PATH
+        if _INDEX is None or os.path.abspath(_INDEX.db_path) != os.path.abspath(path):
+            _INDEX = ResultsIndex(path)
+
+
+def results_index() -> ResultsIndex:
+    if _INDEX is None:
+        configure_results_index(None)
+    return _INDEX
+
+
+def record_result(kind: str, path: str) -> Optional[int]:
+    """
+    Grava o resultado recém-concluído no índice; falhas do índice nunca interrompem o pipeline.
+    Sem índice configurado (config.yaml não carregado, ex.: uso como biblioteca) não grava nada.
+    """
+    if _INDEX is None:
+        return None
+    try:
+        return _INDEX.record_path(kind, path)
+    except Exception as e:
+        print(f"[results_index] Não foi possível indexar {path}: {e}", file=sys.stderr)
+        return None
+
+
+def folders_from_config(cfg: Dict, base_dir: Optional[str] = None) -> Dict[str, str]:
+    """Pastas de cada tipo de resultado a partir de paths.* do config.yaml."""
+    paths = cfg.get("paths", {}) or {}
+
+    def _resolve(p):
+        return os.path.normpath(os.path.join(base_dir, p)) if base_dir and p and not os.path.isabs(p) else p
+
+    return {
+        "volume": _resolve(paths.get("volumes_output", "./data/out/volumes")),
+        "calibration": _resolve(paths.get("calibration_output_folder", "./data/out/calibrations")),
+        "frames": _resolve(paths.get("frames_output", "./data/out/frames")),
+        "reconstruction": _resolve(paths.get("colmap_output", "./data/out/reconstructions")),
+    }
+
+
+def import_results(cfg: Dict, base_dir: Optional[str] = None, kinds: Iterable[str] = RESULT_KINDS) -> Dict:
+    folders = folders_from_config(cfg, base_dir)
+    return results_index().import_folders({kind: folders[kind] for kind in kinds if kind in folders})
@@ -0,0 +1,324 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Dict, Iterator, List, Optional
+
+"""
+Módulo: task_jobs
+Responsabilidade:
+    - Execução assíncrona das tarefas do backend (calibração, extração, reconstrução, volume):
+      a rota devolve um id na hora e a tarefa roda em um processo próprio.
+    - Progresso por etapa: o processo filho escreve linhas "@@progress {json}" no stderr
+      (report_progress) e o gerenciador mantém o estado de cada etapa e um fluxo de eventos
+      (status, etapa, progresso, log) para o endpoint de Server-Sent Events.
+    - Cancelamento: o filho roda em um grupo de processos próprio; cancelar encerra o grupo
+      inteiro (Python e os subprocessos do COLMAP), primeiro com SIGTERM e depois SIGKILL.
+"""
+
+PROGRESS_ENV = "VOLUMETRIA_PROGRESS"
+PROGRESS_PREFIX = "@@progress "
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+_last_report: Dict[str, float] = {}
+
+
+def report_progress(stage: Optional[str] = None, current=None, total=None, message: Optional[str] = None,
+                    min_interval: float = 0.25, **extra):
+    """
+    Lado do processo filho: publica o progresso da etapa atual (sem efeito fora de um job
+    assíncrono). `stage` abre uma nova etapa; sem `stage`, atualiza a etapa corrente.
+    Atualizações de contagem são limitadas a uma a cada `min_interval` segundos por etapa.
+    """
+    if not os.environ.get(PROGRESS_ENV):
+        return
+    key = stage or ""
+    now = time.monotonic()
+    is_count = current is not None and stage is None
+    if is_count and total and current < total and now - _last_report.get(key, 0.0) < min_interval:
+        return
+    _last_report[key] = now
+    event = {key: value for key, value in (("stage", stage), ("current", current), ("total", total),
+                                           ("message", message)) if value is not None}
+    event.update(extra)
+    print(PROGRESS_PREFIX + json.dumps(event, ensure_ascii=False, default=str), file=sys.stderr, flush=True)
+
+
+def parse_json_output(raw_out: str):
+    """Último objeto JSON da saída de um script (tolera texto antes dele)."""
+    if not raw_out:
+        return None
+    try:
+        return json.loads(raw_out)
+    except json.JSONDecodeError:
+        start = raw_out.rfind("{")
+        end = raw_out.rfind("}")
+        if start != -1 and end != -1 and end > start:
+            try:
+                return json.loads(raw_out[start:end + 1])
+            except json.JSONDecodeError:
+                return None
+        return None
+
+
+def _popen_group_kwargs() -> Dict:
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def terminate_process_group(process: subprocess.Popen, grace_s: float = 5.0):
+    """Encerra o processo e todos os seus filhos (grupo/sessão criado no Popen)."""
+    if process.poll() is not None:
+        return
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(process.pid)], capture_output=True)
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(grace_s)
+    except ProcessLookupError:
+        return
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+class TaskJob:
+    def __init__(self, task: str, command: List[str], max_events: int = 2000):
+        self.id = uuid.uuid4().hex[:12]
+        self.task = task
+        self.command = list(command)
+        self.status = JOB_QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.stages: "OrderedDict[str, Dict]" = OrderedDict()
+        self.current_stage: Optional[str] = None
+        self.progress: Optional[float] = None
+        self.result = None
+        self.error: Optional[str] = None
+        self.returncode: Optional[int] = None
+        self.events: deque = deque(maxlen=max_events)
+        self.log_tail: deque = deque(maxlen=50)
+        self.process: Optional[subprocess.Popen] = None
+        self.cancel_requested = False
+        self.seq = 0
+
+    def snapshot(self) -> Dict:
+        return {
+            "id": self.id,
+            "task": self.task,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "stage": self.current_stage,
+            "progress": self.progress,
+            "stages": [dict(name=name, **info) for name, info in self.stages.items()],
+            "result": self.result,
+            "error": self.error,
+            "returncode": self.returncode,
+            "log": list(self.log_tail),
+        }
+
+
+class TaskJobManager:
+    """Jobs em memória; cada um é um subprocesso com leitura de stdout (resultado) e stderr (progresso/log)."""
+
+    def __init__(self, env: Optional[Dict] = None, cwd: Optional[str] = None, max_finished: int = 50):
+        self.env = env
+        self.cwd = cwd
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[str, TaskJob]" = OrderedDict()
+        self._cond = threading.Condition()
+
+    # --- eventos ---
+    def _emit(self, job: TaskJob, kind: str, data: Dict):
+        # Chamado com self._cond adquirido
+        job.seq += 1
+        job.events.append({"id": job.seq, "event": kind, "data": data})
+        self._cond.notify_all()
+
+    def _set_status(self, job: TaskJob, status: str):
+        job.status = status
+        if status == JOB_RUNNING:
+            job.started_at = time.time()
+        elif status in FINISHED_STATES:
+            job.finished_at = time.time()
+            if job.current_stage and job.stages[job.current_stage]["status"] == JOB_RUNNING:
+                job.stages[job.current_stage]["status"] = JOB_DONE if status == JOB_DONE else status
+                job.stages[job.current_stage]["finished_at"] = job.finished_at
+            if status == JOB_DONE:
+                job.progress = 1.0
+        self._emit(job, "status", {"status": status, "error": job.error, "result": job.result})
+
+    def _apply_progress(self, job: TaskJob, event: Dict):
+        now = time.time()
+        stage = event.get("stage")
+        if stage and stage != job.current_stage:
+            if job.current_stage and job.stages[job.current_stage]["status"] == JOB_RUNNING:
+                job.stages[job.current_stage].update(status=JOB_DONE, finished_at=now)
+            job.stages[stage] = {"status": JOB_RUNNING, "started_at": now, "finished_at": None,
+                                 "current": None, "total": None, "progress": None}
+            job.current_stage = stage
+            self._emit(job, "stage", {"stage": stage, "step": event.get("step"), "steps": event.get("steps")})
+        if job.current_stage is None:
+            return
+        info = job.stages[job.current_stage]
+        for key in ("step", "steps"):
+            if key in event:
+                info[key] = event[key]
+        if event.get("total"):
+            info["current"], info["total"] = event.get("current", 0), event["total"]
+            info["progress"] = min(max(float(info["current"]) / float(info["total"]), 0.0), 1.0)
+        if info.get("steps"):
+            done_steps = max(int(info.get("step", 1)) - 1, 0)
+            job.progress = min((done_steps + (info["progress"] or 0.0)) / float(info["steps"]), 1.0)
+        else:
+            job.progress = info["progress"]
+        self._emit(job, "progress", {"stage": job.current_stage, "current": info["current"],
+                                     "total": info["total"], "stage_progress": info["progress"],
+                                     "progress": job.progress, "message": event.get("message")})
+
+    def _handle_stderr_line(self, job: TaskJob, line: str):
+        with self._cond:
+            if line.startswith(PROGRESS_PREFIX):
+                try:
+                    event = json.loads(line[len(PROGRESS_PREFIX):])
+                except json.JSONDecodeError:
+                    return
+                if set(event) != {"message"}:
+                    self._apply_progress(job, event)
+                    return
+                line = event["message"]  # só mensagem: linha de log (ex.: saída do COLMAP)
+            job.log_tail.append(line)
+            self._emit(job, "log", {"line": line})
+
+    # --- ciclo de vida ---
+    def submit(self, task: str, command: List[str]) -> TaskJob:
+        job = TaskJob(task, command)
+        with self._cond:
+            self._jobs[job.id] = job
+            self._prune()
+            self._emit(job, "status", {"status": JOB_QUEUED})
+        threading.Thread(target=self._run, args=(job,), name=f"task-{job.id}", daemon=True).start()
+        return job
+
+    def _run(self, job: TaskJob):
+        env = dict(self.env if self.env is not None else os.environ)
+        env[PROGRESS_ENV] = "1"
+        env["PYTHONUNBUFFERED"] = "1"
+        env.setdefault("PYTHONIOENCODING", "utf-8")
+        try:
+            process = subprocess.Popen(
+                job.command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                encoding="utf-8", errors="replace", env=env, cwd=self.cwd, **_popen_group_kwargs())
+        except OSError as e:
+            with self._cond:
+                job.error = str(e)
+                self._set_status(job, JOB_FAILED)
+            return
+
+        with self._cond:
+            job.process = process
+            if job.cancel_requested:  # cancelado antes de iniciar
+                terminate_process_group(process, grace_s=0.0)
+            self._set_status(job, JOB_RUNNING)
+
+        stdout_lines: List[str] = []
+
+        def _read_stdout():
+            for line in iter(process.stdout.readline, ""):
+                stdout_lines.append(line)
+
+        reader = threading.Thread(target=_read_stdout, daemon=True)
+        reader.start()
+        for line in iter(process.stderr.readline, ""):
+            line = line.rstrip()
+            if line:
+                self._handle_stderr_line(job, line)
+        reader.join()
+        returncode = process.wait()
+
+        with self._cond:
+            job.returncode = returncode
+            if job.cancel_requested:
+                job.error = "Tarefa cancelada."
+                self._set_status(job, JOB_CANCELLED)
+                return
+            result = parse_json_output("".join(stdout_lines).strip())
+            if returncode == 0 and result is not None:
+                job.result = result
+                self._set_status(job, JOB_DONE)
+            else:
+                log = [line for line in job.log_tail if line.strip()]
+                job.error = (log[-1] if log else None) or (
+                    "Saída inválida do processo." if returncode == 0 else f"Processo terminou com código {returncode}.")
+                self._set_status(job, JOB_FAILED)
+
+    def cancel(self, job_id: str, grace_s: float = 5.0) -> Optional[TaskJob]:
+        """Cancela o job (encerra o grupo de processos); None se o id não existe."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return job
+            job.cancel_requested = True
+            process = job.process
+            self._emit(job, "log", {"line": "Cancelamento solicitado."})
+        if process is not None:
+            terminate_process_group(process, grace_s=grace_s)
+        return job
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+    # --- consulta ---
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job else None
+
+    def list(self) -> List[Dict]:
+        with self._cond:
+            return [{key: value for key, value in job.snapshot().items() if key not in ("log", "result")}
+                    for job in self._jobs.values()]
+
+    def iter_events(self, job_id: str, after: int = 0, heartbeat_s: float = 15.0) -> Iterator[Optional[Dict]]:
+        """
+        Eventos com id > `after` (Last-Event-ID), bloqueando até chegarem novos; None a cada
+        `heartbeat_s` sem eventos (mantém a conexão viva). Termina quando o job acaba.
+        """
+        while True:
+            with self._cond:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                pending = [e for e in job.events if e["id"] > after]
+                if not pending and job.status not in FINISHED_STATES:
+                    self._cond.wait(heartbeat_s)
+                    pending = [e for e in job.events if e["id"] > after]
+                finished = job.status in FINISHED_STATES
+            if not pending:
+                if finished:
+                    return
+                yield None
+                continue
+            for event in pending:
+                after = event["id"]
+                yield event
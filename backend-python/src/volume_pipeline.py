@@ -0,0 +1,104 @@
+from typing import Callable, Dict, Optional, Tuple
+
+"""
+Módulo: volume_pipeline
+Responsabilidade:
+    - Regras do cálculo de volume compartilhadas pela interface (services) e pelo lote
+      (batch_volume): dicionários ArUco procurados, tipo de volume -> método, opções de
+      segmentação por cor e o cálculo com a escala já resolvida (feijão por cor ou malha).
+    - Sem imports pesados no topo: o processing (Open3D, trimesh) só é carregado no cálculo.
+"""
+
+ARUCO_DICTS = ["DICT_4X4_50", "DICT_4X4_100", "DICT_4X4_250", "DICT_4X4_1000"]
+
+# Tipo de volume (mesmas opções da interface) -> (volume_method, primitive_fit)
+VOLUME_MODES = {
+    "auto": ("auto", True),
+    "regular": ("auto", True),
+    "heightmap": ("heightmap", False),
+    "bean_color": ("heightmap_color", False),
+    "mesh": ("auto", False),
+}
+
+
+def normalize_path(p: str) -> str:
+    return p.replace("\\", "/")
+
+
+def bean_color_options(bean_color_cfg: Optional[Dict]) -> Dict:
+    """Argumentos de compute_bean_volume_from_point_cloud a partir de parameters.bean_color."""
+    from src.processing import _extract_hsv_profiles_from_config
+
+    color_cfg = bean_color_cfg or {}
+    return {
+        "hsv_target": tuple(color_cfg.get("hsv_target", [175, 155, 79])),
+        "hsv_tolerance": tuple(color_cfg.get("hsv_tolerance", [12, 80, 80])),
+        "hsv_profiles": _extract_hsv_profiles_from_config(color_cfg),
+        "detection_cfg": color_cfg.get("detection", {}),
+        "heightmap_cfg": color_cfg.get("heightmap", {}),
+    }
+
+
+def detect_aruco_scale(mesh_path: str, marker_size_cm: float) -> Dict:
+    """Escala pelo ArUco de id 0 com lado `marker_size_cm`, procurado em todos os ARUCO_DICTS."""
+    from src.processing import compute_aruco_scale_from_mesh
+
+    return compute_aruco_scale_from_mesh(
+        mesh_path=mesh_path,
+        real_marker_size=float(marker_size_cm) * 10.0,
+        input_unit="mm",
+        aruco_dict=ARUCO_DICTS,
+        aruco_id=0,
+    )
+
+
+def compute_scaled_volume(
+    mesh_path: str,
+    recon_dir: str,
+    scale: float,
+    volume_method: str = "auto",
+    primitive_fit: bool = True,
+    bean_color_cfg: Optional[Dict] = None,
+    color_first: bool = False,
+    prepare_mesh: Optional[Callable[[str], Optional[str]]] = None,
+    export_stl_path: Optional[str] = None,
+    return_grid: bool = False,
+) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Volume com a escala já resolvida. `heightmap_color` segmenta o feijão por cor na nuvem da
+    reconstrução; com `color_first` (escala A4 + método por altura) tenta a cor e, sem feijão
+    detectado, usa a malha. Os demais métodos usam a malha de `prepare_mesh(mesh_path)`
+    (padrão: ensure_volume_mesh; None = cancelado). Retorna (resultado, malha usada no volume).
+    """
+    from src.processing import (
+        _load_colored_point_cloud_from_recon,
+        compute_bean_volume_from_point_cloud,
+        compute_volume_from_mesh,
+        ensure_volume_mesh,
+    )
+
+    if volume_method == "heightmap_color" or color_first:
+        try:
+            pcd, source = _load_colored_point_cloud_from_recon(recon_dir)
+            volume_m3, meta = compute_bean_volume_from_point_cloud(
+                pcd=pcd, scale=scale, return_grid=return_grid, **bean_color_options(bean_color_cfg))
+            meta["source_path"] = normalize_path(source)
+            return {"volume": volume_m3, "unit": "m3", "method": "heightmap_color", "scale": float(scale),
+                    "heightmap": meta}, None
+        except Exception:
+            if volume_method == "heightmap_color":
+                raise
+
+    volume_mesh_path = (prepare_mesh or ensure_volume_mesh)(mesh_path)
+    if not volume_mesh_path:
+        return None, None
+    result = compute_volume_from_mesh(
+        mesh_path=volume_mesh_path,
+        scale=scale,
+        output_unit="m3",
+        volume_method=volume_method,
+        primitive_fit=primitive_fit,
+        export_stl_path=export_stl_path,
+    )
+    return result, volume_mesh_path
+
@@ -0,0 +1,336 @@
+import atexit
+import importlib
+import multiprocessing as mp
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Iterable, List, Optional
+
+"""
+Módulo: worker_pool
+Responsabilidade:
+    - Pool de processos de longa duração atrás do Flask: cada processo importa uma vez os
+      módulos pesados (Open3D, trimesh, OpenCV, SciPy, services) e atende vários jobs,
+      eliminando o custo de iniciar um interpretador por requisição.
+    - Protocolo simples por Pipe: o servidor envia {"target": "modulo:funcao", "args", "kwargs"}
+      e o processo responde {"status": "ok", "result"} ou {"status": "erro", "error"}.
+    - Reciclagem: o processo é substituído após `max_jobs` jobs ou quando a memória residente
+      passa de `max_rss_mb` (vazamentos de bibliotecas nativas não se acumulam).
+    - Sem processo livre em `acquire_timeout` segundos, ou sem nenhum processo vivo (reposição
+      falhou), `run` levanta WorkerPoolUnavailableError e o servidor usa um subprocesso.
+"""
+
+DEFAULT_PRELOAD = ("services", "src.processing", "src.reconstruction", "src.camera_calibration")
+# Chamado em cada processo após o pré-carregamento: o processo vive além do job, então as
+# prévias do histórico podem ser geradas em segundo plano ao fim da reconstrução
+DEFAULT_INITIALIZER = "src.mesh_preview:enable_background_previews"
+
+
+class WorkerTaskError(RuntimeError):
+    """O job terminou com exceção no processo de trabalho (mensagem original em str(e))."""
+
+    def __init__(self, message: str, traceback_text: str = ""):
+        super().__init__(message)
+        self.traceback_text = traceback_text
+
+
+class WorkerCrashedError(WorkerTaskError):
+    """O processo de trabalho morreu durante o job (falha nativa, falta de memória, kill)."""
+
+
+class WorkerPoolUnavailableError(RuntimeError):
+    """Nenhum processo atendeu o job (pool encerrado, sem processos vivos ou tempo de espera esgotado)."""
+
+
+def current_rss_mb() -> Optional[float]:
+    """Memória residente atual do processo (MB); None quando não há como medir."""
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # pico: KB no Linux, bytes no macOS
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def _resolve(target: str):
+    module_name, _, attr = target.partition(":")
+    if not attr:
+        raise ValueError(f"Alvo inválido (use 'modulo:funcao'): {target}")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _worker_main(conn, preload: Iterable[str], extra_sys_path: Iterable[str], initializer: Optional[str] = None):
+    """Laço do processo de trabalho: pré-carrega os módulos, chama `initializer` e atende jobs até receber None."""
+    # Ctrl+C / SIGINT do servidor encerra o servidor, que então fecha os processos pelo pipe
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for path in extra_sys_path:
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    loaded, failed = [], {}
+    for name in preload:
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except Exception as e:  # módulo opcional ausente: o job importa sob demanda
+            failed[name] = str(e)
+    if initializer:
+        try:
+            _resolve(initializer)()
+        except Exception as e:
+            failed[initializer] = str(e)
+    conn.send({"type": "ready", "pid": os.getpid(), "preloaded": loaded, "preload_errors": failed})
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        try:
+            result = _resolve(message["target"])(*message.get("args", ()), **message.get("kwargs", {}))
+            reply = {"status": "ok", "result": result}
+        except (Exception, SystemExit) as e:
+            reply = {"status": "erro", "error": str(e) or type(e).__name__,
+                     "traceback": traceback.format_exc(limit=8)}
+        reply["rss_mb"] = current_rss_mb()
+        try:
+            conn.send(reply)
+        except Exception as e:  # resultado não serializável
+            conn.send({"status": "erro", "error": f"Resultado inválido do job: {e}", "rss_mb": reply["rss_mb"]})
+    conn.close()
+
+
+class _Worker:
+    def __init__(self, process, conn, info: Dict):
+        self.process = process
+        self.conn = conn
+        self.pid = info.get("pid", process.pid)
+        self.preloaded = info.get("preloaded", [])
+        self.jobs = 0
+        self.rss_mb = None
+
+    def stop(self, timeout: float = 5.0):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+        self.conn.close()
+
+
+class WorkerPool:
+    """
+    Pool de `size` processos persistentes. `run("modulo:funcao", *args)` espera (até
+    `acquire_timeout` s) um processo livre atender o job e devolve o resultado; levanta
+    WorkerTaskError se o job falhar e WorkerPoolUnavailableError se nenhum processo atender.
+    Os processos usam "spawn": o servidor Flask tem threads, e fork copiaria locks em uso.
+    Não são daemon, para que os jobs possam abrir seus próprios pools (ex.: calibração).
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        max_jobs: int = 20,
+        max_rss_mb: Optional[float] = None,
+        preload: Iterable[str] = DEFAULT_PRELOAD,
+        start_method: str = "spawn",
+        sys_path: Iterable[str] = (),
+        initializer: Optional[str] = None,
+        acquire_timeout: float = 60.0,
+        respawn_attempts: int = 3,
+    ):
+        self.size = max(1, int(size))
+        self.max_jobs = max(1, int(max_jobs)) if max_jobs else None
+        self.max_rss_mb = float(max_rss_mb) if max_rss_mb else None
+        self.preload = tuple(preload)
+        self.sys_path = tuple(sys_path)
+        self.initializer = initializer
+        self.acquire_timeout = float(acquire_timeout)
+        self.respawn_attempts = max(1, int(respawn_attempts))
+        self._ctx = mp.get_context(start_method)
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._respawning = 0
+        self.recycled = 0
+        self.crashed = 0
+        self.respawn_failures = 0
+        self.last_respawn_error: Optional[str] = None
+        self.jobs = 0
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.preload, self.sys_path, self.initializer),
+            name="volumetria-worker",
+        )
+        process.start()
+        child_conn.close()
+        try:
+            info = parent_conn.recv()
+        except EOFError:
+            process.join(1.0)
+            raise RuntimeError(f"Processo de trabalho encerrou ao iniciar (código {process.exitcode}).")
+        worker = _Worker(process, parent_conn, info)
+        with self._lock:
+            if self._closed:
+                worker.stop()
+                raise RuntimeError("Pool encerrado.")
+            self._workers.append(worker)
+        return worker
+
+    def start(self):
+        """Inicia (em paralelo) e aguarda todos os processos com os módulos pré-carregados."""
+        errors = []
+
+        def _start_one():
+            try:
+                self._idle.put(self._spawn())
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=_start_one, daemon=True) for _ in range(self.size)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            self.shutdown()
+            raise errors[0]
+        atexit.register(self.shutdown)
+        return self
+
+    def _replace(self, worker: _Worker):
+        """Encerra `worker` e inicia o substituto em segundo plano (o pré-carregamento leva segundos)."""
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            closed = self._closed
+            if not closed:
+                self._respawning += 1
+
+        def _restart():
+            worker.stop()
+            if closed:
+                return
+            try:
+                for attempt in range(1, self.respawn_attempts + 1):
+                    try:
+                        self._idle.put(self._spawn())
+                        return
+                    except Exception as e:
+                        error = f"{e} (tentativa {attempt}/{self.respawn_attempts})"
+                        print(f"[worker_pool] Falha ao repor processo: {error}", file=sys.stderr)
+                        if self._closed:
+                            return
+                        time.sleep(min(2.0 ** (attempt - 1), 10.0))
+                # Vaga perdida: fica visível em stats() e, sem processos vivos, run() desiste na hora
+                with self._lock:
+                    self.respawn_failures += 1
+                    self.last_respawn_error = error
+            finally:
+                with self._lock:
+                    self._respawning -= 1
+
+        threading.Thread(target=_restart, daemon=True).start()
+
+    def _acquire(self) -> _Worker:
+        """Processo livre; espera no máximo `acquire_timeout` s enquanto houver processos vivos ou em reposição."""
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise WorkerPoolUnavailableError("Pool encerrado.")
+                if not self._workers and not self._respawning:
+                    raise WorkerPoolUnavailableError(
+                        f"Nenhum processo de trabalho ativo: {self.last_respawn_error or 'reposição falhou'}")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerPoolUnavailableError(
+                    f"Nenhum processo de trabalho livre em {self.acquire_timeout:g} s.")
+            try:
+                return self._idle.get(timeout=min(remaining, 0.5))
+            except queue.Empty:
+                continue
+
+    def run(self, target: str, *args, **kwargs):
+        worker = self._acquire()
+        try:
+            worker.conn.send({"target": target, "args": args, "kwargs": kwargs})
+            reply = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            self.crashed += 1
+            self._replace(worker)
+            code = worker.process.exitcode
+            raise WorkerCrashedError(f"Processo de trabalho encerrado durante o job (código {code}): {e}")
+
+        worker.jobs += 1
+        worker.rss_mb = reply.get("rss_mb")
+        self.jobs += 1
+        if (self.max_jobs and worker.jobs >= self.max_jobs) or (
+            self.max_rss_mb and worker.rss_mb and worker.rss_mb > self.max_rss_mb
+        ):
+            self.recycled += 1
+            self._replace(worker)
+        else:
+            self._idle.put(worker)
+
+        if reply.get("status") != "ok":
+            raise WorkerTaskError(reply.get("error", "Falha no job."), reply.get("traceback", ""))
+        return reply.get("result")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            workers = [{"pid": w.pid, "jobs": w.jobs, "rss_mb": w.rss_mb} for w in self._workers]
+            respawning, respawn_failures = self._respawning, self.respawn_failures
+        return {"size": self.size, "idle": self._idle.qsize(), "workers": workers, "jobs": self.jobs,
+                "recycled": self.recycled, "crashed": self.crashed, "respawning": respawning,
+                "respawn_failures": respawn_failures, "last_respawn_error": self.last_respawn_error}
+
+    def shutdown(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
+
+
+def create_worker_pool_from_config(cfg: Dict, base_dir: str) -> Optional[WorkerPool]:
+    """
+    Pool a partir de parameters.server; None quando task_mode = "subprocess" (um interpretador
+    por requisição, comportamento anterior).
+    """
+    server_cfg = (cfg.get("parameters", {}) or {}).get("server") or {}
+    if str(server_cfg.get("task_mode", "pool")).lower() != "pool":
+        return None
+    pool_cfg = server_cfg.get("worker_pool") or {}
+    return WorkerPool(
+        size=pool_cfg.get("workers", 2),
+        max_jobs=pool_cfg.get("max_jobs_per_worker", 20),
+        max_rss_mb=pool_cfg.get("max_rss_mb"),
+        preload=pool_cfg.get("preload", DEFAULT_PRELOAD),
+        sys_path=(base_dir,),
+        initializer=DEFAULT_INITIALIZER,
+        acquire_timeout=pool_cfg.get("acquire_timeout_s", 60.0),
+        respawn_attempts=pool_cfg.get("respawn_attempts", 3),
+    ).start()
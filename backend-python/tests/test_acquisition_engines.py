@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from src.acquisition import choose_extraction_engine, iter_sampled_frames
+
+
+@pytest.fixture()
+def indexed_video(tmp_path):
+    # Cada frame tem brilho 4*i, permitindo conferir qual frame foi entregue
+    path = str(tmp_path / "indexed.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    for i in range(60):
+        writer.write(np.full((48, 64, 3), i * 4, np.uint8))
+    writer.release()
+    return path
+
+
+def _sample(path, rate, engine, **kwargs):
+    cap = cv2.VideoCapture(path)
+    try:
+        return [(idx, float(frame.mean())) for idx, frame in iter_sampled_frames(cap, rate, engine, **kwargs)]
+    finally:
+        cap.release()
+
+
+@pytest.mark.parametrize("engine", ["grab", "seek", "auto"])
+def test_engines_match_sequential_read(indexed_video, engine):
+    expected = _sample(indexed_video, 7, "read")
+
+    result = _sample(indexed_video, 7, engine)
+
+    assert [idx for idx, _ in result] == [0, 7, 14, 21, 28, 35, 42, 49, 56]
+    assert [idx for idx, _ in result] == [idx for idx, _ in expected]
+    for (_, got), (idx, ref) in zip(result, expected):
+        assert abs(got - ref) < 2.0
+        assert abs(got - idx * 4) < 3.0
+
+
+def test_sampling_from_segment_keeps_global_indices(indexed_video):
+    result = _sample(indexed_video, 5, "seek", start_frame=21, end_frame=40)
+
+    assert [idx for idx, _ in result] == [25, 30, 35]
+
+
+def test_engine_choice_follows_sampling_ratio():
+    assert choose_extraction_engine(1, 30) == "read"
+    assert choose_extraction_engine(12, 60) == "grab"
+    assert choose_extraction_engine(300, 60) == "seek"
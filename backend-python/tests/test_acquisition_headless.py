@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from src.acquisition import VideoOpenError, extract_frames, iter_extract_frames
+
+
+def _video(tmp_path, frames=30):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    for i in range(frames):
+        writer.write(np.full((48, 64, 3), i * 8, np.uint8))
+    writer.release()
+    return path
+
+
+def test_headless_extraction_reports_events(tmp_path):
+    output_dir = tmp_path / "frames" / "proj"
+    events = []
+    written = []
+
+    final = extract_frames(_video(tmp_path), str(output_dir), 10, progress=events.append,
+                           frame_callback=written.append, image_format="jpg")
+
+    assert events[0]["type"] == "start" and events[0]["rate"] == 3
+    assert [e["frame_index"] for e in events if e["type"] == "progress"] == list(range(0, 30, 3))
+    assert final["type"] == "done" and final["saved"] == 10
+    assert sorted(p.name for p in output_dir.iterdir()) == (
+        ["frames_manifest.jsonl"] + [f"proj_{i:03d}.jpg" for i in range(1, 11)])
+    assert len(written) == 10
+
+
+def test_generator_raises_for_missing_video(tmp_path):
+    with pytest.raises(VideoOpenError):
+        next(iter_extract_frames(str(tmp_path / "nao_existe.mp4"), str(tmp_path / "out"), 5))
+
+
+@pytest.mark.parametrize("decode_workers", [1, 2])
+def test_frames_are_downscaled_to_long_side(tmp_path, decode_workers):
+    output_dir = tmp_path / "frames" / "proj"
+
+    extract_frames(_video(tmp_path), str(output_dir), 10, max_long_side=32, decode_workers=decode_workers)
+
+    shapes = {cv2.imread(str(p)).shape for p in output_dir.glob("*.png")}
+    assert shapes == {(24, 32, 3)}
+
+
+def test_long_side_can_follow_reconstruction_config():
+    from src.acquisition import extraction_options_from_config
+
+    options = extraction_options_from_config({"max_long_side": "reconstruction"}, {"max_image_size": 1600})
+
+    assert options["max_long_side"] == 1600
+    assert extraction_options_from_config({})["max_long_side"] == 0
+
+
+def test_headless_route_only_reads_allowed_input_roots(tmp_path, monkeypatch):
+    import app
+    from src import acquisition
+
+    inputs = tmp_path / "in"
+    inputs.mkdir()
+    (inputs / "clip.mp4").write_bytes(b"")
+    cfg = app._load_config()
+    cfg["paths"] = {**cfg["paths"], "headless_input_roots": [str(inputs)], "frames_output": str(tmp_path / "frames")}
+    calls = []
+    monkeypatch.setattr(app, "_load_config", lambda: cfg)
+    monkeypatch.setattr(app, "_results_index", lambda: None)
+    monkeypatch.setattr(app, "record_result", lambda *args: None)
+    monkeypatch.setattr(acquisition, "extract_frames",
+                        lambda video, output_dir, fps, **options: calls.append((video, options)) or {"saved": 0})
+    client = app.app.test_client()
+
+    for body in ({"video_path": str(tmp_path / "fora.mp4")},
+                 {"video_path": str(inputs / ".." / "fora.mp4")},
+                 {"video_path": str(inputs / "clip.mp4"), "calibration_file": "/etc/passwd"}):
+        response = client.post("/extrair-frames-headless", json=body)
+        assert response.status_code == 400, body
+    assert calls == []
+
+    response = client.post("/extrair-frames-headless", json={"video_path": str(inputs / "clip.mp4")})
+    assert response.status_code == 200
+    assert calls[0][0] == os.path.realpath(str(inputs / "clip.mp4"))
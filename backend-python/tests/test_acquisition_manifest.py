@@ -0,0 +1,79 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from src.acquisition import (
+    expected_frame_count,
+    extract_frames,
+    iter_extract_frames,
+    manifest_image_stats,
+    read_frame_manifest,
+)
+
+
+def _video(tmp_path, frames=60):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    for i in range(frames):
+        frame = np.full((48, 64, 3), (i * 4) % 256, np.uint8)
+        cv2.rectangle(frame, (8 + i % 20, 8), (30 + i % 20, 30), (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def test_manifest_records_index_timestamp_sharpness_and_hash(tmp_path):
+    output_dir = tmp_path / "frames" / "proj"
+    extract_frames(_video(tmp_path), str(output_dir), 10, image_format="png")
+
+    header, entries = read_frame_manifest(str(output_dir))
+    assert header["rate"] == 3 and (header["width"], header["height"]) == (64, 48)
+    assert [e["frame_index"] for e in entries] == list(range(0, 60, 3))
+    assert entries[1]["timestamp_s"] == pytest.approx(0.1)
+    assert all(e["sharpness"] > 0 for e in entries)
+    for entry in entries:
+        assert entry["sha1"] == hashlib.sha1((output_dir / entry["file"]).read_bytes()).hexdigest()
+    assert manifest_image_stats(str(output_dir)) == {"count": 20, "width": 64, "height": 48}
+    assert expected_frame_count(str(output_dir)) == 20
+
+
+@pytest.mark.parametrize("decode_workers", [1, 2])
+def test_interrupted_extraction_resumes_from_manifest(tmp_path, decode_workers):
+    video = _video(tmp_path)
+    output_dir = tmp_path / "frames" / "proj"
+    reference_dir = tmp_path / "frames_ref" / "proj"
+    extract_frames(video, str(reference_dir), 10)
+
+    # Interrompe após alguns frames e apaga um deles (gravação perdida)
+    events = iter_extract_frames(video, str(output_dir), 10, writer_threads=1)
+    for event in events:
+        if event["type"] == "progress" and event["saved"] == 8:
+            break
+    events.close()
+    (output_dir / "proj_003.png").unlink()
+
+    written = []
+    final = extract_frames(video, str(output_dir), 10, frame_callback=written.append,
+                           decode_workers=decode_workers)
+
+    assert final["resumed"] == 7 and final["saved"] == 13
+    assert len(written) == 20
+    _, entries = read_frame_manifest(str(output_dir))
+    _, reference = read_frame_manifest(str(reference_dir))
+    assert [(e["file"], e["frame_index"]) for e in entries] == [(e["file"], e["frame_index"]) for e in reference]
+
+
+def test_changed_options_restart_extraction(tmp_path):
+    video = _video(tmp_path)
+    output_dir = tmp_path / "frames" / "proj"
+    extract_frames(video, str(output_dir), 10)
+
+    rerun = extract_frames(video, str(output_dir), 10)
+    assert rerun["resumed"] == 20 and rerun["saved"] == 0
+
+    changed = extract_frames(video, str(output_dir), 5)
+    assert changed["resumed"] == 0 and changed["saved"] == 10
+    assert len(read_frame_manifest(str(output_dir))[1]) == 10
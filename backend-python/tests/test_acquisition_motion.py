@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from src.acquisition import iter_motion_frames
+
+
+def test_motion_sampling_skips_still_segments(tmp_path):
+    # 3 s andando (4 px/frame) seguidos de 3 s parado, a 30 fps
+    rng = np.random.default_rng(1)
+    texture = cv2.resize((rng.random((40, 80)) * 255).astype(np.uint8), (640, 320),
+                         interpolation=cv2.INTER_NEAREST)
+    path = str(tmp_path / "walk.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (320, 240))
+    for i in range(180):
+        offset = min(i, 89) * 3
+        crop = texture[40:280, offset:offset + 320]
+        writer.write(cv2.cvtColor(crop, cv2.COLOR_GRAY2BGR))
+    writer.release()
+
+    cap = cv2.VideoCapture(path)
+    indices = [idx for idx, _ in iter_motion_frames(cap, motion_threshold=0.15, max_gap_s=2.0)]
+    cap.release()
+
+    moving = [i for i in indices if i < 90]
+    still = [i for i in indices if i >= 90]
+    assert indices[0] == 0
+    assert len(moving) >= 4
+    # Parado: só os frames forçados por max_gap (a cada 2 s)
+    assert len(still) <= 2
@@ -0,0 +1,51 @@
+import os
+from concurrent.futures import wait
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from src.acquisition import extract_video_segment, split_video_segments, start_parallel_extraction
+
+
+def _indexed_video(path, frames=90):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    for i in range(frames):
+        writer.write(np.full((48, 64, 3), (i * 2) % 256, np.uint8))
+    writer.release()
+    return str(path)
+
+
+def test_split_segments_are_aligned_and_cover_video():
+    segments = split_video_segments(100, 7, 4)
+
+    assert segments[0][0] == 0
+    assert segments[-1][1] is None
+    assert all(start % 7 == 0 for start, _ in segments)
+    assert all(segments[i][1] == segments[i + 1][0] for i in range(len(segments) - 1))
+
+
+def test_parallel_extraction_matches_sequential_names_and_frames(tmp_path):
+    video = _indexed_video(tmp_path / "clip.avi")
+    seq_dir = tmp_path / "seq" / "proj"
+    par_dir = tmp_path / "par" / "proj"
+    seq_dir.mkdir(parents=True)
+    par_dir.mkdir(parents=True)
+
+    sequential = extract_video_segment({
+        "video_path": video, "output_dir": str(seq_dir), "nome_projeto": "proj", "rate": 4,
+        "engine": "read", "start": 0, "end": None, "extensao": ".png", "params": [],
+    })
+    executor, futures = start_parallel_extraction(video, str(par_dir), 4, 90, workers=2, engine="auto")
+    wait(futures)
+    executor.shutdown()
+    parallel = [entry["file"] for future in futures for entry in future.result()]
+
+    seq_names = sorted(entry["file"] for entry in sequential)
+    assert seq_names == sorted(parallel)
+    assert seq_names[0] == "proj_001.png" and len(seq_names) == 23
+    for name in seq_names:
+        a = cv2.imread(str(seq_dir / name)).astype(int)
+        b = cv2.imread(str(par_dir / name)).astype(int)
+        assert np.abs(a - b).max() <= 2
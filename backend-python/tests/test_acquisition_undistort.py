@@ -0,0 +1,106 @@
+import json
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from src.acquisition import CAMERA_INTRINSICS_FILE, FrameTransform, extract_frames
+
+
+def _calibration(tmp_path, size=(640, 480)):
+    path = tmp_path / "camera_param.npz"
+    mtx = np.array([[500.0, 0, 320.0], [0, 500.0, 240.0], [0, 0, 1.0]])
+    dist = np.array([[-0.2, 0.05, 0.0, 0.0, 0.0]])
+    np.savez(path, mtx=mtx, dist=dist, image_size=np.array(size))
+    return str(path)
+
+
+def test_transform_caches_maps_and_combines_resize(tmp_path):
+    transform = FrameTransform(max_long_side=320, calibration_file=_calibration(tmp_path))
+    frame = np.full((480, 640, 3), 200, np.uint8)
+
+    out = transform(frame)
+    maps = transform._maps[(640, 480)]
+    transform(frame)
+
+    assert out.shape == (240, 320, 3)
+    assert transform._maps[(640, 480)] is maps and len(transform._maps) == 1
+    intr = transform.intrinsics(640, 480)
+    assert intr["model"] == "PINHOLE" and (intr["width"], intr["height"]) == (320, 240)
+    assert 100 < intr["params"][0] < 300
+
+
+def test_calibration_is_rescaled_to_video_resolution(tmp_path):
+    transform = FrameTransform(calibration_file=_calibration(tmp_path, size=(1280, 960)))
+
+    mtx = transform._source_matrix(640, 480)
+
+    assert mtx[0, 0] == pytest.approx(250.0) and mtx[0, 2] == pytest.approx(160.0)
+
+
+def test_extraction_writes_intrinsics_used_by_reconstruction(tmp_path, monkeypatch):
+    import src.reconstruction as reconstruction
+
+    video = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*"MJPG"), 30, (640, 480))
+    for i in range(10):
+        writer.write(np.full((480, 640, 3), i * 10, np.uint8))
+    writer.release()
+    frames_dir = tmp_path / "frames" / "proj"
+
+    extract_frames(video, str(frames_dir), 10, calibration_file=_calibration(tmp_path))
+
+    intr = json.loads((frames_dir / CAMERA_INTRINSICS_FILE).read_text())
+    assert intr["width"] == 640
+
+    monkeypatch.setattr(reconstruction, "_colmap_has_option", lambda tool, option: True)
+    plan = {
+        "dense_backend": "cpu", "use_gpu": 0, "feature_threads": 2, "matcher_threads": 2,
+        "mapper_threads": 2, "fusion_threads": 2, "gpu_index": "0", "max_image_size": 2000,
+        "patch_match_window_radius": 5, "patch_match_cache_size": 8, "fusion_cache_size": 8,
+        "cpu_dense_workers": 2,
+    }
+    steps = reconstruction.build_reconstruction_steps(str(frames_dir), str(tmp_path / "recon"), "", plan)
+    commands = {stage: cmd for cmd, _, stage in steps if isinstance(cmd, str)}
+
+    assert "--ImageReader.camera_model PINHOLE" in commands["features"]
+    assert "--ImageReader.camera_params " in commands["features"]
+    assert "--Mapper.ba_refine_focal_length 0" in commands["mapping"]
+
+
+def test_intrinsics_match_written_frames_with_downscale_and_rotation(tmp_path, monkeypatch):
+    import src.acquisition as acquisition
+
+    video = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*"MJPG"), 30, (640, 480))
+    for i in range(6):
+        writer.write(np.full((480, 640, 3), i * 10, np.uint8))
+    writer.release()
+
+    open_capture = cv2.VideoCapture
+
+    class RotatedMetadataCapture:
+        # Contêiner com rotação nos metadados: propriedades sem rotação, frames já girados
+        def __init__(self, *args):
+            self._cap = open_capture(*args)
+
+        def get(self, prop):
+            if prop == cv2.CAP_PROP_FRAME_WIDTH:
+                return 480.0
+            if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+                return 640.0
+            return self._cap.get(prop)
+
+        def __getattr__(self, name):
+            return getattr(self._cap, name)
+
+    monkeypatch.setattr(acquisition.cv2, "VideoCapture", RotatedMetadataCapture)
+    frames_dir = tmp_path / "frames" / "proj"
+    extract_frames(video, str(frames_dir), 10, max_long_side=320,
+                   calibration_file=_calibration(tmp_path), decode_workers=1)
+
+    intr = json.loads((frames_dir / CAMERA_INTRINSICS_FILE).read_text())
+    written = cv2.imread(str(sorted(frames_dir.glob("*.png"))[0]))
+    assert (intr["width"], intr["height"]) == (written.shape[1], written.shape[0]) == (320, 240)
+    assert intr["params"][2] == pytest.approx(160.0, abs=20.0)
@@ -0,0 +1,48 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from src.acquisition import FrameWriter, image_write_params
+
+
+@pytest.mark.parametrize("fmt,ext", [("png", ".png"), ("jpg", ".jpg"), ("webp", ".webp")])
+def test_writer_encodes_configured_format(tmp_path, fmt, ext):
+    extensao, params = image_write_params(fmt, png_compression=1, jpeg_quality=90, webp_quality=90)
+    written = []
+    writer = FrameWriter(workers=3, max_pending=4, params=params, on_written=written.append)
+
+    frame = np.full((32, 48, 3), 120, np.uint8)
+    for i in range(10):
+        writer.submit(str(tmp_path / f"f_{i:03d}{extensao}"), frame)
+
+    assert writer.close() == 10
+    assert extensao == ext
+    assert sorted(os.path.basename(p) for p in written) == [f"f_{i:03d}{ext}" for i in range(10)]
+    assert cv2.imread(written[0]).shape == (32, 48, 3)
+
+
+def test_writer_applies_backpressure(tmp_path):
+    release = threading.Event()
+    writer = FrameWriter(workers=1, max_pending=2, on_written=lambda path: release.wait(5))
+    frame = np.zeros((8, 8, 3), np.uint8)
+    writer.submit(str(tmp_path / "a.png"), frame)
+    writer.submit(str(tmp_path / "b.png"), frame)
+
+    third = threading.Thread(target=writer.submit, args=(str(tmp_path / "c.png"), frame))
+    third.start()
+    third.join(0.3)
+    assert third.is_alive()  # fila cheia: o decodificador espera
+
+    release.set()
+    third.join(5)
+    assert not third.is_alive()
+    assert writer.close() == 3
+
+
+def test_invalid_format_is_rejected():
+    with pytest.raises(ValueError):
+        image_write_params("gif")
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+import src.camera_calibration as camera_calibration
+from src.camera_calibration import calibrate_from_detections, detect_calibration_points
+
+BOARD = (9, 6)
+
+
+K = np.array([[1000.0, 0, 600], [0, 1000.0, 450], [0, 0, 1]])
+
+
+def _board_image(path, rvec, size=(1200, 900), square=60, square_mm=25.0):
+    """Tabuleiro sintético (BOARD cantos internos) fotografado por uma câmera pinhole K na pose `rvec`."""
+    cols, rows = BOARD[0] + 1, BOARD[1] + 1
+    board = np.full((rows * square + 2 * square, cols * square + 2 * square), 255, np.uint8)
+    for r in range(rows):
+        for c in range(cols):
+            if (r + c) % 2 == 0:
+                y, x = square + r * square, square + c * square
+                board[y:y + square, x:x + square] = 0
+    mm = square_mm / square
+    center = np.array([board.shape[1] * mm / 2, board.shape[0] * mm / 2, 0.0])
+    rotation, _ = cv2.Rodrigues(np.array(rvec, np.float64))
+    t = -rotation @ center + np.array([0, 0, 550.0])
+    homography = K @ np.column_stack([rotation[:, 0], rotation[:, 1], t]) @ np.diag([mm, mm, 1.0])
+    image = cv2.warpPerspective(board, homography, size, flags=cv2.INTER_AREA, borderValue=255)
+    cv2.imwrite(str(path), image)
+    return str(path)
+
+
+TILTS = [(0.3, 0.0, 0.0), (0.0, 0.35, 0.0), (-0.3, 0.2, 0.1), (0.2, -0.3, 0.0), (-0.1, -0.3, 0.2)]
+
+
+def test_rerun_only_detects_new_or_changed_images(tmp_path, monkeypatch):
+    photos = tmp_path / "fotos"
+    photos.mkdir()
+    paths = [_board_image(photos / f"{i}.png", tilt) for i, tilt in enumerate(TILTS[:3])]
+    cache = str(tmp_path / "calibrations" / "corner_cache.json")
+    first = detect_calibration_points(paths, BOARD, workers=1, cache_path=cache, square_size=25.0)
+
+    detected = []
+    original = camera_calibration.detect_chessboard
+    monkeypatch.setattr(camera_calibration, "detect_chessboard",
+                        lambda task: (detected.append(task["path"]), original(task))[1])
+    paths.append(_board_image(photos / "3.png", TILTS[3]))
+    _board_image(photos / "0.png", TILTS[4])  # conteúdo alterado
+    second = detect_calibration_points(paths, BOARD, workers=1, cache_path=cache, square_size=25.0)
+
+    assert sorted(detected) == sorted([paths[0], paths[3]])
+    assert np.array_equal(first[1]["corners"], second[1]["corners"]) and second[1]["cached"]
+
+    detected.clear()
+    detect_calibration_points(paths, BOARD, workers=1, cache_path=cache, square_size=30.0)
+    assert len(detected) == 4
+
+
+def test_outlier_view_is_excluded_and_reported(tmp_path):
+    paths = [_board_image(tmp_path / f"{i}.png", tilt) for i, tilt in enumerate(TILTS)]
+    detections = detect_calibration_points(paths, BOARD, workers=1)
+    rng = np.random.default_rng(0)
+    detections[2]["corners"] = (detections[2]["corners"] + rng.normal(0, 4, detections[2]["corners"].shape)
+                                ).astype(np.float32)
+
+    calibration = calibrate_from_detections(detections, BOARD, 25.0)
+
+    assert calibration["excluded"] == ["2.png"]
+    assert calibration["used"] == 4
+    assert set(calibration["per_view_errors"]) == {f"{i}.png" for i in range(5)}
+    assert calibration["per_view_errors"]["2.png"] > calibration["rms"]
+    assert calibration["image_size"] == (1200, 900)
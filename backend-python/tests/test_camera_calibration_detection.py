@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from src.camera_calibration import detect_calibration_points
+
+BOARD = (9, 6)
+
+
+def _board_image(path, angle=0.0, size=(2400, 1800), square=120):
+    """Tabuleiro sintético (BOARD cantos internos) sob uma leve perspectiva."""
+    cols, rows = BOARD[0] + 1, BOARD[1] + 1
+    board = np.full((rows * square + 2 * square, cols * square + 2 * square), 255, np.uint8)
+    for r in range(rows):
+        for c in range(cols):
+            if (r + c) % 2 == 0:
+                y, x = square + r * square, square + c * square
+                board[y:y + square, x:x + square] = 0
+    h, w = board.shape
+    src = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    dx = angle * w
+    dst = np.float32([[200 + dx, 150], [size[0] - 200, 150 + dx], [size[0] - 200 - dx, size[1] - 150],
+                      [200, size[1] - 150 - dx]])
+    image = cv2.warpPerspective(board, cv2.getPerspectiveTransform(src, dst), size, borderValue=255)
+    cv2.imwrite(str(path), cv2.cvtColor(image, cv2.COLOR_GRAY2BGR))
+    return str(path)
+
+
+def test_downscaled_search_matches_full_resolution_corners(tmp_path):
+    path = _board_image(tmp_path / "a.png", angle=0.05)
+
+    full = detect_calibration_points([path], BOARD, workers=1, search_long_side=0)[0]
+    reduced = detect_calibration_points([path], BOARD, workers=1, search_long_side=800)[0]
+
+    assert full["image_size"] == reduced["image_size"] == (2400, 1800)
+    assert np.abs(full["corners"] - reduced["corners"]).max() < 0.1
+
+
+def test_parallel_detection_is_identical_to_serial(tmp_path):
+    paths = [_board_image(tmp_path / f"{i}.png", angle=0.02 * i) for i in range(3)]
+    blank = tmp_path / "vazia.png"
+    cv2.imwrite(str(blank), np.full((1800, 2400, 3), 255, np.uint8))
+    paths.append(str(blank))
+
+    ticks = []
+    serial = detect_calibration_points(paths, BOARD, workers=1)
+    parallel = detect_calibration_points(paths, BOARD, workers=2, progress=lambda: ticks.append(1))
+
+    assert len(ticks) == 4
+    assert [r["path"] for r in parallel] == paths
+    assert parallel[-1]["corners"] is None
+    for a, b in zip(serial[:3], parallel[:3]):
+        assert np.array_equal(a["corners"], b["corners"])
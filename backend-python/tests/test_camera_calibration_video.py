@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from src.camera_calibration import calibrate_from_video, select_diverse_views
+
+BOARD = (9, 6)
+K = np.array([[600.0, 0, 320], [0, 600.0, 240], [0, 0, 1]])
+
+
+def _render(rvec, size=(640, 480), square=30, square_mm=25.0):
+    """Tabuleiro sintético (BOARD cantos internos) visto pela câmera pinhole K na pose `rvec`."""
+    cols, rows = BOARD[0] + 1, BOARD[1] + 1
+    board = np.full((rows * square + 2 * square, cols * square + 2 * square), 255, np.uint8)
+    for r in range(rows):
+        for c in range(cols):
+            if (r + c) % 2 == 0:
+                y, x = square + r * square, square + c * square
+                board[y:y + square, x:x + square] = 0
+    mm = square_mm / square
+    center = np.array([board.shape[1] * mm / 2, board.shape[0] * mm / 2, 0.0])
+    rotation, _ = cv2.Rodrigues(np.array(rvec, np.float64))
+    t = -rotation @ center + np.array([0, 0, 600.0])
+    homography = K @ np.column_stack([rotation[:, 0], rotation[:, 1], t]) @ np.diag([mm, mm, 1.0])
+    image = cv2.warpPerspective(board, homography, size, flags=cv2.INTER_AREA, borderValue=255)
+    return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+
+def _board_video(path, frames=240):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 30, (640, 480))
+    for i in range(frames):
+        if i < frames // 2:
+            rvec = (0.0, 0.0, 0.0)  # câmera parada: vistas redundantes
+        else:
+            phase = (i - frames // 2) / float(frames // 2) * 2 * np.pi
+            rvec = (0.35 * np.sin(phase), 0.35 * np.cos(phase), 0.1 * np.sin(2 * phase))
+        writer.write(_render(rvec))
+    writer.release()
+    return str(path)
+
+
+def test_video_calibration_uses_bounded_diverse_subset(tmp_path):
+    video = _board_video(tmp_path / "tabuleiro.avi")
+    ticks = []
+
+    calibration = calibrate_from_video(video, BOARD, 25.0, probe_fps=10.0, max_probe_frames=40, max_views=8,
+                                       progress=lambda done, total: ticks.append((done, total)))
+
+    assert calibration["probed_frames"] <= 40 and ticks[-1][0] == len(ticks)
+    assert len(calibration["selected_frames"]) == 8
+    # Poucas vistas da parte parada do vídeo
+    assert sum(1 for f in calibration["selected_frames"] if f < 120) <= 2
+    assert calibration["mtx"][0, 0] == pytest.approx(600.0, rel=0.03)
+    assert calibration["mtx"][0, 2] == pytest.approx(320.0, abs=10)
+
+
+def test_duplicate_views_are_not_selected():
+    def view(shift, scale=1.0):
+        grid = np.mgrid[0:BOARD[0], 0:BOARD[1]].T.reshape(-1, 2).astype(np.float32)
+        return {"image_size": (640, 480), "corners": (grid * 30 * scale + shift).reshape(-1, 1, 2)}
+
+    repeated = [view((100, 100)) for _ in range(10)]
+    distinct = [view((350, 50), 0.8), view((60, 300), 0.6), view((300, 250), 1.2)]
+
+    selected = select_diverse_views(repeated + distinct, BOARD, max_views=4)
+
+    assert sum(1 for v in selected if any(v is r for r in repeated)) == 1
+    assert all(any(v is d for v in selected) for d in distinct)
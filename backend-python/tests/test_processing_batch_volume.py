@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+
+import pytest
+
+trimesh = pytest.importorskip("trimesh")
+
+from src.batch_volume import expand_reconstruction_dirs, json_line_writer, run_volume_batch, write_summary_csv
+
+
+def _reconstruction(root, name, extents=None):
+    dense = root / name / "dense"
+    dense.mkdir(parents=True)
+    if extents is not None:
+        trimesh.creation.box(extents=extents).export(str(dense / "meshed.ply"))
+    return str(root / name)
+
+
+def test_batch_runs_all_folders_and_isolates_failures(tmp_path):
+    folders = [
+        _reconstruction(tmp_path, "caixa_a", (1.0, 2.0, 3.0)),
+        _reconstruction(tmp_path, "caixa_b", (2.0, 2.0, 2.0)),
+        _reconstruction(tmp_path, "vazia"),
+    ]
+    stream = io.StringIO()
+
+    results = run_volume_batch(folders, "fixed", workers=2, fixed_scale=0.1, volume_mode="mesh",
+                               on_result=json_line_writer(stream))
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(lines) == 3
+    by_name = {r["recon_dir"].rsplit("/", 1)[-1]: r for r in results}
+    assert by_name["caixa_a"]["status"] == "ok"
+    assert by_name["caixa_a"]["volume"] == pytest.approx(0.006, rel=1e-3)
+    assert by_name["caixa_b"]["volume"] == pytest.approx(0.008, rel=1e-3)
+    assert by_name["vazia"]["status"] == "erro" and "Nenhuma malha" in by_name["vazia"]["error"]
+
+    csv_path = tmp_path / "resumo.csv"
+    write_summary_csv(results, str(csv_path))
+    with open(csv_path, encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["status"] for row in rows] == ["ok", "ok", "erro"]
+
+
+def test_glob_patterns_expand_to_unique_folders(tmp_path):
+    _reconstruction(tmp_path, "r1")
+    _reconstruction(tmp_path, "r2")
+    (tmp_path / "arquivo.txt").write_text("x")
+
+    folders = expand_reconstruction_dirs([str(tmp_path / "r*"), str(tmp_path / "r1"), str(tmp_path / "*.txt")])
+
+    assert [f.rsplit("/", 1)[-1] for f in folders] == ["r1", "r2"]
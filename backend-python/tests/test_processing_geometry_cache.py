@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+import pytest
+
+o3d = pytest.importorskip("open3d")
+trimesh = pytest.importorskip("trimesh")
+
+from src.geometry_cache import GeometryCache, geometry_cache, load_trimesh, read_point_cloud
+
+
+def _write_cloud(path, n=100, offset=0.0):
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(np.random.default_rng(0).random((n, 3)) + offset)
+    o3d.io.write_point_cloud(str(path), pcd)
+    return str(path)
+
+
+def test_cached_reads_return_independent_copies(tmp_path):
+    geometry_cache().clear()
+    path = _write_cloud(tmp_path / "fused.ply")
+    before = geometry_cache().stats()
+
+    first = read_point_cloud(path)
+    first.scale(10.0, center=(0, 0, 0))
+    second = read_point_cloud(path)
+
+    stats = geometry_cache().stats()
+    assert stats["misses"] - before["misses"] == 1 and stats["hits"] - before["hits"] == 1
+    assert np.asarray(second.points).max() <= 1.0
+
+
+def test_changed_file_is_reloaded(tmp_path):
+    geometry_cache().clear()
+    path = _write_cloud(tmp_path / "fused.ply")
+    assert np.asarray(read_point_cloud(path).points).min() >= 0.0
+
+    _write_cloud(path, offset=5.0)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert np.asarray(read_point_cloud(path).points).min() >= 5.0
+
+
+def test_memory_cap_evicts_least_recently_used(tmp_path):
+    cache = GeometryCache(max_bytes=3000)
+    paths = [_write_cloud(tmp_path / f"{i}.ply", n=50) for i in range(3)]  # 1200 bytes cada
+    loads = []
+
+    def loader(path):
+        loads.append(path)
+        return o3d.io.read_point_cloud(path)
+
+    cache.get(paths[0], "o3d_pcd", loader)
+    cache.get(paths[1], "o3d_pcd", loader)
+    cache.get(paths[0], "o3d_pcd", loader)
+    cache.get(paths[2], "o3d_pcd", loader)  # descarta paths[1], o menos usado
+    cache.get(paths[0], "o3d_pcd", loader)
+    cache.get(paths[1], "o3d_pcd", loader)
+
+    assert loads == [paths[0], paths[1], paths[2], paths[1]]
+    assert cache.stats()["bytes"] <= 3000
+
+
+def test_trimesh_copies_are_independent(tmp_path):
+    path = str(tmp_path / "box.ply")
+    trimesh.creation.box(extents=(1.0, 1.0, 1.0)).export(path)
+
+    mesh = load_trimesh(path)
+    mesh.apply_scale(2.0)
+
+    assert load_trimesh(path).volume == pytest.approx(1.0)
+
+
+def test_missing_file_is_delegated_to_loader_without_caching(tmp_path):
+    cache = GeometryCache(max_bytes=10_000_000)
+    missing = str(tmp_path / "missing.ply")
+
+    assert cache.get(missing, "o3d_pcd", lambda p: o3d.geometry.PointCloud()).is_empty()
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,73 @@
+import numpy as np
+
+from src.height_grid import load_height_grid, reintegrate_height_grid
+from src.processing import _improved_heightmap_volume
+
+
+def _box_grid(tmp_path):
+    # Caixa 1 x 1 x 0.5 m sobre o plano z=0, amostrada por pontos
+    rng = np.random.default_rng(7)
+    xy = rng.uniform(0.0, 1.0, (20000, 2))
+    pts = np.column_stack([xy, np.full(len(xy), 0.5)])
+    volume, meta = _improved_heightmap_volume(
+        pts, pts[:, 2].copy(), np.array([0.0, 0.0, 1.0]), np.zeros(3), grid_size=0.02,
+        gaussian_sigma=1.0, fill_holes=True, return_grid=True,
+    )
+    path = meta.pop("height_grid").save(str(tmp_path), "20250101_120000")
+    return volume, path
+
+
+def test_height_grid_roundtrip_reproduces_volume(tmp_path):
+    volume, path = _box_grid(tmp_path)
+    assert path.endswith("heightgrid_20250101_120000.npy")
+
+    grid = load_height_grid(path)
+    assert isinstance(grid.height, np.memmap)
+    result = reintegrate_height_grid(grid)
+    assert abs(result["volume_m3"] - volume) < 1e-6
+    assert not result["resmoothed"]
+    assert abs(result["max_height_m"] - 0.5) < 1e-3
+
+
+def test_height_grid_threshold_crop_and_smoothing(tmp_path):
+    volume, path = _box_grid(tmp_path)
+    grid = load_height_grid(path)
+
+    # Acima de 0.2 m sobra a camada de 0.3 m
+    above = reintegrate_height_grid(grid, threshold=0.2)
+    assert abs(above["volume_m3"] - volume * 0.6) < volume * 0.01
+
+    # Recorte de um quarto da área (referencial do plano)
+    u0, v0 = grid.min_xy
+    quarter = reintegrate_height_grid(grid, crop=[u0, v0, u0 + 0.5, v0 + 0.5])
+    assert abs(quarter["volume_m3"] - volume / 4) < volume * 0.03
+
+    # Outra suavização é refeita sobre as alturas brutas
+    raw = reintegrate_height_grid(grid, gaussian_sigma=0.0, fill_holes=False)
+    assert raw["resmoothed"]
+    assert abs(raw["volume_m3"] - volume) < volume * 0.05
+
+
+def test_reintegrate_route_only_reads_inside_data_out(tmp_path, monkeypatch):
+    import json
+
+    import app
+
+    data_out = tmp_path / "out"
+    volumes = data_out / "volumes"
+    volumes.mkdir(parents=True)
+    _box_grid(volumes)
+    _, outside_grid = _box_grid(tmp_path / "fora")
+    (volumes / "volume_fora.json").write_text(json.dumps({"height_grid": outside_grid}))
+    monkeypatch.setattr(app, "DATA_OUT", str(data_out))
+    monkeypatch.setattr(app, "_load_config", lambda: {"paths": {"volumes_output": str(volumes)}})
+    client = app.app.test_client()
+
+    ok = client.post("/volumes/reintegrar", json={"grade": "heightgrid_20250101_120000.npy"})
+    assert ok.status_code == 200 and ok.get_json()["resultado"]["volume_m3"] > 0
+
+    for body in ({"grade": outside_grid}, {"grade": "../fora/heightgrid_20250101_120000.npy"},
+                 {"volume": "volume_fora.json"}, {"volume": str(tmp_path / "qualquer.json")}):
+        response = client.post("/volumes/reintegrar", json=body)
+        assert response.status_code == 400, body
+        assert "fora de data/out" in response.get_json()["mensagem"]
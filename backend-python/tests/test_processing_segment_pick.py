@@ -0,0 +1,43 @@
+import numpy as np
+import open3d as o3d
+from scipy.spatial import cKDTree
+
+from src.processing import downsample_for_display, snap_to_full_resolution
+
+
+def _plane_cloud(n=200_000, seed=3):
+    rng = np.random.default_rng(seed)
+    pts = np.column_stack([rng.uniform(0.0, 1.0, (n, 2)), rng.normal(0.0, 1e-4, n)])
+    return o3d.geometry.PointCloud(o3d.utility.Vector3dVector(pts)), pts
+
+
+def test_display_cloud_respects_point_budget():
+    pcd, pts = _plane_cloud()
+    display, voxel = downsample_for_display(pcd, max_points=20_000)
+    assert 0 < len(display.points) <= 20_000
+    assert voxel > 0
+    # Cobertura preservada: a exibição ainda ocupa a cena inteira
+    shown = np.asarray(display.points)
+    assert np.allclose(shown.min(axis=0)[:2], 0.0, atol=voxel)
+    assert np.allclose(shown.max(axis=0)[:2], 1.0, atol=voxel)
+
+    small, voxel_small = downsample_for_display(pcd, max_points=len(pts))
+    assert small is pcd and voxel_small == 0.0
+
+
+def test_pick_snaps_to_full_resolution_point_under_ray():
+    pcd, pts = _plane_cloud()
+    display, voxel = downsample_for_display(pcd, max_points=5_000)
+    tree = cKDTree(pts)
+
+    # Raio vertical sobre um ponto original: o voxel exibido mais próximo leva de volta a ele
+    target = pts[12345]
+    hint = np.asarray(display.points)[np.argmin(np.linalg.norm(np.asarray(display.points) - target, axis=1))]
+    idx, point = snap_to_full_resolution(tree, pts, hint, radius=voxel * 2,
+                                         ray_origin=target + [0.0, 0.0, 5.0], ray_dir=[0.0, 0.0, -1.0])
+    assert idx == 12345 and np.array_equal(point, target)
+
+    # Sem raio: ponto original mais próximo da seleção
+    idx, point = snap_to_full_resolution(tree, pts, hint)
+    assert np.isclose(np.linalg.norm(point - hint), tree.query(hint)[0])
+    assert np.array_equal(point, pts[idx])
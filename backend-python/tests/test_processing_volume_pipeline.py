@@ -0,0 +1,38 @@
+import pytest
+
+trimesh = pytest.importorskip("trimesh")
+
+from src.volume_pipeline import VOLUME_MODES, compute_scaled_volume
+
+
+def _box_reconstruction(root):
+    dense = root / "recon" / "dense"
+    dense.mkdir(parents=True)
+    mesh_path = dense / "meshed.ply"
+    trimesh.creation.box(extents=(1.0, 2.0, 3.0)).export(str(mesh_path))
+    return str(root / "recon"), str(mesh_path)
+
+
+def test_color_first_falls_back_to_mesh_without_colored_cloud(tmp_path):
+    recon_dir, mesh_path = _box_reconstruction(tmp_path)
+
+    result, volume_mesh_path = compute_scaled_volume(
+        mesh_path, recon_dir, scale=0.1, volume_method="auto", primitive_fit=False, color_first=True)
+
+    assert volume_mesh_path == mesh_path
+    assert result["volume"] == pytest.approx(0.006, rel=1e-3)
+
+
+def test_bean_color_errors_are_not_hidden_by_the_mesh(tmp_path):
+    recon_dir, mesh_path = _box_reconstruction(tmp_path)
+    volume_method, primitive_fit = VOLUME_MODES["bean_color"]
+
+    with pytest.raises(ValueError):
+        compute_scaled_volume(mesh_path, recon_dir, scale=0.1, volume_method=volume_method,
+                              primitive_fit=primitive_fit)
+
+
+def test_cancelled_mesh_preparation_returns_no_result(tmp_path):
+    recon_dir, mesh_path = _box_reconstruction(tmp_path)
+
+    assert compute_scaled_volume(mesh_path, recon_dir, scale=0.1, prepare_mesh=lambda path: None) == (None, None)
@@ -0,0 +1,100 @@
+import struct
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from src.dense_cpu import (
+    camera_matrix,
+    compute_pair_points,
+    fuse_point_sets,
+    read_cameras_binary,
+    read_images_binary,
+    select_neighbor_pairs,
+)
+
+
+def _write_cameras_bin(path, cameras):
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(cameras)))
+        for cam_id, (w, h, params) in cameras.items():
+            f.write(struct.pack("<iiQQ", cam_id, 1, w, h))
+            f.write(struct.pack("<4d", *params))
+
+
+def _write_images_bin(path, images):
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(images)))
+        for img_id, (name, point_ids) in images.items():
+            f.write(struct.pack("<idddddddi", img_id, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1))
+            f.write(name.encode("utf-8") + b"\x00")
+            f.write(struct.pack("<Q", len(point_ids)))
+            for i, pid in enumerate(point_ids):
+                f.write(struct.pack("<ddq", float(i), float(i), pid))
+
+
+def test_read_binary_model_and_neighbor_pairs(tmp_path):
+    _write_cameras_bin(tmp_path / "cameras.bin", {1: (640, 480, (500.0, 500.0, 320.0, 240.0))})
+    _write_images_bin(tmp_path / "images.bin", {
+        1: ("a.png", list(range(0, 100))),
+        2: ("b.png", list(range(20, 120)) + [-1]),
+        3: ("c.png", list(range(500, 600))),
+    })
+
+    cameras = read_cameras_binary(str(tmp_path / "cameras.bin"))
+    images = read_images_binary(str(tmp_path / "images.bin"))
+
+    assert cameras[1]["model"] == "PINHOLE"
+    assert camera_matrix(cameras[1])[0, 2] == 320.0
+    assert images[2]["name"] == "b.png"
+    assert len(images[2]["point3D_ids"]) == 100
+    assert select_neighbor_pairs(images, max_neighbors=2) == [(1, 2)]
+
+
+def test_compute_pair_points_recovers_plane(tmp_path):
+    rng = np.random.default_rng(0)
+    texture = (rng.random((60, 80)) * 255).astype(np.uint8)
+    texture = cv2.resize(texture, (640, 480), interpolation=cv2.INTER_NEAREST)
+    texture = cv2.cvtColor(texture, cv2.COLOR_GRAY2BGR)
+
+    k = np.array([[500.0, 0.0, 320.0], [0.0, 500.0, 240.0], [0.0, 0.0, 1.0]])
+    depth = 5.0
+    baseline = 0.3
+    # Plano fronto-paralelo em Z=5: a segunda câmera vê a imagem deslocada de f*B/Z pixels.
+    shift = 500.0 * baseline / depth
+    m = np.float32([[1, 0, -shift], [0, 1, 0]])
+    right = cv2.warpAffine(texture, m, (640, 480), borderMode=cv2.BORDER_REFLECT)
+    cv2.imwrite(str(tmp_path / "left.png"), texture)
+    cv2.imwrite(str(tmp_path / "right.png"), right)
+
+    result = compute_pair_points({
+        "left_path": str(tmp_path / "left.png"),
+        "right_path": str(tmp_path / "right.png"),
+        "k_left": k,
+        "k_right": k,
+        "r_left": np.eye(3),
+        "t_left": np.zeros(3),
+        "r_right": np.eye(3),
+        "t_right": np.array([-baseline, 0.0, 0.0]),
+        "depth_range": None,
+        "max_image_size": 1000,
+        "num_disparities": 64,
+        "block_size": 5,
+        "pixel_step": 4,
+    })
+
+    assert len(result["points"]) > 1000
+    assert abs(float(np.median(result["points"][:, 2])) - depth) < 0.25
+
+
+def test_fuse_point_sets_requires_support():
+    a = {"points": np.array([[0.0, 0.0, 0.0], [5.0, 5.0, 5.0]], np.float32),
+         "colors": np.array([[10, 10, 10], [0, 0, 0]], np.uint8)}
+    b = {"points": np.array([[0.01, 0.0, 0.0]], np.float32),
+         "colors": np.array([[30, 30, 30]], np.uint8)}
+
+    fused, colors = fuse_point_sets([a, b], voxel_size=0.1, min_support=2)
+
+    assert fused.shape == (1, 3)
+    assert colors[0, 0] == 20
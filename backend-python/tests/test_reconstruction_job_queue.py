@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+
+from src.job_queue import JOB_DONE, JOB_QUEUED, JOB_RUNNING, ReconstructionJobQueue, ResourceBudget
+
+HARDWARE = {"cores": 8, "ram_gb": 32.0, "gpu": True, "gpu_memory_mb": 8192}
+
+
+def _frames(tmp_path, name):
+    folder = tmp_path / "frames" / name
+    folder.mkdir(parents=True)
+    return str(folder)
+
+
+def _make_runner(active, peak, lock):
+    def runner(cmd, step_name, log):
+        stage = step_name
+        with lock:
+            active.setdefault(stage, 0)
+            active[stage] += 1
+            peak[stage] = max(peak.get(stage, 0), active[stage])
+        time.sleep(0.05)
+        if isinstance(cmd, str) and " mapper " in cmd:
+            output = cmd.split("--output_path ")[1].split()[0]
+            os.makedirs(os.path.join(output, "0"), exist_ok=True)
+        with lock:
+            active[stage] -= 1
+    return runner
+
+
+def test_budget_limits_gpu_stage_to_one_at_a_time():
+    budget = ResourceBudget(cpu=1.0, ram_gb=32.0, gpu=1.0)
+
+    first = budget.try_acquire({"cpu": 0.25, "ram_gb": 6.0, "gpu": 1.0})
+    assert first is not None
+    assert budget.try_acquire({"cpu": 0.25, "ram_gb": 6.0, "gpu": 1.0}) is None
+    assert budget.try_acquire({"cpu": 0.5, "ram_gb": 2.0, "gpu": 0.0}) is not None
+
+    budget.release(first)
+    assert budget.try_acquire({"cpu": 0.25, "ram_gb": 6.0, "gpu": 1.0}) is not None
+
+
+def test_queue_runs_jobs_concurrently_with_single_patch_match(tmp_path):
+    active, peak, lock = {}, {}, threading.Lock()
+    queue = ReconstructionJobQueue(
+        state_path=str(tmp_path / "queue.json"),
+        colmap_root_dir=str(tmp_path / "recon"),
+        resources_dir=str(tmp_path / "resources"),
+        overrides={"dense_backend": "colmap", "use_gpu": 1},
+        max_jobs=3,
+        hardware=HARDWARE,
+        runner=_make_runner(active, peak, lock),
+    )
+    jobs = [queue.submit(_frames(tmp_path, f"lote_{i}")) for i in range(3)]
+
+    queue.start()
+    assert queue.wait_idle(timeout=30)
+    queue.stop()
+
+    assert all(queue.get(job["id"])["status"] == JOB_DONE for job in jobs)
+    assert peak["Patch Match Stereo"] == 1
+    assert peak["Extração de Features"] >= 2
+
+
+def test_queue_state_survives_restart_and_resumes_step(tmp_path):
+    state_path = str(tmp_path / "queue.json")
+    kwargs = dict(
+        state_path=state_path,
+        colmap_root_dir=str(tmp_path / "recon"),
+        resources_dir=str(tmp_path / "resources"),
+        overrides={"dense_backend": "colmap", "use_gpu": 1},
+        max_jobs=1,
+        hardware=HARDWARE,
+    )
+    queue = ReconstructionJobQueue(**kwargs)
+    job = queue.submit(_frames(tmp_path, "lote"))
+    # Simula um backend encerrado durante a etapa de matching
+    queue._update(job["id"], status=JOB_RUNNING, step=2)
+
+    ran = []
+    restarted = ReconstructionJobQueue(**kwargs, runner=lambda cmd, name, log: (
+        ran.append(name), _make_runner({}, {}, threading.Lock())(cmd, name, log)))
+    assert restarted.get(job["id"])["status"] == JOB_QUEUED
+
+    restarted.start()
+    assert restarted.wait_idle(timeout=30)
+    restarted.stop()
+
+    assert restarted.get(job["id"])["status"] == JOB_DONE
+    assert ran[0] == "Reconstrução Esparsa"
+    assert "Extração de Features" not in ran
+
+
+def test_backend_start_resumes_persisted_jobs_without_submit(tmp_path, monkeypatch):
+    import app
+    import src.job_queue as job_queue
+    import src.results_index as results_index
+
+    kwargs = dict(
+        state_path=str(tmp_path / "queue.json"),
+        colmap_root_dir=str(tmp_path / "recon"),
+        resources_dir=str(tmp_path / "resources"),
+        overrides={"dense_backend": "colmap", "use_gpu": 1},
+        max_jobs=1,
+        hardware=HARDWARE,
+    )
+    before_restart = ReconstructionJobQueue(**kwargs)
+    pending = [before_restart.submit(_frames(tmp_path, f"lote_{i}")) for i in range(2)]
+    before_restart._update(pending[0]["id"], status=JOB_RUNNING, step=1)  # interrompido no reinício
+
+    runner = _make_runner({}, {}, threading.Lock())
+    monkeypatch.setattr(job_queue, "create_job_queue_from_config",
+                        lambda cfg, base_dir: ReconstructionJobQueue(**kwargs, runner=runner))
+    monkeypatch.setattr(app, "_load_config",
+                        lambda: {"paths": {"results_index": str(tmp_path / "index.sqlite")}})
+    monkeypatch.setattr(app, "_get_worker_pool", lambda: None)
+    monkeypatch.setattr(app, "_JOB_QUEUE", None)
+    monkeypatch.setattr(results_index, "_INDEX", None)
+
+    app._start_background_services()  # nenhuma chamada a /reconstrucoes
+    deadline = time.time() + 10
+    while app._JOB_QUEUE is None and time.time() < deadline:
+        time.sleep(0.02)
+    queue = app._JOB_QUEUE
+    try:
+        assert queue is not None and queue.wait_idle(timeout=30)
+        assert all(queue.get(job["id"])["status"] == JOB_DONE for job in pending)
+    finally:
+        queue.stop()
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+trimesh = pytest.importorskip("trimesh")
+
+from src.mesh_export import export_in_background, export_mesh, get_export
+
+
+def _write_box(path):
+    trimesh.creation.box(extents=(1.0, 2.0, 3.0)).export(str(path))
+
+
+def test_export_formats_and_mtime_cache(tmp_path):
+    mesh_path = tmp_path / "meshed.ply"
+    _write_box(mesh_path)
+
+    stl = export_mesh(str(mesh_path), "stl")
+    glb = export_mesh(str(mesh_path), "glb")
+
+    assert stl.endswith("meshed.stl") and glb.endswith("meshed.glb")
+    with open(stl, "rb") as f:
+        assert not f.read(5).startswith(b"solid")  # STL binário
+    assert abs(trimesh.load(glb, force="mesh").volume - 6.0) < 1e-6
+
+    mtime = os.path.getmtime(stl)
+    assert export_mesh(str(mesh_path), "stl") == stl
+    assert os.path.getmtime(stl) == mtime
+
+
+def test_point_cloud_is_not_exported(tmp_path):
+    cloud_path = tmp_path / "fused.ply"
+    trimesh.PointCloud([[0, 0, 0], [1, 0, 0], [0, 1, 0]]).export(str(cloud_path))
+
+    with pytest.raises(ValueError):
+        export_mesh(str(cloud_path), "obj")
+    assert not (tmp_path / "fused.obj").exists()
+
+
+def test_background_export_and_on_demand_get(tmp_path):
+    mesh_path = tmp_path / "meshed.ply"
+    _write_box(mesh_path)
+
+    futures = export_in_background(str(mesh_path), ["obj"])
+    assert futures["obj"].result(timeout=30).endswith("meshed.obj")
+    assert get_export(str(mesh_path), "glb", timeout=30).endswith("meshed.glb")
+    with pytest.raises(ValueError):
+        get_export(str(mesh_path), "fbx")
@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+import pytest
+
+o3d = pytest.importorskip("open3d")
+
+from src.mesh_preview import build_preview, find_view_geometry, preview_in_background
+
+
+def _write_sphere(path, resolution=60):
+    mesh = o3d.geometry.TriangleMesh.create_sphere(radius=1.0, resolution=resolution)
+    o3d.io.write_triangle_mesh(str(path), mesh)
+    return len(mesh.triangles)
+
+
+def test_mesh_preview_decimated_and_cached(tmp_path):
+    dense = tmp_path / "recon" / "dense"
+    dense.mkdir(parents=True)
+    source = dense / "meshed.ply"
+    triangles = _write_sphere(source)
+    assert find_view_geometry(str(tmp_path / "recon")) == str(source)
+
+    preview = build_preview(str(source), max_triangles=triangles // 10)
+    assert preview.endswith("meshed_preview.ply")
+    assert 0 < len(o3d.io.read_triangle_mesh(preview).triangles) <= triangles // 10
+
+    # Em cache: não é refeita enquanto o original não muda
+    mtime = os.path.getmtime(preview)
+    assert preview_in_background(str(source), max_triangles=triangles // 10).result(timeout=30) == preview
+    assert os.path.getmtime(preview) == mtime
+
+    # Original dentro do orçamento: exibido como está, sem prévia
+    assert build_preview(str(source), max_triangles=triangles) == preview  # cache ainda vale
+    os.remove(preview)
+    assert build_preview(str(source), max_triangles=triangles) == str(source)
+
+
+def test_point_cloud_preview_downsampled(tmp_path):
+    source = tmp_path / "fused.ply"
+    cloud = o3d.geometry.PointCloud(o3d.utility.Vector3dVector(np.random.default_rng(0).random((5000, 3))))
+    o3d.io.write_point_cloud(str(source), cloud)
+
+    preview = preview_in_background(str(source), max_points=1000).result(timeout=30)
+    assert preview.endswith("fused_preview.ply")
+    assert 0 < len(o3d.io.read_point_cloud(preview).points) <= 1000
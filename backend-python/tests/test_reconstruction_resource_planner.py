@@ -0,0 +1,124 @@
+from src.resource_planner import format_plan, inspect_images, plan_colmap_resources
+
+
+def test_plan_without_gpu_uses_cpu_dense_and_limits_image_size():
+    hardware = {"cores": 8, "ram_gb": 6.0, "gpu": False, "gpu_memory_mb": None}
+    images = {"count": 40, "width": 1920, "height": 1080}
+
+    plan = plan_colmap_resources(hardware=hardware, images=images)
+
+    assert plan["threads"] == 7
+    assert plan["use_gpu"] == 0
+    assert plan["dense_backend"] == "cpu"
+    # Limitado pela resolução de origem (1920) antes do teto de RAM (2000)
+    assert plan["max_image_size"] == 1920
+    assert 1 <= plan["feature_threads"] <= plan["threads"]
+    assert plan["cpu_dense_workers"] <= plan["threads"]
+    assert len(format_plan(plan)) == 5
+
+
+def test_plan_with_small_gpu_caps_image_size():
+    hardware = {"cores": 16, "ram_gb": 32.0, "gpu": True, "gpu_memory_mb": 4000}
+    images = {"count": 100, "width": 4000, "height": 3000}
+
+    plan = plan_colmap_resources(hardware=hardware, images=images)
+
+    assert plan["use_gpu"] == 1
+    assert plan["dense_backend"] == "colmap"
+    assert plan["max_image_size"] == 2000
+    assert plan["feature_threads"] == plan["threads"] == 15
+
+
+def test_overrides_take_priority_over_plan():
+    hardware = {"cores": 4, "ram_gb": 16.0, "gpu": True, "gpu_memory_mb": 12000}
+    images = {"count": 10, "width": 3000, "height": 2000}
+
+    plan = plan_colmap_resources(
+        hardware=hardware,
+        images=images,
+        overrides={"threads": 2, "max_image_size": 1000, "dense_backend": "auto", "fusion_cache_size": 3},
+    )
+
+    assert plan["threads"] == 2
+    assert plan["matcher_threads"] == 2
+    assert plan["max_image_size"] == 1000
+    assert plan["patch_match_window_radius"] == 4
+    assert plan["dense_backend"] == "colmap"
+    assert plan["fusion_cache_size"] == 3
+
+
+def test_inspect_images_reads_count_and_size(tmp_path):
+    from PIL import Image
+
+    for i in range(3):
+        Image.new("RGB", (64, 48)).save(tmp_path / f"frame_{i:03d}.png")
+    (tmp_path / "notes.txt").write_text("x")
+
+    info = inspect_images(str(tmp_path))
+
+    assert info == {"count": 3, "width": 64, "height": 48}
+
+
+def test_tuned_ini_values_win_over_plan(monkeypatch):
+    from src import reconstruction
+
+    monkeypatch.setattr(reconstruction, "_colmap_has_option", lambda tool, name: True)
+    hardware = {"cores": 4, "ram_gb": 16.0, "gpu": True, "gpu_memory_mb": 12000}
+    images = {"count": 10, "width": 1600, "height": 1200}
+    plan = plan_colmap_resources(hardware=hardware, images=images, overrides={"fusion_cache_size": 3})
+    ini = {"PatchMatchStereo.window_radius": "8", "PatchMatchStereo.cache_size": "-1",
+           "StereoFusion.cache_size": "64", "PatchMatchStereo.num_iterations": "9"}
+    forced = reconstruction._plan_forced_keys(plan)
+
+    planned, ini_args = reconstruction._planned_args(
+        "patch_match_stereo", reconstruction._patch_match_opts(plan), ini, set(), forced)
+    # .ini ajustado prevalece; -1 é preenchido pelo plano; os demais valores do .ini seguem como estão
+    assert "--PatchMatchStereo.window_radius 8" in planned
+    assert f"--PatchMatchStereo.cache_size {plan['patch_match_cache_size']}" in planned
+    assert "window_radius" not in ini_args and "--PatchMatchStereo.num_iterations 9" in ini_args
+
+    planned, _ = reconstruction._planned_args(
+        "stereo_fusion", reconstruction._stereo_fusion_opts(plan), ini, set(), forced)
+    assert "--StereoFusion.cache_size 3" in planned  # config.yaml prevalece sobre o .ini
+
+    cpu_plan = plan_colmap_resources(hardware={**hardware, "gpu": False}, images=images)
+    planned, _ = reconstruction._planned_args(
+        "feature_extractor", reconstruction._feature_extractor_opts(cpu_plan),
+        {"SiftExtraction.use_gpu": "yes"}, set(), reconstruction._plan_forced_keys(cpu_plan))
+    assert "use_gpu 0" in planned  # sem GPU o .ini não liga a GPU
+
+
+def test_shipped_ini_leaves_hardware_keys_to_the_plan(monkeypatch):
+    import os
+
+    from src import reconstruction
+
+    monkeypatch.setattr(reconstruction, "_colmap_has_option", lambda tool, name: True)
+    resources = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources")
+    ini = reconstruction._load_colmap_ini(os.path.join(resources, "feature_extractor.ini"))
+    hardware = {"cores": 4, "ram_gb": 4.0, "gpu": False, "gpu_memory_mb": None}
+    plan = plan_colmap_resources(hardware=hardware, images={"count": 30, "width": 4000, "height": 3000})
+    assert plan["max_image_size"] < 4000
+
+    planned, ini_args = reconstruction._planned_args(
+        "feature_extractor", reconstruction._feature_extractor_opts(plan), ini, set(),
+        reconstruction._plan_forced_keys(plan))
+
+    assert f"--FeatureExtraction.max_image_size {plan['max_image_size']}" in planned
+    assert f"--FeatureExtraction.num_threads {plan['feature_threads']}" in planned
+    assert "max_image_size" not in ini_args and "--SiftExtraction.max_num_features 15000" in ini_args
+
+
+def test_config_threads_override_forces_stage_threads(monkeypatch):
+    from src import reconstruction
+
+    monkeypatch.setattr(reconstruction, "_colmap_has_option", lambda tool, name: True)
+    hardware = {"cores": 16, "ram_gb": 64.0, "gpu": True, "gpu_memory_mb": 12000}
+    plan = plan_colmap_resources(hardware=hardware, images={"count": 10, "width": 1600, "height": 1200},
+                                 overrides={"threads": 2})
+    forced = reconstruction._plan_forced_keys(plan)
+
+    assert {"threads", "feature_threads", "matcher_threads", "mapper_threads", "fusion_threads"} <= forced
+    planned, _ = reconstruction._planned_args(
+        "mapper", reconstruction._mapper_opts(plan), {"Mapper.num_threads": "12"}, set(), forced)
+    assert planned == "--Mapper.num_threads 2"
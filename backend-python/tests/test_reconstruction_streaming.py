@@ -0,0 +1,85 @@
+import sqlite3
+
+from src.reconstruction import StreamingFeatureExtractor, build_reconstruction_steps
+
+
+def _fake_colmap(calls):
+    def runner(cmd, step_name, log):
+        calls.append(cmd)
+        database = cmd.split("--database_path ")[1].split()[0]
+        with sqlite3.connect(database) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cameras (camera_id INTEGER PRIMARY KEY)")
+            conn.execute("INSERT OR IGNORE INTO cameras VALUES (1)")
+    return runner
+
+
+def test_streaming_extractor_batches_frames_and_reuses_camera(tmp_path):
+    resources = tmp_path / "resources"
+    resources.mkdir()
+    (resources / "feature_extractor.ini").write_text("ImageReader.single_camera=1\nImageReader.existing_camera_id=-1\n")
+    frames = tmp_path / "frames"
+    frames.mkdir()
+    project = tmp_path / "proj"
+    project.mkdir()
+
+    calls = []
+    streamer = StreamingFeatureExtractor(
+        str(project), str(resources),
+        overrides={"use_gpu": 0}, batch_size=3, runner=_fake_colmap(calls),
+    )
+    for i in range(7):
+        path = frames / f"proj_{i:03d}.png"
+        path.write_bytes(b"")
+        streamer.add(str(path))
+    assert streamer.close() == 7
+
+    listed = []
+    for list_file in sorted((project / "image_lists").iterdir()):
+        listed += list_file.read_text().split()
+    assert listed == [f"proj_{i:03d}.png" for i in range(7)]
+    assert all("--image_list_path" in cmd for cmd in calls)
+    assert "existing_camera_id" not in calls[0]
+    assert all("--ImageReader.existing_camera_id 1" in cmd for cmd in calls[1:])
+
+
+def test_build_steps_can_skip_feature_extraction(tmp_path):
+    plan = {
+        "dense_backend": "colmap", "use_gpu": 1, "feature_threads": 2, "matcher_threads": 2,
+        "mapper_threads": 2, "fusion_threads": 2, "gpu_index": "0", "max_image_size": 2000,
+        "patch_match_window_radius": 5, "patch_match_cache_size": 8, "fusion_cache_size": 8,
+        "cpu_dense_workers": 2,
+    }
+
+    steps = build_reconstruction_steps("frames", str(tmp_path), "", plan, features_done=True)
+
+    stages = [stage for _, _, stage in steps]
+    assert stages[:3] == ["matching", "mapping", "undistort"]
+    assert "features" not in stages
+
+
+def test_streaming_plan_uses_expected_frame_total(tmp_path):
+    from src.acquisition import FRAME_MANIFEST_VERSION, FrameManifest
+
+    resources = tmp_path / "resources"
+    resources.mkdir()
+    frames = tmp_path / "frames"
+    frames.mkdir()
+    project = tmp_path / "proj"
+    project.mkdir()
+    # Extração em andamento: 300 frames no vídeo, 1 a cada 3 gravado
+    header = {"version": FRAME_MANIFEST_VERSION, "total_frames": 300, "rate": 3, "sampling": "fixed",
+              "width": 640, "height": 480}
+    manifest = FrameManifest(str(frames), header)
+
+    streamer = StreamingFeatureExtractor(str(project), str(resources), overrides={"use_gpu": 0},
+                                         batch_size=3, runner=_fake_colmap([]))
+    for i in range(3):
+        path = frames / f"proj_{i:03d}.png"
+        path.write_bytes(b"")
+        manifest.append({"frame_index": i * 3, "file": path.name})
+        streamer.add(str(path))
+    streamer.close()
+    manifest.close()
+
+    assert streamer.plan["images"]["count"] == 100
+    assert (streamer.plan["images"]["width"], streamer.plan["images"]["height"]) == (640, 480)
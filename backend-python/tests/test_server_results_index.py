@@ -0,0 +1,92 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.results_index import ResultsIndex
+
+
+def _volume(folder, stamp, volume_m3, method, scale_source="aruco"):
+    path = folder / f"volume_{stamp}.json"
+    path.write_text(json.dumps({
+        "mesh_path": "/recon/dense/meshed.ply",
+        "scale_source": scale_source,
+        "summary": {"volume_m3": volume_m3, "volume_liters": volume_m3 * 1000, "method": method, "scale": 0.01},
+    }))
+    return path
+
+
+@pytest.fixture
+def outputs(tmp_path):
+    volumes = tmp_path / "volumes"
+    volumes.mkdir()
+    _volume(volumes, "20250101_100000", 0.002, "heightmap")
+    _volume(volumes, "20250102_100000", 0.005, "mesh", scale_source="a4")
+    _volume(volumes, "20250103_100000", 0.001, "heightmap")
+
+    calibrations = tmp_path / "calibrations"
+    calibrations.mkdir()
+    np.savez(calibrations / "camera.npz", mtx=np.eye(3))
+    (calibrations / "camera_report.json").write_text(json.dumps({"rms": 0.31, "used_views": ["a", "b", "c"]}))
+
+    frames = tmp_path / "frames" / "video1"
+    frames.mkdir(parents=True)
+    manifest = [{"version": 1, "video": "/videos/v.mp4", "sampling": "fixed", "width": 64, "height": 48}]
+    manifest += [{"file": f"frame_{i:05d}.png", "frame_index": i} for i in range(4)]
+    (frames / "frames_manifest.jsonl").write_text("\n".join(json.dumps(r) for r in manifest) + "\n")
+
+    recon = tmp_path / "reconstructions" / "proj1" / "dense"
+    recon.mkdir(parents=True)
+    (recon / "meshed.ply").write_text("ply")
+    return {
+        "volume": str(volumes),
+        "calibration": str(calibrations),
+        "frames": str(tmp_path / "frames"),
+        "reconstruction": str(tmp_path / "reconstructions"),
+    }
+
+
+def test_import_indexes_every_kind_with_metrics(tmp_path, outputs):
+    index = ResultsIndex(str(tmp_path / "index.sqlite"))
+
+    counts = index.import_folders(outputs)
+
+    assert {kind: c["added"] for kind, c in counts.items()} == {
+        "volume": 3, "calibration": 1, "frames": 1, "reconstruction": 1}
+    calibration = index.query(kind="calibration")["items"][0]
+    assert calibration["rms"] == pytest.approx(0.31) and calibration["views"] == 3
+    frames = index.query(kind="frames")["items"][0]
+    assert frames["frames"] == 4 and frames["source"] == "/videos/v.mp4"
+    assert index.query(kind="reconstruction")["items"][0]["status"] == "complete"
+
+
+def test_query_filters_sorts_and_paginates(tmp_path, outputs):
+    index = ResultsIndex(str(tmp_path / "index.sqlite"))
+    index.import_folders(outputs)
+
+    newest_first = index.query(kind="volume")
+    assert [i["name"] for i in newest_first["items"]][0] == "volume_20250103_100000.json"
+
+    page = index.query(kind="volume", sort="volume_m3", order="desc", page=2, page_size=2)
+    assert page["total"] == 3 and page["pages"] == 2
+    assert [i["volume_m3"] for i in page["items"]] == [0.001]
+
+    heightmap = index.query(kind="volume", method="heightmap", volume_min=0.0015)
+    assert [i["volume_m3"] for i in heightmap["items"]] == [0.002]
+    assert index.query(kind="volume", scale_source="a4")["items"][0]["data"]["summary"]["method"] == "mesh"
+
+    with pytest.raises(ValueError):
+        index.query(sort="path; DROP TABLE results")
+
+
+def test_reimport_skips_unchanged_and_prunes_deleted(tmp_path, outputs):
+    index = ResultsIndex(str(tmp_path / "index.sqlite"))
+    index.import_folders(outputs)
+    os.remove(os.path.join(outputs["volume"], "volume_20250101_100000.json"))
+
+    counts = index.import_folders({"volume": outputs["volume"]})
+
+    assert counts["volume"] == {"added": 0, "updated": 0, "unchanged": 2, "removed": 1, "errors": 0}
+    assert index.query(kind="volume")["total"] == 2
+    assert not index.ensure_imported("volume", outputs["volume"])
@@ -0,0 +1,23 @@
+import json
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("open3d", "trimesh", "scipy", "cv2")
+
+
+def _loaded_heavy_modules(code):
+    probe = f"{code}\nimport json, sys\nprint(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    proc = subprocess.run([sys.executable, "-c", probe], cwd=REPO_DIR, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def test_importing_services_does_not_load_heavy_libraries():
+    assert _loaded_heavy_modules("import services") == []
+
+
+def test_flask_app_answers_without_heavy_libraries():
+    code = "import app\nassert app.app.test_client().get('/tarefas').status_code == 200"
+    assert _loaded_heavy_modules(code) == []
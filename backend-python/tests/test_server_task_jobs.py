@@ -0,0 +1,98 @@
+import os
+import sys
+import textwrap
+import time
+
+import pytest
+
+from src.task_jobs import JOB_CANCELLED, JOB_DONE, JOB_FAILED, JOB_RUNNING, TaskJobManager
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _python(code):
+    return [sys.executable, "-c", textwrap.dedent(code)]
+
+
+def _wait(manager, job_id, states, timeout=20.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job["status"] in states:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job não chegou a {states}: {manager.get(job_id)}")
+
+
+def test_job_reports_stages_progress_and_result():
+    manager = TaskJobManager(cwd=REPO_DIR)
+    job = manager.submit("reconstruction", _python("""
+        import json
+        from src.task_jobs import report_progress
+        report_progress(stage="features", step=1, steps=2)
+        report_progress(current=5, total=10)
+        report_progress(message="linha do colmap")
+        report_progress(stage="matching", step=2, steps=2)
+        report_progress(current=10, total=10)
+        print("banner do modulo")
+        print(json.dumps({"status": "ok", "task": "reconstruction"}))
+    """))
+
+    snapshot = _wait(manager, job.id, (JOB_DONE, JOB_FAILED))
+    assert snapshot["status"] == JOB_DONE, snapshot
+    assert snapshot["result"] == {"status": "ok", "task": "reconstruction"}
+    assert [(s["name"], s["status"]) for s in snapshot["stages"]] == [("features", "done"), ("matching", "done")]
+    assert snapshot["stages"][0]["progress"] == 0.5
+    assert snapshot["progress"] == 1.0
+    assert "linha do colmap" in snapshot["log"]
+
+    events = list(manager.iter_events(job.id))
+    kinds = [e["event"] for e in events]
+    assert kinds[0] == "status" and kinds[-1] == "status"
+    assert {"stage", "progress", "log"} <= set(kinds)
+    assert [e["data"]["progress"] for e in events if e["event"] == "progress"][1] == 0.25
+    assert list(manager.iter_events(job.id, after=events[-2]["id"])) == events[-1:]
+
+
+def test_failed_job_keeps_last_message():
+    manager = TaskJobManager()
+    job = manager.submit("volume", _python("""
+        import sys
+        print("Operação cancelada.", file=sys.stderr)
+        sys.exit(2)
+    """))
+
+    snapshot = _wait(manager, job.id, (JOB_DONE, JOB_FAILED))
+    assert snapshot["status"] == JOB_FAILED
+    assert snapshot["error"] == "Operação cancelada." and snapshot["returncode"] == 2
+
+
+@pytest.mark.skipif(os.name == "nt", reason="grupo de processos POSIX")
+def test_cancel_kills_the_whole_process_group(tmp_path):
+    pid_file = tmp_path / "filho.pid"
+    manager = TaskJobManager()
+    job = manager.submit("reconstruction", _python(f"""
+        import subprocess, time
+        child = subprocess.Popen("sleep 60", shell=True)
+        open({str(pid_file)!r}, "w").write(str(child.pid))
+        time.sleep(60)
+    """))
+    _wait(manager, job.id, (JOB_RUNNING,))
+    deadline = time.time() + 10
+    while not (pid_file.exists() and pid_file.read_text()) and time.time() < deadline:
+        time.sleep(0.05)
+    child_pid = int(pid_file.read_text())
+
+    manager.cancel(job.id, grace_s=2.0)
+
+    snapshot = _wait(manager, job.id, (JOB_CANCELLED, JOB_FAILED, JOB_DONE))
+    assert snapshot["status"] == JOB_CANCELLED
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        try:
+            os.kill(child_pid, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("subprocesso do job continua vivo após o cancelamento")
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from src.worker_pool import WorkerPool, WorkerPoolUnavailableError, WorkerTaskError, create_worker_pool_from_config
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(size=1, max_jobs=10, preload=("json",)).start()
+    yield pool
+    pool.shutdown()
+
+
+def test_worker_is_reused_and_recycled_after_max_jobs():
+    pool = WorkerPool(size=1, max_jobs=3, preload=()).start()
+    try:
+        pids = [pool.run("os:getpid") for _ in range(4)]
+        stats = pool.stats()
+    finally:
+        pool.shutdown()
+
+    assert pids[0] == pids[1] == pids[2]
+    assert pids[3] != pids[0]
+    assert stats["jobs"] == 4 and stats["recycled"] == 1
+
+
+def test_job_errors_are_reported_without_losing_the_worker(pool):
+    pid = pool.run("os:getpid")
+
+    with pytest.raises(WorkerTaskError, match="math domain error"):
+        pool.run("math:sqrt", -1)
+
+    assert pool.run("math:sqrt", 16) == 4.0
+    assert pool.run("os:getpid") == pid
+
+
+def test_crashed_worker_is_replaced(pool):
+    with pytest.raises(WorkerTaskError, match="encerrado"):
+        pool.run("os:_exit", 3)
+
+    assert pool.run("math:sqrt", 9) == 3.0
+    assert pool.stats()["crashed"] == 1
+
+
+def test_subprocess_mode_disables_the_pool():
+    cfg = {"parameters": {"server": {"task_mode": "subprocess"}}}
+    assert create_worker_pool_from_config(cfg, ".") is None
+
+
+def test_busy_pool_times_out_instead_of_blocking():
+    pool = WorkerPool(size=1, preload=(), acquire_timeout=0.2).start()
+    try:
+        pool._acquire()  # único processo ocupado
+        with pytest.raises(WorkerPoolUnavailableError, match="livre"):
+            pool.run("os:getpid")
+    finally:
+        pool.shutdown()
+
+
+def test_failed_respawn_is_reported_and_run_gives_up(monkeypatch):
+    pool = WorkerPool(size=1, max_jobs=1, preload=(), respawn_attempts=2).start()
+    try:
+        def _fail():
+            raise RuntimeError("sem memória")
+
+        monkeypatch.setattr(pool, "_spawn", _fail)
+        monkeypatch.setattr("src.worker_pool.time.sleep", lambda s: None)
+        pool.run("os:getpid")  # max_jobs=1: o processo é reciclado e a reposição falha
+
+        with pytest.raises(WorkerPoolUnavailableError, match="sem memória"):
+            pool.run("os:getpid")
+        stats = pool.stats()
+    finally:
+        pool.shutdown()
+
+    assert stats["workers"] == [] and stats["respawn_failures"] == 1
+
+
+def test_unavailable_pool_falls_back_to_subprocess(monkeypatch):
+    import app
+
+    class _UnavailablePool:
+        def run(self, target, *args):
+            raise WorkerPoolUnavailableError("Nenhum processo de trabalho livre em 60 s.")
+
+    monkeypatch.setattr(app, "_get_worker_pool", lambda: _UnavailablePool())
+    monkeypatch.setattr(app, "_run_task_subprocess", lambda script, *args: ({"script": script, "args": args}, None))
+
+    result, error = app._run_task("reconstruction")
+
+    assert error is None
+    assert result["script"].endswith("task_runner.py") and result["args"] == ("--task", "reconstruction")
+
+
+def test_only_pool_workers_schedule_background_previews():
+    from src.mesh_preview import background_previews_enabled
+    from src.worker_pool import DEFAULT_INITIALIZER
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    pool = WorkerPool(size=1, preload=(), sys_path=(base_dir,), initializer=DEFAULT_INITIALIZER).start()
+    try:
+        assert pool.run("src.mesh_preview:background_previews_enabled") is True
+    finally:
+        pool.shutdown()
+    # Processo de uma tarefa só (task_runner, main.py): a prévia fica para o histórico
+    assert background_previews_enabled() is False
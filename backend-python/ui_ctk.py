@@ -2,12 +2,13 @@ import os
 import shutil
 import subprocess
 import sys
+import threading
 import tkinter as tk
 import tkinter.font as tkfont
+from concurrent.futures import Future
 from tkinter import messagebox
 
 import customtkinter as ctk
-import open3d as o3d
 
 from services import (
     load_config,
@@ -15,6 +16,8 @@ from services import (
     run_reconstruction_module,
     run_volume_module,
 )
+from src.mesh_preview import enable_background_previews, find_view_geometry, preview_in_background, preview_options
+from src.results_index import results_index
 
 
 BG = "#F8F9FA"
@@ -150,7 +153,7 @@ class StepCard(ctk.CTkFrame):
 
 
 class HistoryPanel(ctk.CTkFrame):
-    def __init__(self, master, title, subtitle, path, mode="dir"):
+    def __init__(self, master, title, subtitle, path, mode="dir", preview_opts=None):
         super().__init__(
             master,
             fg_color=CARD_BG,
@@ -160,9 +163,11 @@ class HistoryPanel(ctk.CTkFrame):
         )
         self.path = path
         self.mode = mode
+        self.preview_opts = preview_opts or {}
         os.makedirs(self.path, exist_ok=True)
 
         self.items = []
+        self.details = {}
 
         header = ctk.CTkLabel(
             self,
@@ -211,6 +216,7 @@ class HistoryPanel(ctk.CTkFrame):
         ]
         if self.mode == "reconstructions":
             buttons.append(("Ver 3D", self.open_mesh_view))
+            buttons.append(("3D completo", self.open_full_mesh_view))
         buttons.append(("Excluir", self.delete_selected))
 
         for idx, (label, cmd) in enumerate(buttons):
@@ -224,22 +230,23 @@ class HistoryPanel(ctk.CTkFrame):
 
     def refresh(self):
         self.items = []
+        self.details = {}
         self.listbox.delete(0, "end")
-        try:
-            entries = os.listdir(self.path)
-        except Exception:
-            entries = []
 
         if self.mode == "volumes":
-            files = [
-                f for f in entries
-                if f.lower().endswith(".json") and os.path.isfile(os.path.join(self.path, f))
-            ]
-            files.sort(key=lambda f: os.path.getmtime(os.path.join(self.path, f)), reverse=True)
-            for f in files:
-                self.items.append(os.path.join(self.path, f))
-                self.listbox.insert("end", f)
+            # Índice SQLite: mais recentes primeiro, com o resumo já gravado (sem abrir cada JSON).
+            # Execuções anteriores ao índice são importadas no primeiro uso.
+            index = results_index()
+            index.ensure_imported("volume", self.path)
+            for item in index.query(kind="volume", folder=self.path, page_size=1000)["items"]:
+                self.items.append(item["path"])
+                self.details[item["path"]] = item["data"].get("summary", {})
+                self.listbox.insert("end", item["name"])
         else:
+            try:
+                entries = os.listdir(self.path)
+            except Exception:
+                entries = []
             dirs = [
                 d for d in entries
                 if os.path.isdir(os.path.join(self.path, d))
@@ -263,10 +270,7 @@ class HistoryPanel(ctk.CTkFrame):
             return
         if self.mode == "volumes":
             try:
-                import json
-                with open(path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                summary = data.get("summary", {})
+                summary = self.details.get(path, {})
                 text = (
                     f"Volume: {summary.get('volume_m3', 0):.6f} m³\n"
                     f"Litros: {summary.get('volume_liters', 0):.2f} L\n"
@@ -277,6 +281,11 @@ class HistoryPanel(ctk.CTkFrame):
                 text = os.path.basename(path)
         else:
             text = os.path.basename(path)
+            if self.mode == "reconstructions":
+                # Prévia gerada em segundo plano ao selecionar: "Ver 3D" abre na hora
+                source = find_view_geometry(path)
+                if source:
+                    preview_in_background(source, **self.preview_opts)
         self.detail.configure(text=text)
 
     def open_selected(self):
@@ -294,39 +303,74 @@ class HistoryPanel(ctk.CTkFrame):
     def open_folder(self):
         _open_path(self.path)
 
-    def open_mesh_view(self):
+    def _selected_view_geometry(self):
         if self.mode != "reconstructions":
-            return
+            return None, None
         path = self._selected_path()
         if not path:
             messagebox.showerror("Seleção inválida", "Selecione uma reconstrução.", parent=self)
-            return
-        dense_dir = os.path.join(path, "dense")
-        candidates = [
-            os.path.join(dense_dir, "meshed.ply"),
-            os.path.join(dense_dir, "mesh_poisson.ply"),
-            os.path.join(dense_dir, "fused.ply"),
-        ]
-        mesh_path = next((p for p in candidates if os.path.exists(p)), None)
-        if not mesh_path:
+            return None, None
+        source = find_view_geometry(path)
+        if not source:
             messagebox.showerror(
                 "Malha não encontrada",
                 "Não foi possível localizar meshed.ply, mesh_poisson.ply ou fused.ply.",
                 parent=self,
             )
+            return None, None
+        return path, source
+
+    def _when_done(self, future, callback, message):
+        # Espera o Future sem travar a interface (consulta periódica pelo laço do Tk)
+        if not future.done():
+            self.detail.configure(text=message)
+            self.after(150, self._when_done, future, callback, message)
             return
+        self.update_detail()
         try:
-            o3d.utility.set_verbosity_level(o3d.utility.VerbosityLevel.Error)
-            geom = o3d.io.read_triangle_mesh(mesh_path)
-            if geom.is_empty() or len(geom.triangles) == 0:
-                geom = o3d.io.read_point_cloud(mesh_path)
-            if geom.is_empty():
-                raise ValueError("Arquivo vazio.")
-            if isinstance(geom, o3d.geometry.TriangleMesh):
-                geom.compute_vertex_normals()
-            o3d.visualization.draw_geometries([geom], window_name=os.path.basename(path))
+            result = future.result()
         except Exception as exc:
             messagebox.showerror("Erro ao abrir 3D", str(exc), parent=self)
+            return
+        callback(result)
+
+    def _show_geometry(self, geometry_path, title):
+        # Leitura do .ply em thread; só a janela do Open3D roda na thread da interface
+        from src.mesh_preview import read_view_geometry
+
+        future = Future()
+
+        def _load():
+            try:
+                future.set_result(read_view_geometry(geometry_path, with_normals=True))
+            except Exception as exc:
+                future.set_exception(exc)
+
+        threading.Thread(target=_load, daemon=True).start()
+
+        def _draw(geom):
+            import open3d as o3d  # só ao abrir a visualização: não pesa na abertura da interface
+
+            o3d.visualization.draw_geometries([geom], window_name=title)
+
+        self._when_done(future, _draw, f"Carregando {os.path.basename(geometry_path)}...")
+
+    def open_mesh_view(self):
+        # Abre a prévia (malha decimada / nuvem subamostrada, em cache); resolução total em "3D completo"
+        path, source = self._selected_view_geometry()
+        if not source:
+            return
+        title = f"{os.path.basename(path)} (prévia)"
+        self._when_done(
+            preview_in_background(source, **self.preview_opts),
+            lambda preview_path: self._show_geometry(preview_path, title),
+            "Gerando prévia 3D...",
+        )
+
+    def open_full_mesh_view(self):
+        path, source = self._selected_view_geometry()
+        if source:
+            self._show_geometry(source, os.path.basename(path))
 
     def delete_selected(self):
         path = self._selected_path()
@@ -345,6 +389,7 @@ class HistoryPanel(ctk.CTkFrame):
                 os.remove(path)
             else:
                 shutil.rmtree(path)
+            results_index().remove(path)
             self.refresh()
         except Exception as exc:
             messagebox.showerror("Erro ao excluir", str(exc), parent=self)
@@ -426,7 +471,7 @@ def build_ui():
     ]
 
     for idx, (title, subtitle, path, mode) in enumerate(history_items):
-        panel = HistoryPanel(history_wrap, title, subtitle, path, mode=mode)
+        panel = HistoryPanel(history_wrap, title, subtitle, path, mode=mode, preview_opts=preview_options(cfg))
         row = idx // 2
         col = idx % 2
         panel.grid(row=row, column=col, padx=8, pady=8, sticky="nsew")
@@ -463,6 +508,7 @@ def build_ui():
 
 
 def main():
+    enable_background_previews()
     app = build_ui()
     app.mainloop()
 
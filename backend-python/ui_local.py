@@ -39,11 +39,10 @@ def selecionar_pasta_fotos_calibracao():
 
 
 # Seleção do video usado na extração de frames:
-def selecionar_arquivo_video():
+def selecionar_arquivo_video(mensagem="Por favor, selecione o arquivo de vídeo para a extração de frames."):
     sistema = platform.system()
     home = os.path.expanduser("~")
     titulo = "Seleção de Vídeo"
-    mensagem = "Por favor, selecione o arquivo de vídeo para a extração de frames."
 
     if sistema == "Linux":
         try: